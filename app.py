@@ -4,14 +4,21 @@ Ven - Intelligent AI Assistant
 A Python-based chatbot with database integration and advanced AI capabilities
 """
 
+import time
+
+# Measured from the first import so boot time covers the whole service graph
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import gc
 import json
 import logging
+from collections import deque
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 import pytz
 
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, Response as FlaskResponse, request, jsonify, render_template, session, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
@@ -19,8 +26,10 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (LOG_LEVEL, LOG_FILE, LOG_FORMAT); records are written by a
+# background thread so request threads never block on log I/O
+from services.logging_config import configure_logging
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
@@ -29,22 +38,52 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///ven_chatbot.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Pool sizing per backend; WAL and pragmas on every SQLite connection
+from services.database_config import configure_database, install_sqlite_pragmas
+configure_database(app)
+
 # Enable CORS
 CORS(app)
 
 # Initialize database
 db = SQLAlchemy(app)
+with app.app_context():
+    install_sqlite_pragmas(db.engine)
 
 # Import models and services after db initialization
 from models import User, Chat, Message, Response, KnowledgeBase
 from services.chatbot_service import IntelligentChatbotService
 from services.ai_service import AIService
+from services.batch_analyzer import BatchAnalyzer, parse_batch_item
 from services.database_service import DatabaseService
+from services.message_writer import MessageWriter
+from services.metrics import metrics
+from services.migrations import migrate
 
 # Initialize services
 ai_service = AIService()
-chatbot_service = IntelligentChatbotService(ai_service)
 db_service = DatabaseService()
+message_writer = MessageWriter(
+    app, db_service,
+    batch_size=int(os.getenv('MESSAGE_BATCH_SIZE', 200)),
+    flush_interval=float(os.getenv('MESSAGE_FLUSH_INTERVAL', 0.05))
+)
+# Evicted contexts and memories are persisted on the writer thread
+chatbot_service = IntelligentChatbotService(ai_service, db_service=db_service,
+                                            write_behind=message_writer.submit)
+batch_analyzer = BatchAnalyzer(ai_service)
+
+# Preload NLP models and responses.json up front. Under ``gunicorn --preload``
+# this runs once in the master and forked workers share the pages copy-on-write.
+if os.getenv('PRELOAD_MODELS', 'false').lower() == 'true':
+    preload_timings = ai_service.preload()
+    # Keep the preloaded objects out of later GC passes so they stay shared
+    gc.freeze()
+else:
+    preload_timings = {}
+
+STARTUP_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 2)
+logger.info(f"Ven ready in {STARTUP_MS} ms (preload={'on' if preload_timings else 'off'})")
 
 @app.route('/')
 def index():
@@ -70,19 +109,15 @@ def chat():
             chat_id=chat_id
         )
         
-        # Save message and response to database
+        # Queue message and response for batched persistence; clients that
+        # need the write committed before the reply can ask for durable=true
         if user_id and chat_id:
-            db_service.save_message(
+            message_writer.write_pair(
                 chat_id=chat_id,
                 user_id=user_id,
-                message=user_message,
-                sender='user'
-            )
-            db_service.save_message(
-                chat_id=chat_id,
-                user_id=user_id,
-                message=response['text'],
-                sender='bot'
+                user_message=user_message,
+                bot_message=response['text'],
+                durable=bool(data.get('durable', False))
             )
         
         return jsonify(response)
@@ -91,6 +126,56 @@ def chat():
         logger.error(f"Error in chat endpoint: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream a chat reply as Server-Sent Events
+    
+    Events: ``context`` (message analysis), ``delta`` (response text chunks),
+    ``response`` (the full /api/chat payload) and ``persisted`` once the
+    message pair has been committed.
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = (data.get('message') or '').strip()
+    user_id = data.get('user_id')
+    chat_id = data.get('chat_id')
+    
+    if not user_message:
+        return jsonify({'error': 'Message cannot be empty'}), 400
+    
+    def generate():
+        try:
+            response = None
+            for event, payload in chatbot_service.stream_response(user_message, user_id=user_id, chat_id=chat_id):
+                if event == 'response':
+                    response = payload
+                yield sse_event(event, payload)
+            
+            # The reply is already on the wire, so wait for the commit here
+            saved = False
+            if user_id and chat_id and response is not None:
+                saved = message_writer.write_pair(
+                    chat_id=chat_id,
+                    user_id=user_id,
+                    user_message=user_message,
+                    bot_message=response['text'],
+                    durable=True
+                )
+            yield sse_event('persisted', {'saved': saved})
+            
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            yield sse_event('error', {'error': 'Internal server error'})
+    
+    return FlaskResponse(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/chat/new', methods=['POST'])
 def new_chat():
     """Start a new chat session"""
@@ -114,11 +199,27 @@ def new_chat():
 
 @app.route('/api/chat/<chat_id>/history', methods=['GET'])
 def get_chat_history(chat_id):
-    """Get chat history for a specific chat"""
+    """Get a page of chat history for a specific chat
+    
+    Query parameters: ``limit`` (default 100, max 500) and at most one of
+    ``before``/``after``, the opaque cursors returned with the previous page.
+    """
     try:
-        messages = db_service.get_chat_messages(chat_id)
-        return jsonify({'messages': messages})
+        before = request.args.get('before')
+        after = request.args.get('after')
+        if before and after:
+            return jsonify({'error': 'Use either before or after, not both'}), 400
         
+        page = db_service.get_chat_messages_page(
+            chat_id,
+            limit=request.args.get('limit', 100, type=int),
+            before=before,
+            after=after
+        )
+        return jsonify(page)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting chat history: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -197,8 +298,14 @@ def logout_user():
 
 @app.route('/api/knowledge', methods=['GET'])
 def get_knowledge_base():
-    """Get knowledge base entries"""
+    """Get knowledge base entries, or search them with ?q= (BM25 ranked, ``term*`` for prefixes)"""
     try:
+        query = request.args.get('q', '').strip()
+        if query:
+            limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+            knowledge = db_service.search_knowledge(query, limit=limit)
+            return jsonify({'knowledge': knowledge, 'query': query})
+        
         knowledge = db_service.get_knowledge_base()
         return jsonify({'knowledge': knowledge})
         
@@ -229,21 +336,153 @@ def add_knowledge():
         logger.error(f"Error adding knowledge: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze many messages and stream the results back as NDJSON
+    
+    Accepts ``{"messages": [...]}`` or an ``application/x-ndjson`` body with one
+    message per line. Items are strings or ``{"id": ..., "message": ...}``.
+    Each output line is ``{"index", "id", "analysis"}``, in input order. An
+    item that is not valid JSON or has no string message, or whose analysis
+    failed, gets ``{"index", "id", "error"}`` instead.
+    """
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            def items():
+                # Read the body line by line so huge uploads never sit in memory
+                for line in request.stream:
+                    line = line.decode('utf-8').strip()
+                    if not line:
+                        continue
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        yield None, None, 'invalid JSON'
+                        continue
+                    yield parse_batch_item(item)
+        else:
+            data = request.get_json(silent=True) or {}
+            messages = data.get('messages')
+            if not isinstance(messages, list) or not messages:
+                return jsonify({'error': 'messages must be a non-empty list'}), 400
+            items = lambda: (parse_batch_item(item) for item in messages)
+        
+        def generate():
+            # (id, error) of every input item read so far, in input order
+            pending = deque()
+            index = 0
+            
+            def texts():
+                for item_id, text, error in items():
+                    pending.append((item_id, error))
+                    if error is None:
+                        yield text
+            
+            def output(item_id, key, value):
+                nonlocal index
+                line = json.dumps({'index': index, 'id': item_id, key: value}) + '\n'
+                index += 1
+                return line
+            
+            def rejected():
+                # Items that failed before analysis, up to the next analyzed one
+                while pending and pending[0][1] is not None:
+                    item_id, error = pending.popleft()
+                    yield output(item_id, 'error', error)
+            
+            for analysis in batch_analyzer.iter_analyze(texts()):
+                yield from rejected()
+                item_id, _ = pending.popleft()
+                if analysis is None:
+                    yield output(item_id, 'error', 'analysis failed')
+                else:
+                    yield output(item_id, 'analysis', analysis)
+            yield from rejected()
+        
+        return FlaskResponse(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        logger.error(f"Error in batch analysis: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/time', methods=['GET'])
+def get_times():
+    """Current time for one or more locations (``?loc=tokyo,new york,uk``)"""
+    try:
+        locations = [loc.strip() for loc in request.args.get('loc', '').split(',') if loc.strip()]
+        if not locations:
+            return jsonify({'error': 'loc is required'}), 400
+        if len(locations) > 50:
+            return jsonify({'error': 'At most 50 locations per request'}), 400
+        
+        resolver = ai_service.timezone_resolver
+        return jsonify({'times': [resolver.current_time(location) for location in locations]})
+        
+    except Exception as e:
+        logger.error(f"Error getting times: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Service state sampled on every /api/metrics scrape
+metrics.gauge('ven_cache_hit_rate', 'Hit rate of the in-process caches', 'cache', lambda: {
+    'analysis': ai_service.analysis_cache.stats()['hit_rate'],
+    'responses': ai_service.response_cache.stats()['hit_rate']
+})
+metrics.gauge('ven_context_store_entries', 'Conversation contexts and user memories held in memory', 'store', lambda: {
+    'contexts': len(chatbot_service.conversation_contexts),
+    'memories': len(chatbot_service.user_memories)
+})
+metrics.gauge('ven_message_writer', 'Message writer queue depth and totals', 'stat', message_writer.stats)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for this worker process"""
+    return FlaskResponse(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'startup_ms': STARTUP_MS,
+        'preload': preload_timings,
+        'knowledge_base': ai_service.knowledge_stats(),
+        'caches': {
+            'analysis': ai_service.analysis_cache.stats(),
+            'responses': ai_service.response_cache.stats()
+        }
     })
 
-if __name__ == '__main__':
-    # Create database tables
+def shutdown():
+    """Drain queued writes and persist in-memory state before the process exits
+    
+    Called from the gunicorn ``worker_exit`` hook (see gunicorn.conf.py) once a
+    worker has finished its in-flight requests.
+    """
+    message_writer.stop()
+    with app.app_context():
+        chatbot_service.conversation_contexts.flush()
+        chatbot_service.user_memories.flush()
+    logger.info("Worker %s drained: %s", os.getpid(), message_writer.stats())
+
+def setup_database():
+    """Create missing tables, apply pending migrations and seed the knowledge base
+    
+    Runs once per start: from ``python app.py`` and from the gunicorn
+    ``on_starting`` hook in the master process, before any worker forks.
+    """
     with app.app_context():
         db.create_all()
+        # Bring databases created by older releases up to date (indexes etc.)
+        migrate(db.engine)
         # Initialize default knowledge base
         db_service.initialize_knowledge_base()
+        # Forked workers must open their own connections
+        db.engine.dispose()
+
+if __name__ == '__main__':
+    setup_database()
     
     # Run the application
     app.run(
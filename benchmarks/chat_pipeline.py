@@ -0,0 +1,143 @@
+"""
+Chat pipeline benchmark
+Per-stage timings, end-to-end latency and concurrent /api/chat load
+
+Usage:
+    python -m benchmarks.chat_pipeline --messages 500 --clients 8 --output bench.json
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+"""
+
+import argparse
+import threading
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import build_corpus, emit, environment, summarize, time_calls, use_temporary_database
+
+
+def bench_stages(ai_service, db_service, app, corpus: List[str], chat_id: str, user_id: int) -> Dict[str, Any]:
+    """Time each analysis stage, the KB lookup and the DB persist in isolation"""
+    stages = {
+        'intent': ai_service._detect_intent,
+        'sentiment': ai_service._analyze_sentiment,
+        'entities': ai_service._extract_entities,
+        'keywords': ai_service._extract_keywords,
+        'language': ai_service._detect_language,
+        'complexity': ai_service._assess_complexity,
+    }
+    results = {name: time_calls(func, corpus) for name, func in stages.items()}
+
+    analyses = {message: ai_service._analyze_message_uncached(message) for message in set(corpus)}
+    results['kb_lookup'] = time_calls(
+        lambda message: ai_service._get_knowledge_base_response(message, analyses[message]), corpus
+    )
+
+    def persist(message):
+        db_service.save_messages_bulk([
+            {'chat_id': chat_id, 'user_id': user_id, 'message': message, 'sender': 'user'},
+            {'chat_id': chat_id, 'user_id': user_id, 'message': message, 'sender': 'bot'}
+        ])
+
+    with app.app_context():
+        results['db_persist'] = time_calls(persist, corpus)
+    return results
+
+
+def bench_pipeline(ai_service, chatbot_service, corpus: List[str]) -> Dict[str, Any]:
+    """Time the public entry points of the chat pipeline"""
+    ai_service.analysis_cache.clear()
+    results = {
+        'analyze_message_cold': time_calls(ai_service._analyze_message_uncached, corpus),
+        'analyze_message': time_calls(ai_service.analyze_message, corpus),
+        'generate_response': time_calls(ai_service.generate_response, corpus),
+        'get_response': time_calls(
+            lambda message: chatbot_service.get_response(message, user_id=None, chat_id=None), corpus
+        )
+    }
+    results['analysis_cache'] = ai_service.analysis_cache.stats()
+    return results
+
+
+def bench_http(app, corpus: List[str], clients: int, chat_id: str, user_id: int,
+               durable: bool = False) -> Dict[str, Any]:
+    """Replay the corpus against /api/chat from concurrent test clients"""
+    samples: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    shards = [corpus[i::clients] for i in range(clients)]
+
+    def worker(messages):
+        client = app.test_client()
+        local = []
+        failed = 0
+        for message in messages:
+            start = time.perf_counter()
+            response = client.post('/api/chat', json={
+                'message': message, 'user_id': user_id, 'chat_id': chat_id, 'durable': durable
+            })
+            local.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failed += 1
+        with lock:
+            samples.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(shard,)) for shard in shards]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(samples, elapsed)
+    summary.update({'clients': clients, 'errors': errors[0], 'durable': durable})
+    return summary
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description='Benchmark the Ven chat pipeline')
+    parser.add_argument('--messages', type=int, default=500, help='corpus size')
+    parser.add_argument('--seed', type=int, default=42, help='corpus random seed')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent HTTP clients')
+    parser.add_argument('--durable', action='store_true', help='wait for message commits in /api/chat')
+    parser.add_argument('--skip-http', action='store_true', help='skip the /api/chat load test')
+    parser.add_argument('--output', default='-', help='JSON output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    database_url = use_temporary_database()
+    from app import app, db, ai_service, chatbot_service, db_service, message_writer
+
+    with app.app_context():
+        db.create_all()
+        user_id = db_service.create_user('bench', 'bench@example.com', 'bench-password')
+        chat_id = db_service.create_chat(user_id, title='Benchmark')
+
+    preload = ai_service.preload()
+    corpus = build_corpus(args.messages, seed=args.seed)
+
+    report = {
+        'benchmark': 'chat_pipeline',
+        'environment': environment(),
+        'config': {
+            'messages': len(corpus),
+            'unique_messages': len(set(corpus)),
+            'seed': args.seed,
+            'database': database_url.split('://', 1)[0]
+        },
+        'preload_ms': preload,
+        'stages': bench_stages(ai_service, db_service, app, corpus, chat_id, user_id),
+        'pipeline': bench_pipeline(ai_service, chatbot_service, corpus)
+    }
+    if not args.skip_http:
+        report['http_chat'] = bench_http(app, corpus, args.clients, chat_id, user_id, args.durable)
+        message_writer.stop()
+        report['message_writer'] = message_writer.stats()
+
+    emit(report, args.output)
+    return report
+
+
+if __name__ == '__main__':
+    main()
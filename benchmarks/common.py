@@ -0,0 +1,134 @@
+"""
+Shared helpers for the Ven benchmark suites
+Corpus generation, latency summaries and JSON reporting
+"""
+
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYNTHETIC_TEMPLATES = [
+    "what is {a} + {b}",
+    "calculate ({a} * {b}) - {c}",
+    "my name is {name}",
+    "I am {age} years old",
+    "I live in {city}",
+    "what time is it in {city}",
+    "tell me about the {topic}",
+    "translate hello to spanish",
+    "I love {topic} and {topic2}",
+    "Good morning! How are you doing today?",
+    "Can you explain how {topic} works in simple terms?",
+    "I'm feeling a bit down today, the weather in {city} is terrible",
+]
+
+NAMES = ['Alice', 'Rahim', 'Sofia', 'Kenji', 'Amara', 'Lucas']
+CITIES = ['London', 'Tokyo', 'Dhaka', 'New York', 'Paris', 'Kuala Lumpur', 'Berlin']
+TOPICS = ['sun', 'earth', 'python', 'music', 'football', 'space', 'history', 'cooking']
+
+
+def use_temporary_database() -> str:
+    """Point DATABASE_URL at a throwaway SQLite file before app is imported"""
+    if 'DATABASE_URL' not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix='ven-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    return os.environ['DATABASE_URL']
+
+
+def load_triggers(path: Optional[str] = None) -> List[str]:
+    """Get every trigger phrase from responses.json"""
+    with open(path or os.path.join(ROOT, 'responses.json'), 'r', encoding='utf-8') as f:
+        knowledge_base = json.load(f)
+    return [trigger for responses in knowledge_base.values() for trigger in responses]
+
+
+def synthetic_message(rng: random.Random) -> str:
+    """Fill a random template with random values"""
+    template = rng.choice(SYNTHETIC_TEMPLATES)
+    return template.format(
+        a=rng.randint(1, 999), b=rng.randint(1, 999), c=rng.randint(1, 99),
+        name=rng.choice(NAMES), age=rng.randint(8, 90), city=rng.choice(CITIES),
+        topic=rng.choice(TOPICS), topic2=rng.choice(TOPICS)
+    )
+
+
+def build_corpus(size: int = 500, seed: int = 42, synthetic_ratio: float = 0.5) -> List[str]:
+    """Mix responses.json triggers with synthetic messages, deterministically"""
+    rng = random.Random(seed)
+    triggers = load_triggers()
+    corpus = []
+    for _ in range(size):
+        if triggers and rng.random() >= synthetic_ratio:
+            corpus.append(rng.choice(triggers))
+        else:
+            corpus.append(synthetic_message(rng))
+    return corpus
+
+
+def summarize(samples: List[float], elapsed: Optional[float] = None) -> Dict[str, Any]:
+    """Summarize latency samples (seconds) as milliseconds with percentiles"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        # Nearest-rank percentile
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100.0 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 4)
+
+    summary = {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'min_ms': round(ordered[0] * 1000, 4),
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': round(ordered[-1] * 1000, 4)
+    }
+    if elapsed:
+        summary['throughput_per_s'] = round(len(ordered) / elapsed, 2)
+    return summary
+
+
+def time_calls(func: Callable[[Any], Any], inputs: Iterable[Any]) -> Dict[str, Any]:
+    """Call func once per input and summarize the latencies"""
+    samples = []
+    started = time.perf_counter()
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine so results can be compared between releases"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def emit(report: Dict[str, Any], output: Optional[str] = None):
+    """Write the report as JSON to a file or stdout"""
+    payload = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if output and output != '-':
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
@@ -0,0 +1,130 @@
+"""
+Intent classifier benchmark
+Accuracy and latency on labelled responses.json triggers
+
+Usage:
+    python -m benchmarks.intent_classifier --repeat 20 --output intents.json
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+from benchmarks.common import ROOT, emit, environment, summarize, time_calls
+
+LABELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'intent_labels.json')
+
+
+def legacy_detect_intent(message: str) -> str:
+    """The substring-chain rules AIService._detect_intent used before the classifier"""
+    message_lower = message.lower()
+    if any(word in message_lower for word in ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening']):
+        return 'greeting'
+    if any(word in message_lower for word in ['what', 'how', 'why', 'when', 'where', 'who', 'which']):
+        return 'question'
+    if any(word in message_lower for word in ['time', 'clock', 'hour', 'minute']):
+        return 'time_query'
+    if any(word in message_lower for word in ['date', 'day', 'today', 'tomorrow', 'yesterday']):
+        return 'date_query'
+    if any(char in message for char in ['+', '-', '*', '/', '=', '(', ')']):
+        return 'math_query'
+    if any(word in message_lower for word in ['translate', 'in spanish', 'to french', 'in german']):
+        return 'translation_request'
+    if any(word in message_lower for word in ['tell me about', 'what is', 'who is', 'search for']):
+        return 'information_request'
+    if any(word in message_lower for word in ['my name', 'i am', 'i\'m', 'i live in']):
+        return 'personal_info'
+    return 'general_conversation'
+
+
+def evaluate(predict, messages: List[str], labels: List[str]) -> Dict[str, Any]:
+    """Overall accuracy, per-intent precision/recall and the worst misses"""
+    predictions = [predict(message) for message in messages]
+    correct = sum(1 for predicted, label in zip(predictions, labels) if predicted == label)
+
+    true_positive = Counter()
+    predicted_count = Counter(predictions)
+    label_count = Counter(labels)
+    confusions = defaultdict(int)
+    for predicted, label in zip(predictions, labels):
+        if predicted == label:
+            true_positive[label] += 1
+        else:
+            confusions[f"{label}->{predicted}"] += 1
+
+    per_intent = {}
+    for intent in sorted(label_count):
+        precision = true_positive[intent] / predicted_count[intent] if predicted_count[intent] else 0.0
+        recall = true_positive[intent] / label_count[intent]
+        per_intent[intent] = {
+            'support': label_count[intent],
+            'precision': round(precision, 4),
+            'recall': round(recall, 4)
+        }
+
+    return {
+        'accuracy': round(correct / len(labels), 4) if labels else 0.0,
+        'per_intent': per_intent,
+        'top_confusions': dict(sorted(confusions.items(), key=lambda item: -item[1])[:10])
+    }
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description='Benchmark the intent classifier')
+    parser.add_argument('--labels', default=LABELS_PATH, help='labelled messages JSON file')
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the labelled set for latency')
+    parser.add_argument('--output', default='-', help='JSON output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    import sys
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from services.intent_classifier import IntentClassifier
+
+    with open(args.labels, 'r', encoding='utf-8') as f:
+        labelled = json.load(f)['labels']
+    messages = list(labelled)
+    labels = [labelled[message] for message in messages]
+
+    started = time.perf_counter()
+    classifier = IntentClassifier()
+    build_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    workload = messages * args.repeat
+    batch_samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        classifier.classify_batch(messages)
+        batch_samples.append(time.perf_counter() - start)
+
+    report = {
+        'benchmark': 'intent_classifier',
+        'environment': environment(),
+        'config': {'labelled_messages': len(messages), 'repeat': args.repeat},
+        'build_ms': build_ms,
+        'vocabulary_size': len(classifier.vocabulary),
+        'accuracy': {
+            'classifier': evaluate(classifier.classify, messages, labels),
+            'legacy_rules': evaluate(legacy_detect_intent, messages, labels)
+        },
+        'latency': {
+            'classify': time_calls(classifier.classify, workload),
+            'legacy_rules': time_calls(legacy_detect_intent, workload),
+            'classify_batch': summarize(batch_samples),
+            'classify_batch_per_message_us': round(
+                sum(batch_samples) / (len(batch_samples) * len(messages)) * 1e6, 3
+            )
+        }
+    }
+    batch_predictions = classifier.classify_batch(messages)
+    report['batch_matches_single'] = batch_predictions == [classifier.classify(message) for message in messages]
+
+    emit(report, args.output)
+    return report
+
+
+if __name__ == '__main__':
+    main()
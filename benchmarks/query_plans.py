@@ -0,0 +1,166 @@
+"""
+Query plan check for the DatabaseService read queries
+Builds a database the way releases before the schema migrations did (tables,
+no secondary indexes), calls the real DatabaseService read methods and asks
+SQLite for the plan of every statement they issue, before and after the
+migrations. Exits non-zero if any query still scans a table, sorts in a
+temporary b-tree or, for the keyset history pages, does not seek to the
+cursor.
+
+Usage:
+    python -m benchmarks.query_plans --output plans.json
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, insert, text
+
+from benchmarks.common import emit, environment, use_temporary_database
+
+CHAT_ID = 'plans-chat'
+CHAT_MESSAGES = 300
+
+# Plan terms a statement must contain; the keyset pages have to seek the
+# index to the cursor, not just filter on chat_id
+REQUIRED_TERMS = {
+    'get_chat_messages_page.before': 'created_at<',
+    'get_chat_messages_page.after': 'created_at>',
+}
+
+
+def seed(db, db_service) -> int:
+    """Add a user with chats, history and a context; returns the user id"""
+    from models import Chat, ConversationContext, Message, User
+
+    user = User(username='plans', email='plans@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add_all([Chat(id=CHAT_ID, user_id=user.id), Chat(id='plans-chat-2', user_id=user.id)])
+    db.session.add(ConversationContext(chat_id=CHAT_ID, user_id=user.id, context_data={}))
+    started = datetime(2026, 1, 1)
+    db.session.execute(insert(Message), [
+        {'chat_id': CHAT_ID, 'user_id': user.id, 'content': f'message {n}',
+         'sender': 'user' if n % 2 else 'bot', 'created_at': started + timedelta(seconds=n)}
+        for n in range(CHAT_MESSAGES)
+    ])
+    db.session.commit()
+    db_service.initialize_responses()
+    db_service.initialize_knowledge_base()
+    return user.id
+
+
+def hot_calls(db_service, user_id: int, cursor: str) -> Dict[str, Callable[[], Any]]:
+    """The DatabaseService read methods on the hot path, keyed by name"""
+    return {
+        'get_chat_messages_page': lambda: db_service.get_chat_messages_page(CHAT_ID, limit=100),
+        'get_chat_messages_page.before': lambda: db_service.get_chat_messages_page(
+            CHAT_ID, limit=100, before=cursor),
+        'get_chat_messages_page.after': lambda: db_service.get_chat_messages_page(
+            CHAT_ID, limit=100, after=cursor),
+        'get_user_chats': lambda: db_service.get_user_chats(user_id),
+        'get_conversation_context': lambda: db_service.get_conversation_context(CHAT_ID, user_id),
+        'get_responses': lambda: db_service.get_responses(),
+        'get_responses.category': lambda: db_service.get_responses('greeting'),
+        'get_knowledge_base': lambda: db_service.get_knowledge_base(),
+        'get_knowledge_base.category': lambda: db_service.get_knowledge_base('science'),
+    }
+
+
+def capture(engine, call: Callable[[], Any]) -> List[Tuple[str, Any]]:
+    """Run call and return the (sql, parameters) of every SELECT it issued"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def hot_queries(engine, calls: Dict[str, Callable[[], Any]]) -> Dict[str, Tuple[str, Any]]:
+    """Every statement the calls issue; a call's later statements get #2, #3..."""
+    queries = {}
+    for name, call in calls.items():
+        for number, statement in enumerate(capture(engine, call), 1):
+            queries[name if number == 1 else f'{name}#{number}'] = statement
+    return queries
+
+
+def explain(connection, statement: Tuple[str, Any]) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines for a captured statement"""
+    sql, parameters = statement
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def problems(plan: List[str], required: Optional[str] = None) -> List[str]:
+    """Plan steps that read a whole table or sort the result, and missing terms"""
+    found = [step for step in plan if step.startswith('SCAN ') or 'TEMP B-TREE' in step]
+    if required and not any(required in step for step in plan):
+        found.append(f'missing {required}')
+    return found
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description='Check that the hot read queries use indexes')
+    parser.add_argument('--output', default='-', help='JSON output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    use_temporary_database()
+    from app import app, db, db_service
+    from services.migrations import QUERY_INDEXES, migrate
+
+    with app.app_context():
+        engine = db.engine
+        # db.create_all declares the query indexes; drop them to start from
+        # the schema older releases built
+        db.create_all()
+        with engine.begin() as connection:
+            for _, index_name, _ in QUERY_INDEXES:
+                connection.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+
+        user_id = seed(db, db_service)
+        cursor = db_service.get_chat_messages_page(CHAT_ID, limit=150)['cursors']['before']
+        queries = hot_queries(engine, hot_calls(db_service, user_id, cursor))
+        db.session.remove()
+
+        with engine.connect() as connection:
+            before = {name: explain(connection, statement) for name, statement in queries.items()}
+        applied = migrate(engine)
+        with engine.connect() as connection:
+            after = {name: explain(connection, statement) for name, statement in queries.items()}
+        engine.dispose()
+
+    results = {
+        name: {
+            'sql': queries[name][0],
+            'before': before[name],
+            'after': after[name],
+            'problems': problems(after[name], REQUIRED_TERMS.get(name))
+        }
+        for name in queries
+    }
+    failing = sorted(name for name, result in results.items() if result['problems'])
+    report = {
+        'benchmark': 'query_plans',
+        'environment': environment(),
+        'migrations_applied': applied,
+        'queries': results,
+        'failing': failing
+    }
+    emit(report, args.output)
+    if failing:
+        sys.exit(1)
+    return report
+
+
+if __name__ == '__main__':
+    main()
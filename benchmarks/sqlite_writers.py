@@ -0,0 +1,157 @@
+"""
+SQLite concurrent writer benchmark
+Chat-style inserts from several threads while readers page history, with the
+default engine against the tuned engine from services.database_config
+
+Usage:
+    python -m benchmarks.sqlite_writers --writers 8 --readers 4 --seconds 5 --output sqlite.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import (Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text,
+                        create_engine, insert, select, update)
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.common import ROOT, emit, environment, summarize
+
+metadata_obj = MetaData()
+
+chats = Table(
+    'chats', metadata_obj,
+    Column('id', String(36), primary_key=True),
+    Column('updated_at', DateTime)
+)
+
+messages = Table(
+    'messages', metadata_obj,
+    Column('id', Integer, primary_key=True),
+    Column('chat_id', String(36), ForeignKey('chats.id'), nullable=False, index=True),
+    Column('sender', String(10)),
+    Column('message', Text),
+    Column('created_at', DateTime)
+)
+
+
+def build_engine(path: str, tuned: bool):
+    """Engine as app.py created it before (default) or through database_config (tuned)"""
+    url = f'sqlite:///{path}'
+    if not tuned:
+        return create_engine(url)
+    from services.database_config import engine_options, install_sqlite_pragmas
+    engine = create_engine(url, **engine_options(url))
+    install_sqlite_pragmas(engine)
+    return engine
+
+
+def run_profile(tuned: bool, writers: int, readers: int, seconds: float, chat_count: int, seed: int) -> Dict[str, Any]:
+    """Hammer one fresh database file with writer and reader threads"""
+    path = os.path.join(tempfile.mkdtemp(prefix='ven-sqlite-'), 'bench.db')
+    engine = build_engine(path, tuned)
+    metadata_obj.create_all(engine)
+    chat_ids = [f'chat-{i}' for i in range(chat_count)]
+    with engine.begin() as connection:
+        connection.execute(insert(chats), [{'id': chat_id, 'updated_at': datetime.utcnow()} for chat_id in chat_ids])
+
+    write_samples: List[float] = []
+    read_samples: List[float] = []
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def writer(index: int):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            chat_id = rng.choice(chat_ids)
+            start = time.perf_counter()
+            try:
+                # Same statements as DatabaseService.save_message
+                with engine.begin() as connection:
+                    connection.execute(insert(messages).values(
+                        chat_id=chat_id, sender='user', message='hello ' * rng.randint(1, 20),
+                        created_at=datetime.utcnow()
+                    ))
+                    connection.execute(update(chats).where(chats.c.id == chat_id).values(updated_at=datetime.utcnow()))
+            except OperationalError:
+                with lock:
+                    errors['write'] += 1
+                continue
+            with lock:
+                write_samples.append(time.perf_counter() - start)
+
+    def reader(index: int):
+        rng = random.Random(seed - index - 1)
+        query = select(messages).order_by(messages.c.created_at.desc(), messages.c.id.desc()).limit(50)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query.where(messages.c.chat_id == rng.choice(chat_ids))).fetchall()
+            except OperationalError:
+                with lock:
+                    errors['read'] += 1
+                continue
+            with lock:
+                read_samples.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+    engine.dispose()
+    return {
+        'journal_mode': journal_mode,
+        'writes': summarize(write_samples, elapsed),
+        'reads': summarize(read_samples, elapsed),
+        'errors': errors
+    }
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description='Benchmark concurrent SQLite writers')
+    parser.add_argument('--writers', type=int, default=8, help='writer threads')
+    parser.add_argument('--readers', type=int, default=4, help='reader threads')
+    parser.add_argument('--seconds', type=float, default=5.0, help='duration of each profile')
+    parser.add_argument('--chats', type=int, default=50, help='chats the messages are spread over')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='-', help='JSON output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    profiles = {
+        name: run_profile(tuned, args.writers, args.readers, args.seconds, args.chats, args.seed)
+        for name, tuned in (('default', False), ('tuned', True))
+    }
+    default_rate = profiles['default']['writes'].get('throughput_per_s') or 0
+    tuned_rate = profiles['tuned']['writes'].get('throughput_per_s') or 0
+
+    report = {
+        'benchmark': 'sqlite_writers',
+        'environment': environment(),
+        'config': {'writers': args.writers, 'readers': args.readers, 'seconds': args.seconds, 'chats': args.chats},
+        'profiles': profiles,
+        'write_speedup': round(tuned_rate / default_rate, 2) if default_rate else None
+    }
+    emit(report, args.output)
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Gunicorn configuration for running Ven in production
+Worker count from the CPU count, app preloading and graceful draining of
+queued writes; every setting can be overridden from the environment
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv('BIND', f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}")
+
+# gthread (default) serves several requests per process with OS threads;
+# gevent suits workloads dominated by database and provider I/O (pip install gevent)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Import the app, NLTK data and responses.json once in the master so workers
+# share them copy-on-write
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+if preload_app:
+    os.environ.setdefault('PRELOAD_MODELS', 'true')
+
+if worker_class == 'gevent':
+    # The preloaded app must see patched sockets, threads and locks
+    from gevent import monkey
+    monkey.patch_all()
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound memory growth (0 disables)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+
+def on_starting(server):
+    """Create tables, apply migrations and seed the knowledge base before workers start"""
+    if preload_app:
+        from app import setup_database
+        setup_database()
+    else:
+        # Keep the app out of the master so every worker imports its own copy
+        subprocess.run(
+            [sys.executable, '-c', 'from app import setup_database; setup_database()'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        )
+
+
+def worker_exit(server, worker):
+    """Flush queued messages and contexts after the worker stops accepting requests"""
+    from app import shutdown
+    try:
+        shutdown()
+    except Exception as e:
+        server.log.error(f"Worker {worker.pid} failed to drain: {e}")
@@ -46,6 +46,10 @@ class User(db.Model):
 class Chat(db.Model):
     """Chat session model"""
     __tablename__ = 'chats'
+    __table_args__ = (
+        # Serves a user's chat list: active chats, most recently updated first
+        db.Index('ix_chats_user_active_updated', 'user_id', 'is_active', 'updated_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -57,21 +61,35 @@ class Chat(db.Model):
     # Relationships
     messages = db.relationship('Message', backref='chat', lazy=True, order_by='Message.created_at')
     
-    def to_dict(self):
-        """Convert chat to dictionary"""
-        return {
+    def to_dict(self, message_count=None, last_message=None):
+        """Convert chat to dictionary
+        
+        Listing code passes pre-aggregated counts and previews; otherwise the
+        count is taken with a COUNT query instead of loading every message.
+        """
+        if message_count is None:
+            message_count = Message.query.filter_by(chat_id=self.id).count()
+        
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'title': self.title,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'message_count': len(self.messages),
+            'message_count': message_count,
             'is_active': self.is_active
         }
+        if last_message is not None:
+            data['last_message'] = last_message
+        return data
 
 class Message(db.Model):
     """Individual message model"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Serves keyset pagination of chat history on (created_at, id)
+        db.Index('ix_messages_chat_created_id', 'chat_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     chat_id = db.Column(db.String(36), db.ForeignKey('chats.id'), nullable=False)
@@ -79,7 +97,8 @@ class Message(db.Model):
     content = db.Column(db.Text, nullable=False)
     sender = db.Column(db.String(10), nullable=False)  # 'user' or 'bot'
     message_type = db.Column(db.String(20), default='text')  # text, image, file, etc.
-    metadata = db.Column(db.JSON)  # Additional message data
+    # ``metadata`` is reserved by Declarative; the column keeps its name
+    meta_data = db.Column('metadata', db.JSON)  # Additional message data
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -91,13 +110,19 @@ class Message(db.Model):
             'content': self.content,
             'sender': self.sender,
             'message_type': self.message_type,
-            'metadata': self.metadata,
+            'metadata': self.meta_data,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
 class Response(db.Model):
     """Predefined response templates"""
     __tablename__ = 'responses'
+    __table_args__ = (
+        # Active templates by priority, overall and within a category
+        db.Index('ix_responses_active_priority', 'is_active', db.text('priority DESC'), 'trigger'),
+        db.Index('ix_responses_active_category_priority',
+                 'is_active', 'category', db.text('priority DESC'), 'trigger'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     trigger = db.Column(db.String(255), nullable=False, unique=True)
@@ -122,6 +147,12 @@ class Response(db.Model):
 class KnowledgeBase(db.Model):
     """Knowledge base entries for intelligent responses"""
     __tablename__ = 'knowledge_base'
+    __table_args__ = (
+        # Active entries by confidence, overall and within a category
+        db.Index('ix_knowledge_base_active_confidence', 'is_active', db.text('confidence DESC'), 'topic'),
+        db.Index('ix_knowledge_base_active_category_confidence',
+                 'is_active', 'category', db.text('confidence DESC'), 'topic'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     topic = db.Column(db.String(255), nullable=False, unique=True)
@@ -152,6 +183,9 @@ class KnowledgeBase(db.Model):
 class ConversationContext(db.Model):
     """Store conversation context for better responses"""
     __tablename__ = 'conversation_contexts'
+    __table_args__ = (
+        db.Index('ix_conversation_contexts_chat_user', 'chat_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     chat_id = db.Column(db.String(36), db.ForeignKey('chats.id'), nullable=False)
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Ven Production Server
+Runs the app under gunicorn with the settings from gunicorn.conf.py
+"""
+
+import os
+import sys
+
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+
+
+def main(argv=None):
+    """Replace this process with gunicorn; extra arguments are passed through"""
+    args = ['gunicorn', '--config', CONFIG, '--chdir', os.path.dirname(CONFIG),
+            *(sys.argv[1:] if argv is None else argv), 'app:app']
+    try:
+        os.execvp(args[0], args)
+    except FileNotFoundError:
+        print("❌ gunicorn is not installed: pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
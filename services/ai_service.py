@@ -4,35 +4,46 @@ Integrates multiple AI providers for enhanced capabilities
 """
 
 import os
-import json
 import logging
 import random
-from typing import Dict, List, Optional, Any
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from datetime import datetime, timezone
 import pytz
 import requests
-from textblob import TextBlob
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
+from services import nlp_resources
+from services.cache import LRUCache
+from services.intent_classifier import get_intent_classifier
+from services.knowledge_loader import KnowledgeBaseError, KnowledgeBaseWatcher, KnowledgeSnapshot, load_snapshot
+from services.language_detector import get_language_detector
+from services.math_evaluator import MathLimitError, extract_expression, get_math_evaluator
+from services.metrics import intent_counter, metrics
+from services.nlp_resources import word_tokenize, sent_tokenize
+from services.personal_info import extract_personal_info
+from services.providers import ProviderClient
+from services.response_cache import ResponseCache, normalize_message
+from services.timezone_resolver import APPROXIMATE, EXACT, get_timezone_resolver, location_label
+from services.trigger_index import TriggerIndex
 
 logger = logging.getLogger(__name__)
 
+# Streamed responses are sent a few words at a time
+STREAM_CHUNK_WORDS = 3
+_STREAM_CHUNK = re.compile(r'\s*\S+\s*')
+
+ENHANCE_SYSTEM_PROMPT = (
+    "You are Ven, a friendly and helpful assistant. Rewrite the draft reply so it "
+    "answers the user's message accurately and naturally. Keep it short and keep "
+    "any times, dates and numbers from the draft unchanged."
+)
+
+# Intents whose replies are computed exactly or depend on stored user data;
+# they are never rewritten by a provider
+UNENHANCED_INTENTS = {'time_query', 'date_query', 'math_query', 'personal_info'}
+
 class AIService:
     """Service for AI-powered response generation and analysis"""
     
@@ -42,24 +53,146 @@ class AIService:
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
         
-        # Initialize NLP tools
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
-        
-        # Load knowledge base
-        self.knowledge_base = self._load_knowledge_base()
+        # Hosted model providers for every configured key, used only when
+        # PROVIDER_ENHANCE=true (None otherwise or without keys)
+        self.provider_client = None
+        if os.getenv('PROVIDER_ENHANCE', 'false').lower() == 'true':
+            self.provider_client = ProviderClient.from_env({
+                'openai': self.openai_api_key,
+                'anthropic': self.anthropic_api_key,
+                'google': self.google_api_key
+            })
+        
+        # NLP tools and the knowledge base are loaded lazily on first use
+        self.language_detector = get_language_detector()
+        self.intent_classifier = get_intent_classifier()
+        self.math_evaluator = get_math_evaluator()
+        self.timezone_resolver = get_timezone_resolver()
+        self._load_lock = threading.Lock()
+        
+        # The knowledge base and its trigger index live in one immutable snapshot;
+        # a background watcher swaps in a new one when responses.json changes
+        self.knowledge_path = os.getenv('RESPONSES_PATH', 'responses.json')
+        self._snapshot: Optional[KnowledgeSnapshot] = None
+        self._knowledge_watcher = KnowledgeBaseWatcher(
+            self.knowledge_path, self._swap_knowledge_base,
+            interval=float(os.getenv('RESPONSES_RELOAD_INTERVAL', 2.0))
+        )
+        self.knowledge_reloads = 0
+        self.last_reload_ms: Optional[float] = None
         
         # Initialize conversation memory
         self.conversation_memory = {}
         
-    def _load_knowledge_base(self) -> Dict[str, Any]:
+        # Memoize message analysis so repeated phrases skip NLP entirely
+        self.analysis_cache = LRUCache(maxsize=int(os.getenv('ANALYSIS_CACHE_SIZE', 2048)))
+        
+        # Cache replies of deterministic intents (time, date, math, knowledge base)
+        self.response_cache = ResponseCache.from_env()
+        
+    @property
+    def lemmatizer(self):
+        """Shared WordNet lemmatizer, loaded on first use"""
+        return nlp_resources.get_lemmatizer()
+    
+    @property
+    def stop_words(self) -> set:
+        """English stop words, loaded on first use"""
+        return nlp_resources.get_stop_words()
+    
+    @property
+    def knowledge_snapshot(self) -> KnowledgeSnapshot:
+        """Current knowledge base snapshot, loaded on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._ensure_knowledge_base()
+        # Cheap after the first call; restarts the watcher in forked workers
+        self._knowledge_watcher.start()
+        return snapshot
+    
+    @property
+    def knowledge_base(self) -> Dict[str, Any]:
+        """Knowledge base from responses.json, loaded on first use"""
+        return self.knowledge_snapshot.knowledge_base
+    
+    @property
+    def trigger_index(self) -> TriggerIndex:
+        """Compiled trigger index over the knowledge base"""
+        return self.knowledge_snapshot.trigger_index
+    
+    @property
+    def knowledge_version(self) -> str:
+        """Content hash of the loaded knowledge base"""
+        return self.knowledge_snapshot.version
+    
+    def _ensure_knowledge_base(self) -> KnowledgeSnapshot:
+        """Load the knowledge base and build its trigger index once"""
+        with self._load_lock:
+            if self._snapshot is None:
+                self._knowledge_watcher.mark_loaded()
+                self._snapshot = self._load_knowledge_base()
+            return self._snapshot
+    
+    def _swap_knowledge_base(self, snapshot: KnowledgeSnapshot, elapsed_ms: float):
+        """Publish a fully built snapshot; readers pick it up on their next lookup"""
+        self._snapshot = snapshot
+        self.knowledge_reloads += 1
+        self.last_reload_ms = round(elapsed_ms, 2)
+        logger.info(f"Reloaded {snapshot.source} (version {snapshot.version}, "
+                    f"{len(snapshot.trigger_index)} triggers) in {self.last_reload_ms} ms")
+    
+    def reload_knowledge_base(self) -> bool:
+        """Reload responses.json now; an invalid file keeps the current knowledge base"""
+        start = time.perf_counter()
+        try:
+            snapshot = load_snapshot(self.knowledge_path)
+        except (OSError, KnowledgeBaseError) as e:
+            logger.error(f"Could not reload {self.knowledge_path}: {e}")
+            return False
+        self._knowledge_watcher.mark_loaded()
+        self._swap_knowledge_base(snapshot, (time.perf_counter() - start) * 1000)
+        return True
+    
+    def knowledge_stats(self) -> Dict[str, Any]:
+        """Version and reload statistics of the knowledge base"""
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version if snapshot else None,
+            'source': snapshot.source if snapshot else None,
+            'loaded_at': snapshot.loaded_at if snapshot else None,
+            'triggers': len(snapshot.trigger_index) if snapshot else 0,
+            'reloads': self.knowledge_reloads,
+            'last_reload_ms': self.last_reload_ms,
+            'watcher': self._knowledge_watcher.stats()
+        }
+    
+    def preload(self) -> Dict[str, Any]:
+        """Eagerly load NLP models and the knowledge base, returning timings in ms"""
+        timings = nlp_resources.preload()
+        
+        start = time.perf_counter()
+        self._ensure_knowledge_base()
+        timings['knowledge_base'] = round((time.perf_counter() - start) * 1000, 2)
+        
+        start = time.perf_counter()
+        self.language_detector.detect_batch(['warm up the language profiles'])
+        timings['language_profiles'] = round((time.perf_counter() - start) * 1000, 2)
+        
+        start = time.perf_counter()
+        self.timezone_resolver.resolve('warm up')
+        timings['timezones'] = round((time.perf_counter() - start) * 1000, 2)
+        
+        return timings
+    
+    def _load_knowledge_base(self) -> KnowledgeSnapshot:
         """Load knowledge base from JSON file"""
         try:
-            with open('responses.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_snapshot(self.knowledge_path)
         except FileNotFoundError:
-            logger.warning("responses.json not found, using default knowledge base")
-            return self._get_default_knowledge_base()
+            logger.warning(f"{self.knowledge_path} not found, using default knowledge base")
+        except KnowledgeBaseError as e:
+            logger.error(f"{self.knowledge_path} is invalid, using default knowledge base: {e}")
+        return KnowledgeSnapshot(self._get_default_knowledge_base())
     
     def _get_default_knowledge_base(self) -> Dict[str, Any]:
         """Get default knowledge base if JSON file is not available"""
@@ -75,8 +208,22 @@ class AIService:
             }
         }
     
+    @metrics.timed('analyze')
     def analyze_message(self, message: str) -> Dict[str, Any]:
-        """Analyze user message for intent, sentiment, and entities"""
+        """Analyze user message for intent, sentiment, and entities
+        
+        Results are memoized per message text. The returned dict is a shallow
+        copy of the cached analysis and its values must be treated as read-only.
+        """
+        cached = self.analysis_cache.get(message)
+        if cached is None:
+            cached = self._analyze_message_uncached(message)
+            self.analysis_cache.set(message, cached)
+        metrics.count(intent_counter, cached['intent'])
+        return dict(cached)
+    
+    def _analyze_message_uncached(self, message: str) -> Dict[str, Any]:
+        """Run the full NLP pipeline on a message"""
         analysis = {
             'intent': self._detect_intent(message),
             'sentiment': self._analyze_sentiment(message),
@@ -87,49 +234,45 @@ class AIService:
         }
         return analysis
     
+    def analyze_batch(self, messages: List[str]) -> List[Dict[str, Any]]:
+        """Analyze many messages together
+        
+        Gives the same results as analyze_message for each message. Intent and
+        language are scored in one vectorized pass, duplicates are analyzed once,
+        each message is word-tokenized once and lemmas are shared across the batch.
+        """
+        unique = list(dict.fromkeys(messages))
+        intents = self.detect_intents(unique)
+        languages = self.language_detector.detect_batch(unique)
+        lemmas: Dict[str, str] = {}
+        
+        analyses = {}
+        for message, intent, language in zip(unique, intents, languages):
+            words = word_tokenize(message)
+            analyses[message] = {
+                'intent': intent,
+                'sentiment': self._analyze_sentiment(message),
+                'entities': self._extract_entities(message, words=words),
+                'keywords': self._extract_keywords(message, lemmas=lemmas),
+                'language': language,
+                'complexity': self._assess_complexity(message, words=words)
+            }
+        return [dict(analyses[message]) for message in messages]
+    
+    @metrics.timed('analyze.intent')
     def _detect_intent(self, message: str) -> str:
         """Detect the intent of the user message"""
-        message_lower = message.lower()
-        
-        # Greeting intent
-        if any(word in message_lower for word in ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening']):
-            return 'greeting'
-        
-        # Question intent
-        if any(word in message_lower for word in ['what', 'how', 'why', 'when', 'where', 'who', 'which']):
-            return 'question'
-        
-        # Time intent
-        if any(word in message_lower for word in ['time', 'clock', 'hour', 'minute']):
-            return 'time_query'
-        
-        # Date intent
-        if any(word in message_lower for word in ['date', 'day', 'today', 'tomorrow', 'yesterday']):
-            return 'date_query'
-        
-        # Math intent
-        if any(char in message for char in ['+', '-', '*', '/', '=', '(', ')']):
-            return 'math_query'
-        
-        # Translation intent
-        if any(word in message_lower for word in ['translate', 'in spanish', 'to french', 'in german']):
-            return 'translation_request'
-        
-        # Information request
-        if any(word in message_lower for word in ['tell me about', 'what is', 'who is', 'search for']):
-            return 'information_request'
-        
-        # Personal intent
-        if any(word in message_lower for word in ['my name', 'i am', 'i\'m', 'i live in']):
-            return 'personal_info'
-        
-        # Default to general conversation
-        return 'general_conversation'
+        return self.intent_classifier.classify(message)
+    
+    def detect_intents(self, messages: List[str]) -> List[str]:
+        """Detect the intent of many messages in one vectorized pass"""
+        return self.intent_classifier.classify_batch(messages)
     
+    @metrics.timed('analyze.sentiment')
     def _analyze_sentiment(self, message: str) -> Dict[str, float]:
         """Analyze sentiment of the message"""
         try:
-            blob = TextBlob(message)
+            blob = nlp_resources.get_textblob_class()(message)
             polarity = blob.sentiment.polarity
             subjectivity = blob.sentiment.subjectivity
             
@@ -150,12 +293,14 @@ class AIService:
             logger.error(f"Error analyzing sentiment: {e}")
             return {'polarity': 0.0, 'subjectivity': 0.0, 'category': 'neutral'}
     
-    def _extract_entities(self, message: str) -> List[Dict[str, str]]:
+    @metrics.timed('analyze.entities')
+    def _extract_entities(self, message: str, words: Optional[List[str]] = None) -> List[Dict[str, str]]:
         """Extract named entities from the message"""
         entities = []
         
         # Simple entity extraction (can be enhanced with spaCy or NER models)
-        words = word_tokenize(message)
+        if words is None:
+            words = word_tokenize(message)
         
         # Extract potential names (capitalized words)
         for word in words:
@@ -189,17 +334,32 @@ class AIService:
         
         return entities
     
-    def _extract_keywords(self, message: str) -> List[str]:
-        """Extract important keywords from the message"""
+    @metrics.timed('analyze.keywords')
+    def _extract_keywords(self, message: str, lemmas: Optional[Dict[str, str]] = None) -> List[str]:
+        """Extract important keywords from the message
+        
+        ``lemmas`` is an optional word -> lemma memo shared across a batch.
+        """
         # Tokenize and clean the message
         words = word_tokenize(message.lower())
+        stop_words = self.stop_words
         
         # Remove stop words and short words
-        keywords = [
-            self.lemmatizer.lemmatize(word) 
-            for word in words 
-            if word not in self.stop_words and len(word) > 2
-        ]
+        if lemmas is None:
+            keywords = [
+                self.lemmatizer.lemmatize(word) 
+                for word in words 
+                if word not in stop_words and len(word) > 2
+            ]
+        else:
+            keywords = []
+            for word in words:
+                if word in stop_words or len(word) <= 2:
+                    continue
+                lemma = lemmas.get(word)
+                if lemma is None:
+                    lemma = lemmas[word] = self.lemmatizer.lemmatize(word)
+                keywords.append(lemma)
         
         # Remove duplicates while preserving order
         seen = set()
@@ -211,17 +371,17 @@ class AIService:
         
         return unique_keywords[:10]  # Limit to top 10 keywords
     
+    @metrics.timed('analyze.language')
     def _detect_language(self, message: str) -> str:
         """Detect the language of the message"""
-        try:
-            blob = TextBlob(message)
-            return blob.detect_language()
-        except Exception:
-            return 'en'  # Default to English
+        # Local n-gram model, falls back to English for very short messages
+        return self.language_detector.detect(message)
     
-    def _assess_complexity(self, message: str) -> Dict[str, Any]:
+    @metrics.timed('analyze.complexity')
+    def _assess_complexity(self, message: str, words: Optional[List[str]] = None) -> Dict[str, Any]:
         """Assess the complexity of the message"""
-        words = word_tokenize(message)
+        if words is None:
+            words = word_tokenize(message)
         sentences = sent_tokenize(message)
         
         # Calculate various complexity metrics
@@ -244,18 +404,23 @@ class AIService:
             'level': complexity_level
         }
     
-    def generate_response(self, message: str, context: Dict[str, Any] = None) -> str:
+    @metrics.timed('response')
+    def generate_response(self, message: str, context: Dict[str, Any] = None,
+                          analysis: Optional[Dict[str, Any]] = None) -> str:
         """Generate an intelligent response based on message analysis and context"""
         try:
-            # Analyze the message
-            analysis = self.analyze_message(message)
+            # Analyze the message unless the caller already did
+            if analysis is None:
+                analysis = self.analyze_message(message)
             
             # Get context-aware response
-            response = self._get_contextual_response(message, analysis, context)
+            response, cached = self._get_contextual_response(message, analysis, context)
             
-            # Enhance response with AI if available
-            if self.openai_api_key:
-                enhanced_response = self._enhance_with_openai(message, response, context)
+            # Enhance response with AI if available; computed replies are
+            # exact and cache hits are served as they are
+            intent = analysis['intent']
+            if self.provider_client is not None and intent not in UNENHANCED_INTENTS and not cached:
+                enhanced_response = self._enhance_with_openai(message, response, context, intent=intent)
                 if enhanced_response:
                     response = enhanced_response
             
@@ -265,29 +430,58 @@ class AIService:
             logger.error(f"Error generating response: {e}")
             return "I'm sorry, I encountered an error while processing your message. Please try again."
     
-    def _get_contextual_response(self, message: str, analysis: Dict[str, Any], context: Dict[str, Any] = None) -> str:
-        """Get a contextual response based on analysis"""
+    def generate_response_stream(self, message: str, context: Dict[str, Any] = None,
+                                 analysis: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Generate the response as a sequence of text chunks
+        
+        Joining the chunks gives the generate_response text. This is where a
+        token-streaming provider client plugs in, so callers can start sending
+        before the full reply exists.
+        """
+        response = self.generate_response(message, context, analysis=analysis)
+        words = _STREAM_CHUNK.findall(response)
+        for i in range(0, len(words), STREAM_CHUNK_WORDS):
+            yield ''.join(words[i:i + STREAM_CHUNK_WORDS])
+    
+    @metrics.timed('response.contextual')
+    def _get_contextual_response(self, message: str, analysis: Dict[str, Any],
+                                 context: Dict[str, Any] = None) -> Tuple[str, bool]:
+        """Get a contextual response based on analysis and whether it was a cache hit"""
         intent = analysis['intent']
         sentiment = analysis['sentiment']
         
+        # Deterministic intents are served from the response cache
+        if self.response_cache.cacheable(intent):
+            candidates, cached = self.response_cache.lookup(
+                intent, message,
+                lambda: self._get_response_candidates(intent, message, analysis),
+                version=self.knowledge_version
+            )
+            return random.choice(candidates), cached
+        
         # Handle specific intents
         if intent == 'greeting':
-            return self._get_greeting_response(sentiment)
-        elif intent == 'time_query':
-            return self._get_time_response()
+            return self._get_greeting_response(sentiment), False
+        elif intent == 'translation_request':
+            return self._handle_translation_request(message), False
+        elif intent == 'personal_info':
+            return self._handle_personal_info(message, context), False
+        
+        return random.choice(self._get_response_candidates(intent, message, analysis)), False
+    
+    def _get_response_candidates(self, intent: str, message: str, analysis: Dict[str, Any]) -> List[str]:
+        """Get the replies to choose from for intents that depend only on the message"""
+        if intent == 'time_query':
+            return [self._get_time_response(message)]
         elif intent == 'date_query':
-            return self._get_date_response()
+            return [self._get_date_response()]
         elif intent == 'math_query':
-            return self._solve_math_problem(message)
-        elif intent == 'translation_request':
-            return self._handle_translation_request(message)
+            return [self._solve_math_problem(message)]
         elif intent == 'information_request':
-            return self._get_information_response(message, analysis)
-        elif intent == 'personal_info':
-            return self._handle_personal_info(message, context)
+            return self._get_information_candidates(message, analysis)
         
         # Default to knowledge base lookup
-        return self._get_knowledge_base_response(message, analysis)
+        return self._get_knowledge_base_candidates(message, analysis)
     
     def _get_greeting_response(self, sentiment: Dict[str, Any]) -> str:
         """Get appropriate greeting response based on sentiment"""
@@ -312,8 +506,13 @@ class AIService:
         
         return random.choice(greetings)
     
-    def _get_time_response(self) -> str:
-        """Get current time response"""
+    def _get_time_response(self, message: Optional[str] = None) -> str:
+        """Get current time response, for the location in the message if it names one"""
+        if message:
+            match = self.timezone_resolver.find_in_message(message)
+            if match:
+                return self._format_time_in_zone(*match)
+        
         now = datetime.now()
         time_str = now.strftime("%I:%M %p")
         date_str = now.strftime("%A, %B %d, %Y")
@@ -330,23 +529,15 @@ class AIService:
     def _solve_math_problem(self, message: str) -> str:
         """Solve mathematical expressions"""
         try:
-            # Clean the message to extract mathematical expression
-            import re
-            
-            # Remove common words and keep only math expression
-            clean_message = re.sub(r'[^0-9+\-*/()^.\s]', '', message)
-            clean_message = clean_message.replace('^', '**')  # Convert ^ to **
-            
-            # Evaluate the expression safely
-            result = eval(clean_message)
-            
-            if isinstance(result, (int, float)):
-                if result == int(result):
-                    result = int(result)
-                return f"The answer is {result}. 🧮"
-            else:
-                return "I can only solve basic mathematical expressions."
-                
+            # Keep only the math expression and evaluate it under size and time limits
+            result = self.math_evaluator.evaluate(extract_expression(message))
+            if result == int(result):
+                result = int(result)
+            return f"The answer is {result}. 🧮"
+        
+        except MathLimitError as e:
+            logger.info(f"Refused expensive math expression: {e}")
+            return "That calculation is too large for me to work out. Please try smaller numbers. 🧮"
         except Exception as e:
             logger.error(f"Error solving math problem: {e}")
             return "I'm sorry, I couldn't solve that mathematical expression. Please try a simpler equation."
@@ -358,106 +549,120 @@ class AIService:
     
     def _get_information_response(self, message: str, analysis: Dict[str, Any]) -> str:
         """Get information response based on keywords"""
+        return random.choice(self._get_information_candidates(message, analysis))
+    
+    def _get_information_candidates(self, message: str, analysis: Dict[str, Any]) -> List[str]:
+        """Get the information replies to choose from"""
         keywords = analysis['keywords']
         
         # Search knowledge base
         for keyword in keywords:
-            response = self._search_knowledge_base(keyword)
-            if response:
-                return response
+            response_list = self.trigger_index.search_keyword(keyword)
+            if response_list:
+                return response_list
         
         # If no specific information found, provide helpful response
-        return f"I'd be happy to help you learn about that! Could you provide more specific details about what you'd like to know? 🤔"
+        return [f"I'd be happy to help you learn about that! Could you provide more specific details about what you'd like to know? 🤔"]
     
     def _handle_personal_info(self, message: str, context: Dict[str, Any] = None) -> str:
         """Handle personal information updates"""
-        message_lower = message.lower()
-        
-        # Extract name
-        if 'my name is' in message_lower or 'i\'m called' in message_lower:
-            import re
-            name_match = re.search(r'(?:my name is|i\'m called)\s+([a-zA-Z]+)', message, re.IGNORECASE)
-            if name_match:
-                name = name_match.group(1)
-                if context:
-                    context['user_name'] = name
-                return f"Nice to meet you, {name}! I'll remember your name. 😊"
-        
-        # Extract age
-        if any(word in message_lower for word in ['years old', 'age']):
-            import re
-            age_match = re.search(r'(\d+)\s*years?\s*old', message, re.IGNORECASE)
-            if age_match:
-                age = int(age_match.group(1))
-                if context:
-                    context['user_age'] = age
-                return f"Got it! You're {age} years old. 🎂"
+        info = extract_personal_info(message)
+        
+        # Only a clear introduction is answered by name
+        if info.get('name_explicit'):
+            name = info['name']
+            if context:
+                context['user_name'] = name
+            return f"Nice to meet you, {name}! I'll remember your name. 😊"
+        
+        if 'age' in info:
+            age = info['age']
+            if context:
+                context['user_age'] = age
+            return f"Got it! You're {age} years old. 🎂"
         
         return "I'm here to help! What would you like to know? 😊"
     
     def _search_knowledge_base(self, keyword: str) -> Optional[str]:
         """Search knowledge base for information"""
-        # Search in loaded knowledge base
-        for category, responses in self.knowledge_base.items():
-            for trigger, response_list in responses.items():
-                if keyword.lower() in trigger.lower():
-                    return random.choice(response_list)
+        # First trigger (in knowledge base order) containing the keyword
+        response_list = self.trigger_index.search_keyword(keyword)
+        if response_list:
+            return random.choice(response_list)
         
         return None
     
     def _get_knowledge_base_response(self, message: str, analysis: Dict[str, Any]) -> str:
         """Get response from knowledge base"""
-        message_lower = message.lower()
-        
-        # Search for exact matches
-        for category, responses in self.knowledge_base.items():
-            for trigger, response_list in responses.items():
-                if trigger.lower() in message_lower:
-                    return random.choice(response_list)
+        return random.choice(self._get_knowledge_base_candidates(message, analysis))
+    
+    def _get_knowledge_base_candidates(self, message: str, analysis: Dict[str, Any]) -> List[str]:
+        """Get the knowledge base replies to choose from"""
+        # Search for exact matches in a single pass over the message
+        response_list = self.trigger_index.first_match(message)
+        if response_list:
+            return response_list
         
         # If no exact match, try keyword matching
         keywords = analysis['keywords']
         for keyword in keywords:
-            response = self._search_knowledge_base(keyword)
-            if response:
-                return response
+            response_list = self.trigger_index.search_keyword(keyword)
+            if response_list:
+                return response_list
         
         # Default fallback response
-        fallback_responses = [
+        return [
             "That's interesting! Tell me more about it. 😊",
             "I'd love to learn more about that! What would you like to know? 🤔",
             "That's a great topic! How can I help you explore it further? 🌟",
             "Interesting! What aspects would you like to discuss? 💭"
         ]
-        
-        return random.choice(fallback_responses)
     
-    def _enhance_with_openai(self, message: str, current_response: str, context: Dict[str, Any] = None) -> Optional[str]:
-        """Enhance response using OpenAI API"""
-        if not self.openai_api_key:
+    @metrics.timed('response.enhance')
+    def _enhance_with_openai(self, message: str, current_response: str, context: Dict[str, Any] = None,
+                             intent: Optional[str] = None) -> Optional[str]:
+        """Enhance response using the configured AI providers
+        
+        Bounded by PROVIDER_DEADLINE; on timeout or provider failure the
+        rule-based response is kept. Concurrent calls for the same message and
+        intent share one provider request, whichever draft each one picked.
+        """
+        if self.provider_client is None:
             return None
         
         try:
-            # This would integrate with OpenAI API for enhanced responses
-            # For now, return the current response
-            return current_response
+            prompt = f"User message: {message}\nDraft reply: {current_response}"
+            if context and context.get('topics'):
+                prompt = f"Recent topics: {', '.join(context['topics'][-5:])}\n{prompt}"
+            enhanced = self.provider_client.complete(
+                prompt, system=ENHANCE_SYSTEM_PROMPT, key=(intent, normalize_message(message))
+            )
+            return enhanced or current_response
         except Exception as e:
             logger.error(f"Error enhancing with OpenAI: {e}")
             return current_response
     
     def get_time_in_timezone(self, timezone_name: str) -> str:
-        """Get current time in specified timezone"""
+        """Get current time in specified timezone, city or country"""
         try:
-            tz = pytz.timezone(timezone_name)
-            now = datetime.now(tz)
-            time_str = now.strftime("%I:%M %p")
-            date_str = now.strftime("%A, %B %d, %Y")
-            
-            return f"In {timezone_name}, it's {time_str} on {date_str}. ⏰"
+            match = self.timezone_resolver.resolve(timezone_name)
+            if match is None:
+                return f"Sorry, I couldn't get the time for {timezone_name}."
+            return self._format_time_in_zone(*match)
         except Exception as e:
             logger.error(f"Error getting timezone time: {e}")
             return f"Sorry, I couldn't get the time for {timezone_name}."
     
+    def _format_time_in_zone(self, alias: str, zone_name: str, match: str = EXACT) -> str:
+        """Describe the current time for a resolved location, hedging typo matches"""
+        now = datetime.now(self.timezone_resolver.get_zone(zone_name))
+        time_str = now.strftime("%I:%M %p")
+        date_str = now.strftime("%A, %B %d, %Y")
+        
+        if match == APPROXIMATE:
+            return f"I think you mean {location_label(alias)}. There it's {time_str} on {date_str}. ⏰"
+        return f"In {location_label(alias)}, it's {time_str} on {date_str}. ⏰"
+    
     def get_weather_info(self, location: str) -> str:
         """Get weather information for a location"""
         # This would integrate with a weather API
@@ -467,19 +672,14 @@ class AIService:
         """Get response for calculation requests"""
         try:
             # Clean and evaluate mathematical expression
-            import re
-            clean_expr = re.sub(r'[^0-9+\-*/()^.\s]', '', expression)
-            clean_expr = clean_expr.replace('^', '**')
-            
-            result = eval(clean_expr)
-            
-            if isinstance(result, (int, float)):
-                if result == int(result):
-                    result = int(result)
-                return f"The result is {result}. 🧮"
-            else:
-                return "I can only handle basic mathematical calculations."
-                
+            result = self.math_evaluator.evaluate(extract_expression(expression))
+            if result == int(result):
+                result = int(result)
+            return f"The result is {result}. 🧮"
+        
+        except MathLimitError as e:
+            logger.info(f"Refused expensive calculation: {e}")
+            return "That calculation is too large for me to work out. Please try smaller numbers. 🧮"
         except Exception as e:
             logger.error(f"Error in calculation: {e}")
             return "I'm sorry, I couldn't calculate that. Please try a simpler expression."
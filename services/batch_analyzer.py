@@ -0,0 +1,170 @@
+"""
+Batch Analyzer for offline message scoring
+Streams message analyses in input order, fanning chunks out to a process pool
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# AIService instance owned by each pool worker process
+_worker_service = None
+
+
+def _init_worker():
+    """Build the worker's AIService and load its NLP models once"""
+    global _worker_service
+    from services import nlp_resources
+    from services.ai_service import AIService
+    _worker_service = AIService()
+    nlp_resources.preload()
+
+
+def _analyze_chunk(messages: List[str]) -> List[Dict[str, Any]]:
+    """Analyze one chunk inside a pool worker"""
+    return _worker_service.analyze_batch(messages)
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to ``size`` items without materializing the input"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchAnalyzer:
+    """Analyzes large message streams with bounded memory
+
+    Input is consumed lazily in chunks and at most ``max_pending`` chunks are in
+    flight, so memory stays flat however many messages are streamed through.
+    Inputs that fit in a single chunk are analyzed in-process. A chunk that
+    fails yields None for each of its messages instead of ending the stream.
+    """
+
+    def __init__(self, ai_service, workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        """Initialize the analyzer; the process pool starts on first use"""
+        self.ai_service = ai_service
+        self.workers = workers if workers is not None else int(
+            os.getenv('ANALYZE_BATCH_WORKERS', os.cpu_count() or 1)
+        )
+        self.chunk_size = max(1, chunk_size or int(os.getenv('ANALYZE_BATCH_CHUNK_SIZE', 256)))
+        self.max_pending = max(1, max_pending or self.workers * 2)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        atexit.register(self.close)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the pool, restarting it in forked worker processes"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Spawn rather than fork: the web process runs background threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+                self._pid = os.getpid()
+                logger.info(f"Started batch analysis pool with {self.workers} workers")
+            return self._executor
+
+    def analyze(self, messages: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Analyze a list of messages and return the analyses in order"""
+        return list(self.iter_analyze(messages))
+
+    def iter_analyze(self, messages: Iterable[str]) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield one analysis per message, in input order; None where its chunk failed"""
+        chunks = chunked(messages, self.chunk_size)
+        first = next(chunks, None)
+        if first is None:
+            return
+        second = next(chunks, None)
+
+        if second is None or self.workers <= 1:
+            for chunk in ([first] if second is None else [first, second]):
+                yield from self._analyze_local(chunk)
+            for chunk in chunks:
+                yield from self._analyze_local(chunk)
+            return
+
+        executor = self._get_executor()
+        pending = deque([self._submit(executor, first), self._submit(executor, second)])
+        try:
+            for chunk in chunks:
+                if len(pending) >= self.max_pending:
+                    yield from self._results(*pending.popleft())
+                pending.append(self._submit(executor, chunk))
+            while pending:
+                yield from self._results(*pending.popleft())
+        finally:
+            # A consumer that stops early (e.g. a dropped HTTP client) cancels queued work
+            for future, _ in pending:
+                future.cancel()
+
+    def _analyze_local(self, chunk: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Analyze a chunk in this process"""
+        try:
+            return self.ai_service.analyze_batch(chunk)
+        except Exception as e:
+            logger.error(f"Batch analysis of {len(chunk)} messages failed: {e}")
+            return [None] * len(chunk)
+
+    @staticmethod
+    def _submit(executor: ProcessPoolExecutor, chunk: List[str]) -> Tuple[Future, int]:
+        """Hand a chunk to the pool; a pool that cannot take it gives a failed future"""
+        try:
+            future = executor.submit(_analyze_chunk, chunk)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        return future, len(chunk)
+
+    def _results(self, future: Future, size: int) -> List[Optional[Dict[str, Any]]]:
+        """Analyses of a submitted chunk, or None for each message if it failed"""
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Batch analysis of {size} messages failed: {e}")
+            if isinstance(e, BrokenProcessPool):
+                # A worker died; the next batch starts a fresh pool
+                self.close()
+            return [None] * size
+
+    def close(self):
+        """Shut the process pool down"""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def parse_batch_item(item: Any) -> Tuple[Any, Optional[str], Optional[str]]:
+    """Normalize a batch input item to an (id, message, error) triple
+
+    Items are either message strings or objects with a string ``message`` (or
+    ``text``) and an optional ``id`` that is echoed back with the analysis.
+    Anything else gets an error instead of a message.
+    """
+    if isinstance(item, str):
+        return None, item, None
+    if isinstance(item, dict):
+        message = item.get('message', item.get('text'))
+        if isinstance(message, str):
+            return item.get('id'), message, None
+        return item.get('id'), None, 'message must be a string'
+    return None, None, 'item must be a string or an object with a message'
+
@@ -0,0 +1,340 @@
+"""
+Chat Context for conversation state
+Compact per-chat state with fixed-size array histories, integer-coded intents
+and sentiments and epoch timestamps
+"""
+
+import sys
+import time
+from array import array
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.intent_classifier import DEFAULT_INTENT, INTENT_CODES, INTENTS
+
+SENTIMENTS = ['negative', 'neutral', 'positive']
+SENTIMENT_CODES = {sentiment: code for code, sentiment in enumerate(SENTIMENTS)}
+
+# Ring sizes; older entries fall off as new ones arrive. The counters carry
+# the full-conversation statistics.
+HISTORY_SIZE = 50
+FLOW_SIZE = 50
+MAX_TOPICS = 10
+MAX_ENTITIES = 10
+
+# Version tag of the serialized form stored in ConversationContext.context_data.
+# Versions 3 and 4 store intent and sentiment names, so reordering or extending
+# INTENTS never relabels stored history; version 2 stored the integer codes.
+# Version 4 dropped the message previews from the flow.
+FORMAT_VERSION = 4
+
+
+def _intent_code(intent: Optional[str]) -> int:
+    return INTENT_CODES.get(intent, INTENT_CODES[DEFAULT_INTENT])
+
+
+def _sentiment_code(sentiment: Optional[str]) -> int:
+    return SENTIMENT_CODES.get(sentiment, SENTIMENT_CODES['neutral'])
+
+
+def _stored_code(code: Any, names: List[str], default: int) -> int:
+    """Validate an integer code read from a version 2 context"""
+    return code if isinstance(code, int) and 0 <= code < len(names) else default
+
+
+def _stored_intent_code(code: Any) -> int:
+    return _stored_code(code, INTENTS, INTENT_CODES[DEFAULT_INTENT])
+
+
+def _stored_sentiment_code(code: Any) -> int:
+    return _stored_code(code, SENTIMENTS, SENTIMENT_CODES['neutral'])
+
+
+def isoformat(timestamp: Optional[float]) -> Optional[str]:
+    """ISO string for an epoch timestamp"""
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+def _epoch(value: Any) -> Optional[float]:
+    """Epoch seconds from a stored float or a legacy ISO timestamp"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class ChatContext:
+    """State of one conversation
+
+    Intent and sentiment histories are signed-byte arrays of codes (see
+    INTENTS and SENTIMENTS). The flow of the last FLOW_SIZE messages is two
+    parallel arrays: epoch timestamps and one code per message combining its
+    intent and sentiment, -1 for bot replies. Entities are ``(text, type,
+    confidence)`` tuples and topic and entity strings are interned, since the
+    same places, names and keywords recur across chats. Full-history
+    frequencies are kept as counters so the bounded histories lose nothing the
+    summary needs. A full 50-turn context takes about 2.5 KB.
+
+    ``get``/``[]`` give dict-style access to the fields AIService reads, so a
+    plain dict and a ChatContext can be passed interchangeably.
+    """
+
+    __slots__ = (
+        'user_id', 'chat_id', 'start_time', 'last_interaction',
+        'message_count', 'user_message_count', 'bot_message_count',
+        'topics', 'entities', 'intent_history', 'sentiment_history',
+        'intent_counts', 'sentiment_counts', 'flow_times', 'flow_codes',
+        'last_intent', 'last_sentiment', 'last_entities', 'user_name', 'user_age'
+    )
+
+    def __init__(self, user_id: Optional[int] = None, chat_id: Optional[str] = None):
+        """Start an empty context for a chat"""
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.start_time = time.time()
+        self.last_interaction: Optional[float] = None
+        self.message_count = 0
+        self.user_message_count = 0
+        self.bot_message_count = 0
+        self.topics: List[str] = []
+        self.entities: List[Tuple[str, str, Any]] = []
+        self.intent_history = array('b')
+        self.sentiment_history = array('b')
+        self.intent_counts = array('I', bytes(4 * len(INTENTS)))
+        self.sentiment_counts = array('I', bytes(4 * len(SENTIMENTS)))
+        self.flow_times = array('d')
+        self.flow_codes = array('b')
+        self.last_intent = -1
+        self.last_sentiment: Optional[Dict[str, Any]] = None
+        self.last_entities: List[Dict[str, Any]] = []
+        self.user_name: Optional[str] = None
+        self.user_age: Optional[int] = None
+
+    # Dict-style access for code that also accepts plain dict contexts
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if key == 'last_intent':
+            value = self.intent
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    @property
+    def intent(self) -> Optional[str]:
+        """Intent of the latest user message"""
+        return INTENTS[self.last_intent] if self.last_intent >= 0 else None
+
+    @property
+    def sentiment(self) -> Optional[str]:
+        """Sentiment category of the latest user message"""
+        return self.last_sentiment.get('category') if self.last_sentiment else None
+
+    def intents(self) -> List[str]:
+        """Recent intents, oldest first"""
+        return [INTENTS[code] for code in self.intent_history]
+
+    def sentiments(self) -> List[str]:
+        """Recent sentiment categories, oldest first"""
+        return [SENTIMENTS[code] for code in self.sentiment_history]
+
+    def intent_frequency(self) -> Dict[str, int]:
+        return {INTENTS[code]: count for code, count in enumerate(self.intent_counts) if count}
+
+    def sentiment_frequency(self) -> Dict[str, int]:
+        return {SENTIMENTS[code]: count for code, count in enumerate(self.sentiment_counts) if count}
+
+    def record_user_message(self, message: str, analysis: Dict[str, Any]):
+        """Count a user message and fold its analysis into the context"""
+        now = time.time()
+        self.message_count += 1
+        self.user_message_count += 1
+
+        intent = _intent_code(analysis['intent'])
+        sentiment = _sentiment_code(analysis['sentiment'].get('category'))
+        self.last_intent = intent
+        self.last_sentiment = analysis['sentiment']
+        self.last_entities = analysis['entities']
+
+        self._push(self.intent_history, intent)
+        self._push(self.sentiment_history, sentiment)
+        self.intent_counts[intent] += 1
+        self.sentiment_counts[sentiment] += 1
+
+        # Most recent topics last, without duplicates
+        for keyword in analysis['keywords']:
+            if keyword in self.topics:
+                self.topics.remove(keyword)
+            self.topics.append(sys.intern(keyword))
+        del self.topics[:-MAX_TOPICS]
+
+        if analysis['entities']:
+            self._add_entities(analysis['entities'])
+
+        self._push_flow(now, intent, sentiment)
+        self.last_interaction = now
+
+    def record_bot_message(self, message: str):
+        """Count a bot reply"""
+        now = time.time()
+        self.message_count += 1
+        self.bot_message_count += 1
+        self._push_flow(now, -1, -1)
+        self.last_interaction = now
+
+    @staticmethod
+    def _push(ring, item, size: int = HISTORY_SIZE):
+        """Append to a bounded history, dropping the oldest entry when full"""
+        ring.append(item)
+        if len(ring) > size:
+            del ring[0]
+
+    def _push_flow(self, timestamp: float, intent: int, sentiment: int):
+        """Add a message to the flow; bot replies have no intent or sentiment (-1)"""
+        self._push(self.flow_times, timestamp, FLOW_SIZE)
+        self._push(self.flow_codes, intent * len(SENTIMENTS) + sentiment if intent >= 0 else -1, FLOW_SIZE)
+
+    def flow(self) -> List[Tuple[float, str, Optional[str], Optional[str]]]:
+        """Recent messages as ``(timestamp, 'user' | 'bot', intent, sentiment)``, oldest first"""
+        return [
+            (timestamp, 'user', INTENTS[code // len(SENTIMENTS)], SENTIMENTS[code % len(SENTIMENTS)]) if code >= 0
+            else (timestamp, 'bot', None, None)
+            for timestamp, code in zip(self.flow_times, self.flow_codes)
+        ]
+
+    def _add_entities(self, entities: List[Dict[str, Any]]):
+        """Append entities not seen yet, keeping the latest MAX_ENTITIES"""
+        seen = {(text, kind) for text, kind, _ in self.entities}
+        for entity in entities:
+            key = (entity['text'], entity['type'])
+            if key not in seen:
+                seen.add(key)
+                self.entities.append((sys.intern(entity['text']), sys.intern(entity['type']),
+                                      entity.get('confidence')))
+        del self.entities[:-MAX_ENTITIES]
+
+    def entity_list(self) -> List[Dict[str, Any]]:
+        """Entities mentioned in the chat as ``{text, type, confidence}`` dicts, oldest first"""
+        return [{'text': text, 'type': kind, 'confidence': confidence} for text, kind, confidence in self.entities]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready form for ConversationContext.context_data
+
+        Intents and sentiments are stored by name; the integer codes are an
+        in-process detail.
+        """
+        return {
+            'format': FORMAT_VERSION,
+            'user_id': self.user_id,
+            'chat_id': self.chat_id,
+            'start_time': self.start_time,
+            'last_interaction': self.last_interaction,
+            'counts': [self.message_count, self.user_message_count, self.bot_message_count],
+            'topics': self.topics,
+            'entities': self.entity_list(),
+            'intent_history': self.intents(),
+            'sentiment_history': self.sentiments(),
+            'intent_counts': self.intent_frequency(),
+            'sentiment_counts': self.sentiment_frequency(),
+            'flow': [list(entry) for entry in self.flow()],
+            'last_intent': self.intent,
+            'last_sentiment': self.last_sentiment,
+            'last_entities': self.last_entities,
+            'user_name': self.user_name,
+            'user_age': self.user_age
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChatContext':
+        """Rebuild a context from to_dict output, a version 2 context or a legacy dict context"""
+        context = cls(data.get('user_id'), data.get('chat_id'))
+        version = data.get('format')
+        if version in (3, FORMAT_VERSION):
+            context._load(data, _intent_code, _sentiment_code)
+        elif version == 2:
+            # Codes were written against the INTENTS order of that release
+            context._load(data, _stored_intent_code, _stored_sentiment_code)
+        else:
+            context._load_legacy(data)
+        return context
+
+    def _load(self, data: Dict[str, Any], intent_code: Callable[[Any], int],
+              sentiment_code: Callable[[Any], int]):
+        """Load a serialized context whose intents and sentiments map through the given functions"""
+        self.start_time = data['start_time']
+        self.last_interaction = data.get('last_interaction')
+        self.message_count, self.user_message_count, self.bot_message_count = data['counts']
+        self.topics = [sys.intern(topic) for topic in data.get('topics') or []]
+        self._add_entities(data.get('entities') or [])
+        self.intent_history = array('b', [intent_code(intent) for intent in data['intent_history'][-HISTORY_SIZE:]])
+        self.sentiment_history = array('b', [
+            sentiment_code(sentiment) for sentiment in data['sentiment_history'][-HISTORY_SIZE:]
+        ])
+        self._load_counts(self.intent_counts, data['intent_counts'], intent_code)
+        self._load_counts(self.sentiment_counts, data['sentiment_counts'], sentiment_code)
+        # Entries before version 4 also carry a message preview, which is skipped
+        for timestamp, sender, intent, sentiment, *_ in (data.get('flow') or [])[-FLOW_SIZE:]:
+            if sender in (1, 'bot'):
+                self._push_flow(timestamp, -1, -1)
+            else:
+                self._push_flow(timestamp, intent_code(intent), sentiment_code(sentiment))
+        last_intent = data.get('last_intent')
+        self.last_intent = -1 if last_intent in (None, -1) else intent_code(last_intent)
+        self.last_sentiment = data.get('last_sentiment')
+        self.last_entities = data.get('last_entities') or []
+        self.user_name = data.get('user_name')
+        self.user_age = data.get('user_age')
+
+    @staticmethod
+    def _load_counts(counts: array, stored: Any, code: Callable[[Any], int]):
+        """Add stored counts, a name -> count dict or a list indexed by code"""
+        items = stored.items() if isinstance(stored, dict) else enumerate(stored)
+        for key, count in items:
+            counts[code(key)] += count
+
+    def _load_legacy(self, data: Dict[str, Any]):
+        """Convert the dict-of-lists context stored before FORMAT_VERSION 2"""
+        self.start_time = _epoch(data.get('start_time')) or self.start_time
+        self.last_interaction = _epoch(data.get('last_interaction'))
+        self.message_count = data.get('message_count', 0)
+        self.user_message_count = data.get('user_message_count', 0)
+        self.bot_message_count = data.get('bot_message_count', 0)
+        self.topics = [sys.intern(topic) for topic in (data.get('topics') or [])[-MAX_TOPICS:]]
+        self._add_entities(data.get('entities') or [])
+
+        intents = [_intent_code(intent) for intent in data.get('intent_history') or []]
+        sentiments = [_sentiment_code(sentiment) for sentiment in data.get('sentiment_history') or []]
+        self.intent_history = array('b', intents[-HISTORY_SIZE:])
+        self.sentiment_history = array('b', sentiments[-HISTORY_SIZE:])
+        for code in intents:
+            self.intent_counts[code] += 1
+        for code in sentiments:
+            self.sentiment_counts[code] += 1
+
+        for entry in (data.get('conversation_flow') or [])[-FLOW_SIZE:]:
+            timestamp = _epoch(entry.get('timestamp')) or self.start_time
+            if entry.get('sender') == 'bot':
+                self._push_flow(timestamp, -1, -1)
+            else:
+                self._push_flow(timestamp, _intent_code(entry.get('intent')),
+                                _sentiment_code(entry.get('sentiment')))
+
+        if data.get('last_intent'):
+            self.last_intent = _intent_code(data['last_intent'])
+        self.last_sentiment = data.get('last_sentiment')
+        self.last_entities = data.get('last_entities') or []
+        self.user_name = data.get('user_name')
+        self.user_age = data.get('user_age')
+
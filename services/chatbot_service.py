@@ -4,157 +4,160 @@ Orchestrates AI responses and conversation management
 """
 
 import logging
+import os
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
 from services.ai_service import AIService
+from services.chat_context import ChatContext, isoformat
+from services.context_store import ContextStore, BoundedContextStore
+from services.personal_info import extract_personal_info
 
 logger = logging.getLogger(__name__)
 
 class IntelligentChatbotService:
     """Main service for intelligent chatbot functionality"""
     
-    def __init__(self, ai_service: AIService):
-        """Initialize the chatbot service"""
+    def __init__(self, ai_service: AIService, db_service=None,
+                 context_store: Optional[ContextStore] = None,
+                 memory_store: Optional[ContextStore] = None,
+                 write_behind: Optional[Callable[..., None]] = None):
+        """Initialize the chatbot service
+        
+        When a ``db_service`` is given, contexts and user memories evicted from
+        the bounded stores are written through to the database and reloaded on
+        the next message. ``write_behind`` (e.g. MessageWriter.submit) moves
+        those writes off the request thread.
+        """
         self.ai_service = ai_service
-        self.conversation_contexts = {}
-        self.user_memories = {}
+        self.db_service = db_service
+        self.write_behind = write_behind
+        
+        max_mb = float(os.getenv('CONTEXT_STORE_MAX_MB', 512))
+        self.conversation_contexts = context_store or BoundedContextStore(
+            max_entries=int(os.getenv('CONTEXT_STORE_MAX_ENTRIES', 100000)),
+            ttl_seconds=float(os.getenv('CONTEXT_STORE_TTL', 3600)),
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+            on_evict=self._persist_context if db_service else None,
+            loader=self._load_context if db_service else None,
+            write_behind=write_behind
+        )
+        # A user memory keeps up to 100 conversation summaries, so far fewer fit
+        self.user_memories = memory_store or BoundedContextStore(
+            max_entries=int(os.getenv('USER_MEMORY_MAX_ENTRIES', 10000)),
+            ttl_seconds=float(os.getenv('CONTEXT_STORE_TTL', 3600)),
+            on_evict=self._persist_user_memory if db_service else None,
+            loader=self._load_user_memory if db_service else None,
+            write_behind=write_behind
+        )
         
     def get_response(self, user_message: str, user_id: Optional[int] = None, chat_id: Optional[str] = None) -> Dict[str, Any]:
         """Get intelligent response for user message"""
         try:
-            # Get or create conversation context
-            context_key = f"{user_id}_{chat_id}" if user_id and chat_id else "anonymous"
-            context = self.conversation_contexts.get(context_key, {})
-            
-            # Update context with user message
-            self._update_conversation_context(context, user_message, user_id, chat_id)
+            context_key, context, analysis = self._begin_turn(user_message, user_id, chat_id)
             
             # Generate intelligent response
-            response_text = self.ai_service.generate_response(user_message, context)
-            
-            # Update context with bot response
-            self._update_conversation_context(context, response_text, user_id, chat_id, is_bot=True)
+            response_text = self.ai_service.generate_response(user_message, context, analysis=analysis)
             
-            # Store updated context
-            self.conversation_contexts[context_key] = context
+            return self._finish_turn(context_key, context, user_message, response_text, user_id, chat_id)
             
-            # Update user memory if user_id is provided
-            if user_id:
-                self._update_user_memory(user_id, user_message, response_text, context)
-            
-            # Prepare response object
-            response = {
-                'text': response_text,
-                'timestamp': datetime.now().isoformat(),
-                'context': {
-                    'intent': context.get('last_intent'),
-                    'sentiment': context.get('last_sentiment'),
-                    'entities': context.get('last_entities', []),
-                    'conversation_length': context.get('message_count', 0)
-                }
+        except Exception as e:
+            logger.error(f"Error getting response: {e}")
+            return self._error_response(e)
+    
+    def stream_response(self, user_message: str, user_id: Optional[int] = None,
+                        chat_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Get the response for a user message as a stream of events
+        
+        Yields ``('context', ...)`` as soon as the message is analyzed, then one
+        ``('delta', {'text': ...})`` per response chunk and finally
+        ``('response', ...)`` with the same payload get_response returns.
+        """
+        try:
+            context_key, context, analysis = self._begin_turn(user_message, user_id, chat_id)
+            yield 'context', {
+                'intent': analysis.get('intent'),
+                'sentiment': analysis.get('sentiment', {}).get('category'),
+                'entities': analysis.get('entities', []),
+                'language': analysis.get('language')
             }
             
-            return response
+            chunks = []
+            for chunk in self.ai_service.generate_response_stream(user_message, context, analysis=analysis):
+                chunks.append(chunk)
+                yield 'delta', {'text': chunk}
+            
+            yield 'response', self._finish_turn(context_key, context, user_message, ''.join(chunks), user_id, chat_id)
             
         except Exception as e:
-            logger.error(f"Error getting response: {e}")
-            return {
-                'text': "I'm sorry, I encountered an error while processing your message. Please try again.",
-                'timestamp': datetime.now().isoformat(),
-                'context': {'error': str(e)}
+            logger.error(f"Error streaming response: {e}")
+            yield 'response', self._error_response(e)
+    
+    def _begin_turn(self, user_message: str, user_id: Optional[int],
+                    chat_id: Optional[str]) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """Load the conversation context and record the analyzed user message"""
+        # Get or create conversation context
+        context_key = f"{user_id}_{chat_id}" if user_id and chat_id else "anonymous"
+        context = self.conversation_contexts.get(context_key)
+        if context is None:
+            context = ChatContext(user_id, chat_id)
+        
+        # Analyze the message once for the whole pipeline
+        analysis = self.ai_service.analyze_message(user_message)
+        
+        # Update context with user message
+        self._update_conversation_context(context, user_message, analysis=analysis)
+        return context_key, context, analysis
+    
+    def _finish_turn(self, context_key: str, context: Dict[str, Any], user_message: str, response_text: str,
+                     user_id: Optional[int], chat_id: Optional[str]) -> Dict[str, Any]:
+        """Record the bot reply, store the context and build the response object"""
+        # Update context with bot response
+        self._update_conversation_context(context, response_text, is_bot=True)
+        
+        # Store updated context
+        self.conversation_contexts.set(context_key, context)
+        
+        # Update user memory if user_id is provided
+        if user_id:
+            self._update_user_memory(user_id, user_message, response_text, context)
+        
+        # Prepare response object
+        return {
+            'text': response_text,
+            'timestamp': datetime.now().isoformat(),
+            'context': {
+                'intent': context.intent,
+                'sentiment': context.last_sentiment,
+                'entities': context.last_entities,
+                'conversation_length': context.message_count
             }
+        }
+    
+    @staticmethod
+    def _error_response(error: Exception) -> Dict[str, Any]:
+        """Response object returned when the pipeline fails"""
+        return {
+            'text': "I'm sorry, I encountered an error while processing your message. Please try again.",
+            'timestamp': datetime.now().isoformat(),
+            'context': {'error': str(error)}
+        }
     
-    def _update_conversation_context(self, context: Dict[str, Any], message: str, user_id: Optional[int] = None, 
-                                   chat_id: Optional[str] = None, is_bot: bool = False):
+    def _update_conversation_context(self, context: ChatContext, message: str, is_bot: bool = False,
+                                   analysis: Optional[Dict[str, Any]] = None):
         """Update conversation context with new message"""
-        # Initialize context if empty
-        if not context:
-            context.update({
-                'user_id': user_id,
-                'chat_id': chat_id,
-                'start_time': datetime.now().isoformat(),
-                'message_count': 0,
-                'user_message_count': 0,
-                'bot_message_count': 0,
-                'topics': [],
-                'entities': [],
-                'sentiment_history': [],
-                'intent_history': [],
-                'last_interaction': None
-            })
-        
-        # Update message counts
-        context['message_count'] += 1
         if is_bot:
-            context['bot_message_count'] += 1
-        else:
-            context['user_message_count'] += 1
-        
-        # Analyze message if it's from user
-        if not is_bot:
+            context.record_bot_message(message)
+            return
+        if analysis is None:
             analysis = self.ai_service.analyze_message(message)
-            
-            # Update context with analysis
-            context['last_intent'] = analysis['intent']
-            context['last_sentiment'] = analysis['sentiment']
-            context['last_entities'] = analysis['entities']
-            
-            # Add to history
-            context['intent_history'].append(analysis['intent'])
-            context['sentiment_history'].append(analysis['sentiment']['category'])
-            
-            # Extract and store topics
-            keywords = analysis['keywords']
-            if keywords:
-                context['topics'].extend(keywords)
-                # Keep only unique topics
-                context['topics'] = list(set(context['topics']))[-10:]  # Keep last 10 topics
-            
-            # Extract and store entities
-            if analysis['entities']:
-                context['entities'].extend(analysis['entities'])
-                # Keep only unique entities
-                seen_entities = set()
-                unique_entities = []
-                for entity in context['entities']:
-                    entity_key = f"{entity['text']}_{entity['type']}"
-                    if entity_key not in seen_entities:
-                        seen_entities.add(entity_key)
-                        unique_entities.append(entity)
-                context['entities'] = unique_entities[-20:]  # Keep last 20 entities
-        
-        # Update last interaction time
-        context['last_interaction'] = datetime.now().isoformat()
-        
-        # Store conversation flow
-        if 'conversation_flow' not in context:
-            context['conversation_flow'] = []
-        
-        context['conversation_flow'].append({
-            'timestamp': datetime.now().isoformat(),
-            'sender': 'bot' if is_bot else 'user',
-            'message': message[:100] + '...' if len(message) > 100 else message,  # Truncate long messages
-            'intent': context.get('last_intent') if not is_bot else None,
-            'sentiment': context.get('last_sentiment', {}).get('category') if not is_bot else None
-        })
-        
-        # Keep only last 50 messages in flow
-        context['conversation_flow'] = context['conversation_flow'][-50:]
+        context.record_user_message(message, analysis)
     
-    def _update_user_memory(self, user_id: int, user_message: str, bot_response: str, context: Dict[str, Any]):
+    def _update_user_memory(self, user_id: int, user_message: str, bot_response: str, context: ChatContext):
         """Update user memory with conversation information"""
-        if user_id not in self.user_memories:
-            self.user_memories[user_id] = {
-                'user_id': user_id,
-                'conversations': [],
-                'preferences': {},
-                'facts': [],
-                'interests': set(),
-                'last_interaction': None
-            }
-        
-        memory = self.user_memories[user_id]
+        memory = self.user_memories.get(user_id)
+        if memory is None:
+            memory = self._new_user_memory(user_id)
         
         # Update last interaction
         memory['last_interaction'] = datetime.now().isoformat()
@@ -164,9 +167,9 @@ class IntelligentChatbotService:
             'timestamp': datetime.now().isoformat(),
             'user_message': user_message[:100] + '...' if len(user_message) > 100 else user_message,
             'bot_response': bot_response[:100] + '...' if len(bot_response) > 100 else bot_response,
-            'intent': context.get('last_intent'),
-            'sentiment': context.get('last_sentiment', {}).get('category'),
-            'topics': context.get('topics', [])[-5:]  # Last 5 topics
+            'intent': context.intent,
+            'sentiment': context.sentiment,
+            'topics': context.topics[-5:]  # Last 5 topics
         }
         
         memory['conversations'].append(conversation_summary)
@@ -175,147 +178,159 @@ class IntelligentChatbotService:
         memory['conversations'] = memory['conversations'][-100:]
         
         # Extract and store user interests from topics
-        if context.get('topics'):
-            memory['interests'].update(context['topics'])
+        if context.topics:
+            memory['interests'].update(context.topics)
             # Keep only last 50 interests
             memory['interests'] = set(list(memory['interests'])[-50:])
         
         # Extract personal information
-        self._extract_personal_info(user_message, memory)
+        learned = self._extract_personal_info(user_message, memory)
+        
+        # Store updated memory
+        self.user_memories.set(user_id, memory)
+        
+        # Write newly learned details through to UserMemory right away, on the
+        # write-behind thread when there is one
+        if learned and self.db_service:
+            fields = self._user_memory_fields(memory)
+            if self.write_behind is None:
+                self._save_user_memory(user_id, fields)
+            else:
+                try:
+                    self.write_behind(self._save_user_memory, user_id, fields)
+                except Exception as e:
+                    logger.error(f"Error queueing user memory {user_id} for write-through: {e}")
+                    self._save_user_memory(user_id, fields)
     
-    def _extract_personal_info(self, message: str, memory: Dict[str, Any]):
-        """Extract personal information from user message"""
-        message_lower = message.lower()
-        
-        # Extract name
-        import re
-        name_patterns = [
-            r'my name is (\w+)',
-            r'i\'m called (\w+)',
-            r'call me (\w+)',
-            r'i am (\w+)',
-            r'i\'m (\w+)'
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                name = match.group(1).title()
-                memory['preferences']['name'] = name
-                break
-        
-        # Extract age
-        age_patterns = [
-            r'i am (\d+) years? old',
-            r'i\'m (\d+) years? old',
-            r'(\d+) years? old',
-            r'age (\d+)'
-        ]
-        
-        for pattern in age_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                age = int(match.group(1))
-                memory['preferences']['age'] = age
-                break
-        
-        # Extract location
-        location_patterns = [
-            r'i live in ([^.!?]+)',
-            r'i\'m from ([^.!?]+)',
-            r'location ([^.!?]+)'
-        ]
-        
-        for pattern in location_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                location = match.group(1).strip()
-                memory['preferences']['location'] = location
-                break
-        
-        # Extract preferences
-        if 'favorite' in message_lower or 'love' in message_lower or 'like' in message_lower:
-            # Extract what they like
-            like_patterns = [
-                r'i love (\w+)',
-                r'i like (\w+)',
-                r'favorite (\w+)',
-                r'love (\w+)'
-            ]
-            
-            for pattern in like_patterns:
-                match = re.search(pattern, message_lower)
-                if match:
-                    preference = match.group(1)
-                    if 'preferences' not in memory:
-                        memory['preferences'] = {}
-                    if 'likes' not in memory['preferences']:
-                        memory['preferences']['likes'] = []
-                    memory['preferences']['likes'].append(preference)
-                    break
+    @staticmethod
+    def _new_user_memory(user_id: int) -> Dict[str, Any]:
+        """Create an empty in-memory record for a user"""
+        return {
+            'user_id': user_id,
+            'conversations': [],
+            'preferences': {},
+            'facts': [],
+            'interests': set(),
+            'last_interaction': None
+        }
+    
+    # Context store write-through
+    def _persist_context(self, context_key: str, context: ChatContext):
+        """Write an evicted conversation context to the database"""
+        if not context.user_id or not context.chat_id:
+            return  # Anonymous contexts are not persisted
+        self.db_service.save_conversation_context(context.chat_id, context.user_id, context.to_dict())
+    
+    def _load_context(self, context_key: str) -> Optional[ChatContext]:
+        """Reload a previously evicted conversation context"""
+        user_id, _, chat_id = context_key.partition('_')
+        if not user_id.isdigit() or not chat_id:
+            return None
+        stored = self.db_service.get_conversation_context(chat_id, int(user_id))
+        return ChatContext.from_dict(stored) if stored else None
+    
+    def _persist_user_memory(self, user_id: int, memory: Dict[str, Any]):
+        """Write the durable parts of an evicted user memory to the database"""
+        self._save_user_memory(user_id, self._user_memory_fields(memory))
+    
+    @staticmethod
+    def _user_memory_fields(memory: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy the durable parts of a user memory into UserMemory columns
+        
+        Taken on the request thread, so a deferred write does not read the
+        memory while later messages change it.
+        """
+        preferences = dict(memory.get('preferences', {}))
+        preferences['interests'] = list(memory.get('interests', []))
+        fields = {'preferences': preferences, 'facts': list(memory.get('facts', []))}
+        for field in ('name', 'age', 'location'):
+            if preferences.get(field) is not None:
+                fields[field] = preferences[field]
+        return fields
+    
+    def _save_user_memory(self, user_id: int, fields: Dict[str, Any]):
+        self.db_service.update_user_memory(user_id, **fields)
+    
+    def _load_user_memory(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Rebuild a user memory from the database"""
+        stored = self.db_service.get_user_memory(user_id)
+        if not stored:
+            return None
+        memory = self._new_user_memory(user_id)
+        preferences = dict(stored.get('preferences') or {})
+        memory['interests'] = set(preferences.pop('interests', []))
+        memory['preferences'] = preferences
+        memory['facts'] = stored.get('facts') or []
+        return memory
+    
+    def _extract_personal_info(self, message: str, memory: Dict[str, Any]) -> bool:
+        """Extract personal information from user message; returns whether memory changed"""
+        info = extract_personal_info(message)
+        preferences = memory.setdefault('preferences', {})
+        changed = False
+        
+        for field in ('name', 'age', 'location'):
+            if field in info and preferences.get(field) != info[field]:
+                preferences[field] = info[field]
+                changed = True
+        
+        if 'likes' in info:
+            likes = preferences.setdefault('likes', [])
+            if info['likes'] not in likes:
+                likes.append(info['likes'])
+                changed = True
+        
+        return changed
     
     def get_conversation_summary(self, user_id: Optional[int] = None, chat_id: Optional[str] = None) -> Dict[str, Any]:
         """Get summary of conversation context"""
         context_key = f"{user_id}_{chat_id}" if user_id and chat_id else "anonymous"
-        context = self.conversation_contexts.get(context_key, {})
+        context = self.conversation_contexts.get(context_key)
         
         if not context:
             return {"message": "No conversation context found"}
         
-        # Calculate conversation statistics
-        total_messages = context.get('message_count', 0)
-        user_messages = context.get('user_message_count', 0)
-        bot_messages = context.get('bot_message_count', 0)
-        
         # Get most common topics
-        topics = context.get('topics', [])
+        topics = context.topics
         topic_frequency = {}
         for topic in topics:
             topic_frequency[topic] = topic_frequency.get(topic, 0) + 1
         
-        # Get most common intents
-        intents = context.get('intent_history', [])
-        intent_frequency = {}
-        for intent in intents:
-            intent_frequency[intent] = intent_frequency.get(intent, 0) + 1
-        
-        # Get sentiment distribution
-        sentiments = context.get('sentiment_history', [])
-        sentiment_distribution = {}
-        for sentiment in sentiments:
-            sentiment_distribution[sentiment] = sentiment_distribution.get(sentiment, 0) + 1
+        # Intent and sentiment counts cover the whole conversation
+        intent_frequency = context.intent_frequency()
         
         return {
             'conversation_stats': {
-                'total_messages': total_messages,
-                'user_messages': user_messages,
-                'bot_messages': bot_messages,
-                'start_time': context.get('start_time'),
-                'last_interaction': context.get('last_interaction')
+                'total_messages': context.message_count,
+                'user_messages': context.user_message_count,
+                'bot_messages': context.bot_message_count,
+                'start_time': isoformat(context.start_time),
+                'last_interaction': isoformat(context.last_interaction)
             },
             'topics': {
                 'all_topics': topics[-10:],  # Last 10 topics
                 'topic_frequency': dict(sorted(topic_frequency.items(), key=lambda x: x[1], reverse=True)[:5])
             },
             'intents': {
-                'all_intents': intents[-10:],  # Last 10 intents
+                'all_intents': context.intents()[-10:],  # Last 10 intents
                 'intent_frequency': dict(sorted(intent_frequency.items(), key=lambda x: x[1], reverse=True)[:5])
             },
             'sentiments': {
-                'all_sentiments': sentiments[-10:],  # Last 10 sentiments
-                'sentiment_distribution': sentiment_distribution
+                'all_sentiments': context.sentiments()[-10:],  # Last 10 sentiments
+                'sentiment_distribution': context.sentiment_frequency()
             },
-            'entities': context.get('entities', [])[-10:]  # Last 10 entities
+            'entities': context.entity_list()[-10:]  # Last 10 entities
         }
     
     def get_user_memory(self, user_id: int) -> Dict[str, Any]:
         """Get user memory and preferences"""
-        memory = self.user_memories.get(user_id, {})
+        memory = self.user_memories.get(user_id)
         
         if not memory:
             return {"message": "No user memory found"}
         
         # Convert set to list for JSON serialization
+        memory = dict(memory)
         if 'interests' in memory:
             memory['interests'] = list(memory['interests'])
         
@@ -324,8 +339,7 @@ class IntelligentChatbotService:
     def clear_conversation_context(self, user_id: Optional[int] = None, chat_id: Optional[str] = None):
         """Clear conversation context"""
         context_key = f"{user_id}_{chat_id}" if user_id and chat_id else "anonymous"
-        if context_key in self.conversation_contexts:
-            del self.conversation_contexts[context_key]
+        self.conversation_contexts.delete(context_key)
     
     def get_suggested_responses(self, user_message: str, context: Dict[str, Any] = None) -> List[str]:
         """Get suggested responses based on user message and context"""
@@ -337,7 +351,7 @@ class IntelligentChatbotService:
             responses = []
             
             # Base response
-            base_response = self.ai_service.generate_response(user_message, context)
+            base_response = self.ai_service.generate_response(user_message, context, analysis=analysis)
             responses.append(base_response)
             
             # Generate variations based on intent
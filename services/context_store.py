@@ -0,0 +1,274 @@
+"""
+Context Store for conversation state
+Pluggable storage for per-chat contexts with LRU/TTL eviction and write-through
+(inline or deferred to a background writer)
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EvictCallback = Callable[[Hashable, Any], None]
+LoadCallback = Callable[[Hashable], Optional[Any]]
+# Runs ``func(*args)`` later, e.g. MessageWriter.submit
+Submitter = Callable[..., None]
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate the deep memory footprint of a context in bytes"""
+    if _seen is None:
+        _seen = set()
+    obj_id = id(obj)
+    if obj_id in _seen:
+        return 0
+    _seen.add(obj_id)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key, _seen) + estimate_size(value, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_size(item, _seen)
+    elif hasattr(obj, '__slots__'):
+        for slot in obj.__slots__:
+            if hasattr(obj, slot):
+                size += estimate_size(getattr(obj, slot), _seen)
+    return size
+
+
+class ContextStore:
+    """Interface for conversation context storage backends"""
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a context, loading it from the backing store if needed"""
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any):
+        """Store a context"""
+        raise NotImplementedError
+
+    def delete(self, key: Hashable):
+        """Drop a context without writing it through"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Write every held context through to the backing store"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        return {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryContextStore(ContextStore):
+    """Unbounded dict-backed store, suitable for tests and short-lived processes"""
+
+    def __init__(self):
+        self._data: Dict[Hashable, Any] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self._data.get(key)
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = value
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': 'memory', 'entries': len(self._data)}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class BoundedContextStore(ContextStore):
+    """LRU store bounded by entry count, idle TTL and approximate memory size
+
+    Evicted entries are handed to ``on_evict`` (e.g. to persist them to the
+    database) and a miss calls ``loader`` so they can be reloaded on demand.
+    Callbacks run outside the store lock. With ``write_behind`` the evict
+    callback is queued there instead of running on the caller's thread; until
+    it has run, a miss revives the pending entry rather than loading a stale
+    copy. Entries are only sized when ``max_bytes`` is set.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = 3600,
+                 max_bytes: Optional[int] = None, on_evict: Optional[EvictCallback] = None,
+                 loader: Optional[LoadCallback] = None, sizer: Callable[[Any], int] = estimate_size,
+                 write_behind: Optional[Submitter] = None):
+        """Initialize the store limits and callbacks"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.loader = loader
+        self.sizer = sizer
+        self.write_behind = write_behind
+
+        # key -> (value, last_access, size); ordered from least to most recent
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        # Evicted entries whose deferred write has not run yet
+        self._writing: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._expire(now)
+            entry = self._data.get(key)
+            if entry is not None:
+                value, _, size = entry
+                self._data[key] = (value, now, size)
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                value = self._writing.get(key)
+                self.misses += 1
+        self._evict(evicted)
+
+        if value is not None and entry is None:
+            # Evicted but not written yet; the database copy would be stale
+            self.set(key, value)
+        elif value is None and self.loader is not None:
+            value = self._load(key)
+        return value
+
+    def _load(self, key: Hashable) -> Optional[Any]:
+        """Reload an evicted context from the backing store"""
+        try:
+            value = self.loader(key)
+        except Exception as e:
+            logger.error(f"Error loading context {key}: {e}")
+            return None
+        if value is not None:
+            self.loads += 1
+            self.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        now = time.monotonic()
+        size = self.sizer(value) if self.max_bytes else 0
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[2]
+            self._data[key] = (value, now, size)
+            self.total_bytes += size
+            evicted = self._expire(now)
+            evicted.extend(self._shrink(keep=key))
+        self._evict(evicted)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[2]
+
+    def flush(self):
+        """Write every held context through without evicting it"""
+        if self.on_evict is None:
+            return
+        with self._lock:
+            items = [(key, entry[0]) for key, entry in self._data.items()]
+        self._evict(items)
+
+    def _expire(self, now: float) -> List[Tuple[Hashable, Any]]:
+        """Pop idle entries from the LRU end; caller holds the lock"""
+        expired = []
+        if not self.ttl_seconds:
+            return expired
+        deadline = now - self.ttl_seconds
+        while self._data:
+            key, (value, last_access, size) = next(iter(self._data.items()))
+            if last_access > deadline:
+                break
+            del self._data[key]
+            self.total_bytes -= size
+            self.expirations += 1
+            expired.append((key, value))
+        return expired
+
+    def _shrink(self, keep: Hashable) -> List[Tuple[Hashable, Any]]:
+        """Pop LRU entries until the store fits its limits; caller holds the lock"""
+        evicted = []
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries) or
+            (self.max_bytes and self.total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            if key == keep:
+                break
+            value, _, size = self._data.pop(key)
+            self.total_bytes -= size
+            self.evictions += 1
+            evicted.append((key, value))
+        return evicted
+
+    def _evict(self, items: List[Tuple[Hashable, Any]]):
+        """Hand evicted entries to the write-through callback"""
+        if not items or self.on_evict is None:
+            return
+        for key, value in items:
+            if self.write_behind is None:
+                self._write_through(key, value)
+                continue
+            with self._lock:
+                self._writing[key] = value
+            try:
+                self.write_behind(self._write_through, key, value)
+            except Exception as e:
+                logger.error(f"Error queueing context {key} for write-through: {e}")
+                self._write_through(key, value)
+
+    def _write_through(self, key: Hashable, value: Any):
+        try:
+            self.on_evict(key, value)
+        except Exception as e:
+            logger.error(f"Error writing through context {key}: {e}")
+        finally:
+            with self._lock:
+                if self._writing.get(key) is value:
+                    del self._writing[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': 'bounded',
+            'entries': len(self._data),
+            'pending_writes': len(self._writing),
+            'max_entries': self.max_entries,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,98 @@
+"""
+Database Configuration for the SQLAlchemy engine
+Connection pool settings per backend and SQLite pragmas (WAL, synchronous,
+cache, mmap, busy timeout) applied to every new connection
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def sqlite_pragmas() -> List[Tuple[str, Any]]:
+    """Pragmas for every SQLite connection, from the SQLITE_* settings
+
+    WAL lets readers run alongside the single writer, and NORMAL synchronous is
+    safe under WAL (a power loss can only drop the last commits). The busy
+    timeout makes a writer wait for the lock instead of failing at once with
+    "database is locked".
+    """
+    return [
+        ('journal_mode', os.getenv('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('synchronous', os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+        # Negative cache_size is in KiB
+        ('cache_size', -int(os.getenv('SQLITE_CACHE_KB', 65536))),
+        ('mmap_size', int(os.getenv('SQLITE_MMAP_MB', 256)) * 1024 * 1024),
+        ('temp_store', 'MEMORY')
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: Optional[List[Tuple[str, Any]]] = None):
+    """Run the pragmas on a raw sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas if pragmas is not None else sqlite_pragmas():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _on_connect(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection)
+
+
+def install_sqlite_pragmas(engine: Engine):
+    """Apply the SQLite pragmas to every connection this engine opens
+
+    Other engines in the process (migrations CLI, benchmarks, tests) keep
+    SQLite's defaults unless they opt in the same way.
+    """
+    if engine.dialect.name == 'sqlite' and not event.contains(engine, 'connect', _on_connect):
+        event.listen(engine, 'connect', _on_connect)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URL
+
+    Server databases get a sized connection pool with pre-ping and recycling
+    (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING). File-based SQLite keeps SQLAlchemy's queue pool sized
+    to the worker threads (SQLITE_POOL_SIZE, SQLITE_MAX_OVERFLOW and
+    SQLITE_POOL_TIMEOUT, sized from GUNICORN_THREADS by default); connections
+    never go stale, so no pre-ping.
+    """
+    if is_sqlite(url):
+        if make_url(url).database in (None, '', ':memory:'):
+            return {}
+        threads = int(os.getenv('GUNICORN_THREADS', 4))
+        return {
+            'pool_size': int(os.getenv('SQLITE_POOL_SIZE', threads)),
+            'max_overflow': int(os.getenv('SQLITE_MAX_OVERFLOW', threads)),
+            'pool_timeout': float(os.getenv('SQLITE_POOL_TIMEOUT', 30))
+        }
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    }
+
+
+def configure_database(app):
+    """Set the engine options for the app's database; call before SQLAlchemy(app)"""
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    options = dict(engine_options(url))
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    logger.info("Database engine options: %s", options)
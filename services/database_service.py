@@ -3,24 +3,31 @@ Database Service for managing data operations
 Handles users, chats, messages, and knowledge base
 """
 
+import base64
 import logging
 import uuid
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+from sqlalchemy import func, tuple_
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from models import User, Chat, Message, Response, KnowledgeBase, ConversationContext, UserMemory
 from app import db
+from services.knowledge_index import KnowledgeSearch
+from services.logging_config import SAMPLED
+from services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+@metrics.instrument('db')
 class DatabaseService:
     """Service for database operations"""
     
     def __init__(self):
         """Initialize database service"""
-        pass
+        # Full-text index over the knowledge base, built on first search
+        self.knowledge_search = KnowledgeSearch(db, KnowledgeBase)
     
     # User Management
     def create_user(self, username: str, email: str, password: str) -> int:
@@ -49,12 +56,12 @@ class DatabaseService:
             db.session.add(user_memory)
             db.session.commit()
             
-            logger.info(f"Created user: {username}")
+            logger.info("Created user: %s", username)
             return user.id
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error creating user: {e}")
+            logger.error("Error creating user: %s", e)
             raise
     
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
@@ -63,13 +70,13 @@ class DatabaseService:
             user = User.query.filter_by(email=email).first()
             
             if user and user.check_password(password):
-                logger.info(f"User authenticated: {user.username}")
+                logger.info("User authenticated: %s", user.username)
                 return user
             
             return None
             
         except Exception as e:
-            logger.error(f"Error authenticating user: {e}")
+            logger.error("Error authenticating user: %s", e)
             return None
     
     def get_user_by_id(self, user_id: int) -> Optional[User]:
@@ -77,7 +84,7 @@ class DatabaseService:
         try:
             return User.query.get(user_id)
         except Exception as e:
-            logger.error(f"Error getting user: {e}")
+            logger.error("Error getting user: %s", e)
             return None
     
     def update_user_profile(self, user_id: int, **kwargs) -> bool:
@@ -96,12 +103,12 @@ class DatabaseService:
             user.updated_at = datetime.utcnow()
             db.session.commit()
             
-            logger.info(f"Updated user profile: {user_id}")
+            logger.info("Updated user profile: %s", user_id)
             return True
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error updating user profile: {e}")
+            logger.error("Error updating user profile: %s", e)
             return False
     
     # Chat Management
@@ -119,22 +126,49 @@ class DatabaseService:
             db.session.add(chat)
             db.session.commit()
             
-            logger.info(f"Created chat: {chat_id} for user: {user_id}")
+            logger.info("Created chat: %s for user: %s", chat_id, user_id)
             return chat_id
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error creating chat: {e}")
+            logger.error("Error creating chat: %s", e)
             raise
     
     def get_user_chats(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all chats for a user"""
         try:
             chats = Chat.query.filter_by(user_id=user_id, is_active=True).order_by(Chat.updated_at.desc()).all()
-            return [chat.to_dict() for chat in chats]
+            if not chats:
+                return []
+            
+            # One grouped query for counts and latest message ids of every chat
+            chat_ids = [chat.id for chat in chats]
+            aggregates = db.session.query(
+                Message.chat_id, func.count(Message.id), func.max(Message.id)
+            ).filter(Message.chat_id.in_(chat_ids)).group_by(Message.chat_id).all()
+            counts = {chat_id: count for chat_id, count, _ in aggregates}
+            
+            # One query for the latest message of each chat
+            last_ids = [last_id for _, _, last_id in aggregates if last_id is not None]
+            previews = {}
+            if last_ids:
+                latest = db.session.query(
+                    Message.chat_id, Message.content, Message.sender, Message.created_at
+                ).filter(Message.id.in_(last_ids)).all()
+                for chat_id, content, sender, created_at in latest:
+                    previews[chat_id] = {
+                        'content': content[:100] + '...' if len(content) > 100 else content,
+                        'sender': sender,
+                        'created_at': created_at.isoformat() if created_at else None
+                    }
+            
+            return [
+                chat.to_dict(message_count=counts.get(chat.id, 0), last_message=previews.get(chat.id))
+                for chat in chats
+            ]
             
         except Exception as e:
-            logger.error(f"Error getting user chats: {e}")
+            logger.error("Error getting user chats: %s", e)
             return []
     
     def get_chat_by_id(self, chat_id: str) -> Optional[Chat]:
@@ -142,7 +176,7 @@ class DatabaseService:
         try:
             return Chat.query.get(chat_id)
         except Exception as e:
-            logger.error(f"Error getting chat: {e}")
+            logger.error("Error getting chat: %s", e)
             return None
     
     def update_chat_title(self, chat_id: str, title: str) -> bool:
@@ -156,12 +190,12 @@ class DatabaseService:
             chat.updated_at = datetime.utcnow()
             db.session.commit()
             
-            logger.info(f"Updated chat title: {chat_id}")
+            logger.info("Updated chat title: %s", chat_id)
             return True
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error updating chat title: {e}")
+            logger.error("Error updating chat title: %s", e)
             return False
     
     def delete_chat(self, chat_id: str) -> bool:
@@ -175,12 +209,12 @@ class DatabaseService:
             chat.updated_at = datetime.utcnow()
             db.session.commit()
             
-            logger.info(f"Deleted chat: {chat_id}")
+            logger.info("Deleted chat: %s", chat_id)
             return True
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error deleting chat: {e}")
+            logger.error("Error deleting chat: %s", e)
             return False
     
     # Message Management
@@ -194,7 +228,7 @@ class DatabaseService:
                 content=message,
                 sender=sender,
                 message_type=message_type,
-                metadata=metadata or {}
+                meta_data=metadata or {}
             )
             
             db.session.add(msg)
@@ -206,30 +240,134 @@ class DatabaseService:
             
             db.session.commit()
             
-            logger.info(f"Saved message: {msg.id} in chat: {chat_id}")
+            logger.info("Saved message: %s in chat: %s", msg.id, chat_id, extra=SAMPLED)
             return msg.id
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error saving message: {e}")
+            logger.error("Error saving message: %s", e)
+            raise
+    
+    def save_messages_bulk(self, messages: List[Dict[str, Any]]) -> int:
+        """Save a batch of messages with one insert and one commit
+        
+        Each item holds the ``save_message`` arguments plus an optional
+        ``created_at``. Every chat touched by the batch gets its ``updated_at``
+        bumped once.
+        """
+        if not messages:
+            return 0
+        try:
+            now = datetime.utcnow()
+            rows = [{
+                'chat_id': item['chat_id'],
+                'user_id': item['user_id'],
+                'content': item['message'],
+                'sender': item['sender'],
+                'message_type': item.get('message_type', 'text'),
+                'meta_data': item.get('metadata') or {},
+                'created_at': item.get('created_at') or now
+            } for item in messages]
+            
+            db.session.bulk_insert_mappings(Message, rows)
+            
+            # Update each chat's updated_at timestamp once per batch
+            chat_ids = {row['chat_id'] for row in rows}
+            Chat.query.filter(Chat.id.in_(chat_ids)).update(
+                {Chat.updated_at: now}, synchronize_session=False
+            )
+            
+            db.session.commit()
+            
+            logger.info("Saved %s messages in %s chats", len(rows), len(chat_ids), extra=SAMPLED)
+            return len(rows)
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error saving message batch: %s", e)
             raise
     
     def get_chat_messages(self, chat_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get messages for a specific chat"""
+        """Get the most recent messages for a specific chat, oldest first"""
+        return self.get_chat_messages_page(chat_id, limit=limit)['messages']
+    
+    @staticmethod
+    def encode_message_cursor(created_at: datetime, message_id: int) -> str:
+        """Encode a (created_at, id) position as an opaque cursor"""
+        raw = f"{created_at.isoformat()}|{message_id}".encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_message_cursor(cursor: str):
+        """Decode a cursor into (created_at, id); raises ValueError if malformed"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, message_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+            return datetime.fromisoformat(created_at), int(message_id)
+        except Exception:
+            raise ValueError("Invalid message cursor")
+    
+    def get_chat_messages_page(self, chat_id: str, limit: int = 100, before: Optional[str] = None,
+                               after: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of chat history using keyset pagination on (created_at, id)
+        
+        Without a cursor the latest page is returned. ``before`` pages back to
+        older messages and ``after`` forward to newer ones. Messages in a page
+        are always oldest first. Raises ValueError for a malformed cursor.
+        """
+        limit = max(1, min(int(limit), 500))
+        before_key = self.decode_message_cursor(before) if before else None
+        after_key = self.decode_message_cursor(after) if after else None
+        
         try:
-            messages = Message.query.filter_by(chat_id=chat_id).order_by(Message.created_at.asc()).limit(limit).all()
-            return [msg.to_dict() for msg in messages]
+            query = Message.query.filter(Message.chat_id == chat_id)
+            
+            # A row-value comparison lets SQLite seek the index to the cursor
+            # (chat_id=? AND created_at>?); an OR of the two terms only seeks
+            # on chat_id and walks every row up to the cursor
+            if after_key:
+                created_at, message_id = after_key
+                query = query.filter(
+                    tuple_(Message.created_at, Message.id) > (created_at, message_id)
+                ).order_by(Message.created_at.asc(), Message.id.asc())
+            else:
+                if before_key:
+                    created_at, message_id = before_key
+                    query = query.filter(
+                        tuple_(Message.created_at, Message.id) < (created_at, message_id)
+                    )
+                query = query.order_by(Message.created_at.desc(), Message.id.desc())
+            
+            # Fetch one extra row to know whether another page exists
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if not after_key:
+                rows.reverse()
+            
+            first, last = (rows[0], rows[-1]) if rows else (None, None)
+            return {
+                'messages': [msg.to_dict() for msg in rows],
+                'cursors': {
+                    'before': self.encode_message_cursor(first.created_at, first.id) if first else before,
+                    'after': self.encode_message_cursor(last.created_at, last.id) if last else after
+                },
+                # The cursor row itself lies on the other side of the page
+                'has_more_before': has_more if not after_key else True,
+                'has_more_after': has_more if after_key else bool(before_key)
+            }
             
         except Exception as e:
-            logger.error(f"Error getting chat messages: {e}")
-            return []
+            logger.error("Error getting chat messages: %s", e)
+            return {'messages': [], 'cursors': {'before': before, 'after': after},
+                    'has_more_before': False, 'has_more_after': False}
     
     def get_message_by_id(self, message_id: int) -> Optional[Message]:
         """Get message by ID"""
         try:
             return Message.query.get(message_id)
         except Exception as e:
-            logger.error(f"Error getting message: {e}")
+            logger.error("Error getting message: %s", e)
             return None
     
     # Response Management
@@ -244,7 +382,7 @@ class DatabaseService:
             return [resp.to_dict() for resp in responses]
             
         except Exception as e:
-            logger.error(f"Error getting responses: {e}")
+            logger.error("Error getting responses: %s", e)
             return []
     
     def add_response(self, trigger: str, responses: List[str], category: str = "general", 
@@ -261,12 +399,12 @@ class DatabaseService:
             db.session.add(response)
             db.session.commit()
             
-            logger.info(f"Added response: {response.id}")
+            logger.info("Added response: %s", response.id)
             return response.id
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error adding response: {e}")
+            logger.error("Error adding response: %s", e)
             raise
     
     def update_response(self, response_id: int, **kwargs) -> bool:
@@ -285,12 +423,12 @@ class DatabaseService:
             response.updated_at = datetime.utcnow()
             db.session.commit()
             
-            logger.info(f"Updated response: {response_id}")
+            logger.info("Updated response: %s", response_id)
             return True
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error updating response: {e}")
+            logger.error("Error updating response: %s", e)
             return False
     
     # Knowledge Base Management
@@ -305,7 +443,7 @@ class DatabaseService:
             return [kb.to_dict() for kb in knowledge]
             
         except Exception as e:
-            logger.error(f"Error getting knowledge base: {e}")
+            logger.error("Error getting knowledge base: %s", e)
             return []
     
     def add_knowledge(self, topic: str, content: str, category: str = "general", 
@@ -325,32 +463,60 @@ class DatabaseService:
             
             db.session.add(knowledge)
             db.session.commit()
+            self._index_knowledge(knowledge)
             
-            logger.info(f"Added knowledge: {knowledge.id}")
+            logger.info("Added knowledge: %s", knowledge.id)
             return knowledge.id
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error adding knowledge: {e}")
+            logger.error("Error adding knowledge: %s", e)
             raise
     
     def search_knowledge(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Search knowledge base"""
+        """Search knowledge base with BM25 ranking; ``term*`` matches a prefix"""
         try:
-            # Simple search implementation - can be enhanced with full-text search
-            knowledge_entries = KnowledgeBase.query.filter(
-                KnowledgeBase.is_active == True,
-                (KnowledgeBase.topic.ilike(f'%{query}%') |
-                 KnowledgeBase.content.ilike(f'%{query}%') |
-                 KnowledgeBase.keywords.contains([query]))
-            ).order_by(KnowledgeBase.confidence.desc()).limit(limit).all()
-            
-            return [kb.to_dict() for kb in knowledge_entries]
+            # The index can still hold entries deactivated elsewhere until it
+            # re-syncs, so over-fetch and apply the limit after dropping them
+            fetch = limit * 2
+            while True:
+                ranked = self.knowledge_search.search(query, fetch)
+                if not ranked:
+                    return []
+
+                entries = {
+                    kb.id: kb for kb in KnowledgeBase.query.filter(
+                        KnowledgeBase.id.in_([knowledge_id for knowledge_id, _ in ranked]),
+                        KnowledgeBase.is_active == True
+                    ).all()
+                }
+                if len(entries) >= limit or len(ranked) < fetch:
+                    break
+                fetch *= 2
+
+            results = []
+            for knowledge_id, score in ranked:
+                if knowledge_id in entries:
+                    result = entries[knowledge_id].to_dict()
+                    result['score'] = round(score, 4)
+                    results.append(result)
+                    if len(results) == limit:
+                        break
+            return results
             
         except Exception as e:
-            logger.error(f"Error searching knowledge: {e}")
+            db.session.rollback()
+            logger.error("Error searching knowledge: %s", e)
             return []
     
+    def _index_knowledge(self, knowledge: KnowledgeBase):
+        """Keep the full-text index in step with a committed entry"""
+        try:
+            self.knowledge_search.upsert(knowledge)
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error indexing knowledge %s: %s", knowledge.id, e)
+    
     def update_knowledge(self, knowledge_id: int, **kwargs) -> bool:
         """Update knowledge base entry"""
         try:
@@ -366,13 +532,14 @@ class DatabaseService:
             
             knowledge.updated_at = datetime.utcnow()
             db.session.commit()
+            self._index_knowledge(knowledge)
             
-            logger.info(f"Updated knowledge: {knowledge_id}")
+            logger.info("Updated knowledge: %s", knowledge_id)
             return True
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error updating knowledge: {e}")
+            logger.error("Error updating knowledge: %s", e)
             return False
     
     # User Memory Management
@@ -383,7 +550,7 @@ class DatabaseService:
             return memory.to_dict() if memory else None
             
         except Exception as e:
-            logger.error(f"Error getting user memory: {e}")
+            logger.error("Error getting user memory: %s", e)
             return None
     
     def update_user_memory(self, user_id: int, **kwargs) -> bool:
@@ -404,12 +571,12 @@ class DatabaseService:
             memory.updated_at = datetime.utcnow()
             db.session.commit()
             
-            logger.info(f"Updated user memory: {user_id}")
+            logger.info("Updated user memory: %s", user_id, extra=SAMPLED)
             return True
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error updating user memory: {e}")
+            logger.error("Error updating user memory: %s", e)
             return False
     
     # Conversation Context Management
@@ -436,12 +603,12 @@ class DatabaseService:
             
             db.session.commit()
             
-            logger.info(f"Saved conversation context: {context_id}")
+            logger.info("Saved conversation context: %s", context_id, extra=SAMPLED)
             return context_id
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error saving conversation context: {e}")
+            logger.error("Error saving conversation context: %s", e)
             raise
     
     def get_conversation_context(self, chat_id: str, user_id: int) -> Optional[Dict[str, Any]]:
@@ -454,7 +621,7 @@ class DatabaseService:
             return context.context_data if context else None
             
         except Exception as e:
-            logger.error(f"Error getting conversation context: {e}")
+            logger.error("Error getting conversation context: %s", e)
             return None
     
     # Initialization
@@ -497,16 +664,18 @@ class DatabaseService:
                 }
             ]
             
-            for knowledge_data in default_knowledge:
-                knowledge = KnowledgeBase(**knowledge_data)
-                db.session.add(knowledge)
-            
+            entries = [KnowledgeBase(**knowledge_data) for knowledge_data in default_knowledge]
+            db.session.add_all(entries)
             db.session.commit()
+            
+            # Searchable right away rather than after the next index refresh
+            for knowledge in entries:
+                self._index_knowledge(knowledge)
             logger.info("Initialized knowledge base with default entries")
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error initializing knowledge base: {e}")
+            logger.error("Error initializing knowledge base: %s", e)
     
     def initialize_responses(self):
         """Initialize default response templates"""
@@ -548,7 +717,7 @@ class DatabaseService:
             
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Error initializing responses: {e}")
+            logger.error("Error initializing responses: %s", e)
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
@@ -566,5 +735,5 @@ class DatabaseService:
             return stats
             
         except Exception as e:
-            logger.error(f"Error getting database stats: {e}")
+            logger.error("Error getting database stats: %s", e)
             return {}
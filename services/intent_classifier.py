@@ -0,0 +1,184 @@
+"""
+Intent Classifier for user messages
+Token and n-gram features scored against a sparse intent weight matrix
+"""
+
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:  # scikit-learn pulls scipy in, but stay usable without it
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+# Intents in tie-break order: on equal scores the earlier intent wins
+INTENTS = [
+    'greeting',
+    'time_query',
+    'date_query',
+    'math_query',
+    'translation_request',
+    'personal_info',
+    'information_request',
+    'question',
+    'general_conversation'
+]
+INTENT_CODES = {intent: code for code, intent in enumerate(INTENTS)}
+DEFAULT_INTENT = 'general_conversation'
+
+# Feature weights per intent. Features are lowercase tokens, space-joined
+# n-grams of up to three tokens, operator characters and the NUM marker.
+INTENT_LEXICON: Dict[str, Dict[str, float]] = {
+    'greeting': {
+        'hi': 2.0, 'hello': 2.0, 'hey': 2.0, 'yo': 1.5, 'sup': 1.5, 'greetings': 2.0,
+        'good morning': 3.0, 'good afternoon': 3.0, 'good evening': 3.0,
+        "what's up": 3.0, 'whats up': 3.0, 'how are you': 2.5,
+        'nice to meet': 3.0, 'pleasure to meet': 3.0
+    },
+    'time_query': {
+        'time': 2.5, 'clock': 2.5, 'hour': 2.0, 'hours': 1.5, 'minute': 2.0, 'timezone': 3.0,
+        'what time': 3.0, 'current time': 3.0, 'time now': 3.0, 'time in': 2.0,
+        "what's the time": 3.0
+    },
+    'date_query': {
+        'date': 2.5, 'day': 1.5, 'today': 2.0, 'tomorrow': 2.0, 'yesterday': 2.0,
+        "today's": 2.0, 'todays': 2.0, 'week': 1.0, 'what day': 2.0, 'day of the week': 2.0
+    },
+    'math_query': {
+        '+': 2.0, '-': 1.5, '*': 2.0, '/': 2.0, '=': 2.0, '^': 2.0, '(': 0.5, ')': 0.5,
+        'NUM': 0.5, 'math': 2.5, 'calculate': 3.0, 'solve': 3.0, 'equation': 3.0,
+        'plus': 1.5, 'minus': 1.5, 'times': 1.0, 'divided by': 2.5, 'multiplied by': 2.5
+    },
+    'translation_request': {
+        'translate': 4.0, 'translation': 3.0, 'in spanish': 3.0, 'to spanish': 3.0,
+        'in french': 3.0, 'to french': 3.0, 'in german': 3.0, 'to german': 3.0,
+        'how do you say': 2.5
+    },
+    'personal_info': {
+        'my name': 3.0, 'i am': 2.0, "i'm": 2.0, 'i live in': 3.5, "i'm from": 3.0,
+        'call me': 3.0, "i'm called": 3.5, 'years old': 2.5
+    },
+    'information_request': {
+        'tell me about': 3.5, 'what is': 1.6, 'who is': 1.6, 'what are': 1.6,
+        'search for': 3.5, 'explain': 2.5, 'teach me': 2.5, 'capital of': 3.0,
+        'stand for': 2.5, 'speed of': 2.0, 'formula for': 2.5, 'fact': 1.5
+    },
+    'question': {
+        'what': 1.0, 'how': 1.0, 'why': 1.2, 'when': 1.0, 'where': 1.0, 'who': 1.0,
+        'which': 1.0, 'are you': 1.2, 'do you': 1.2, 'can you': 1.0, '?': 0.8
+    },
+    'general_conversation': {}
+}
+
+# A message needs at least this score to leave general_conversation
+MIN_SCORE = 0.75
+
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?|\d+(?:[.,]\d+)*|[+\-*/=^()?]")
+_NUMBER = re.compile(r"\d")
+
+
+class IntentClassifier:
+    """Scores every intent at once as a feature vector times a weight matrix"""
+
+    def __init__(self, lexicon: Optional[Dict[str, Dict[str, float]]] = None,
+                 intents: Sequence[str] = INTENTS, min_score: float = MIN_SCORE):
+        """Compile the lexicon into a feature vocabulary and weight matrix"""
+        self.intents = list(intents)
+        self.min_score = min_score
+        self._default_code = self.intents.index(DEFAULT_INTENT)
+        lexicon = lexicon or INTENT_LEXICON
+
+        self.vocabulary: Dict[str, int] = {}
+        rows, cols, values = [], [], []
+        for intent, features in lexicon.items():
+            column = self.intents.index(intent)
+            for feature, weight in features.items():
+                row = self.vocabulary.setdefault(feature, len(self.vocabulary))
+                rows.append(row)
+                cols.append(column)
+                values.append(weight)
+
+        self.max_ngram = max((feature.count(' ') + 1 for feature in self.vocabulary), default=1)
+        shape = (len(self.vocabulary), len(self.intents))
+        dense = np.zeros(shape, dtype=np.float32)
+        np.add.at(dense, (rows, cols), values)
+        self.weights = dense
+        self.sparse_weights = sparse.csr_matrix(dense) if sparse is not None else None
+
+    def _features(self, message: str) -> List[int]:
+        """Map a message to the vocabulary ids of the features it contains"""
+        tokens = ['NUM' if _NUMBER.match(token) else token for token in _TOKEN.findall(message.lower())]
+        vocabulary = self.vocabulary
+        found = set()
+        for i in range(len(tokens)):
+            for n in range(1, self.max_ngram + 1):
+                if i + n > len(tokens):
+                    break
+                feature = tokens[i] if n == 1 else ' '.join(tokens[i:i + n])
+                index = vocabulary.get(feature)
+                if index is not None:
+                    found.add(index)
+        return sorted(found)
+
+    def _decide(self, scores: np.ndarray) -> np.ndarray:
+        """Pick the best intent per row, falling back to general conversation"""
+        best = scores.argmax(axis=1)
+        weak = scores[np.arange(scores.shape[0]), best] < self.min_score
+        best[weak] = self._default_code
+        return best
+
+    def scores(self, message: str) -> Dict[str, float]:
+        """Get the score of every intent for one message"""
+        features = self._features(message)
+        row = self.weights[features].sum(axis=0) if features else np.zeros(len(self.intents))
+        return {intent: float(score) for intent, score in zip(self.intents, row)}
+
+    def classify(self, message: str) -> str:
+        """Classify a single message"""
+        features = self._features(message)
+        if not features:
+            return DEFAULT_INTENT
+        row = self.weights[features].sum(axis=0)
+        return self.intents[int(self._decide(row[np.newaxis, :])[0])]
+
+    def classify_batch(self, messages: Sequence[str]) -> List[str]:
+        """Classify many messages with a single matrix product"""
+        if not messages:
+            return []
+        indptr = [0]
+        indices: List[int] = []
+        for message in messages:
+            indices.extend(self._features(message))
+            indptr.append(len(indices))
+
+        if self.sparse_weights is not None:
+            data = np.ones(len(indices), dtype=np.float32)
+            features = sparse.csr_matrix((data, indices, indptr), shape=(len(messages), len(self.vocabulary)))
+            scores = (features @ self.sparse_weights).toarray()
+        else:
+            features = np.zeros((len(messages), len(self.vocabulary)), dtype=np.float32)
+            for row in range(len(messages)):
+                features[row, indices[indptr[row]:indptr[row + 1]]] = 1.0
+            scores = features @ self.weights
+
+        return [self.intents[int(code)] for code in self._decide(scores)]
+
+
+_default_classifier: Optional[IntentClassifier] = None
+_lock = threading.Lock()
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """Get the process-wide intent classifier"""
+    global _default_classifier
+    if _default_classifier is None:
+        with _lock:
+            if _default_classifier is None:
+                _default_classifier = IntentClassifier()
+    return _default_classifier
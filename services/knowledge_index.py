@@ -0,0 +1,306 @@
+"""
+Knowledge Index for full-text search over the knowledge base
+SQLite FTS5 when available, with a portable in-process BM25 inverted index
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Relative weight of each indexed field
+FIELD_WEIGHTS = {'topic': 3.0, 'keywords': 2.0, 'content': 1.0}
+
+
+def tokenize(value: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return _TOKEN.findall(value.lower()) if value else []
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """Parse a search query into (term, is_prefix) pairs; ``term*`` is a prefix query"""
+    terms = []
+    for raw in query.split():
+        is_prefix = raw.endswith('*')
+        for token in tokenize(raw):
+            terms.append((token, False))
+        if is_prefix and terms:
+            terms[-1] = (terms[-1][0], True)
+    return terms
+
+
+def knowledge_document(knowledge) -> Dict[str, str]:
+    """Extract the searchable fields of a KnowledgeBase row"""
+    return {
+        'topic': knowledge.topic or '',
+        'content': knowledge.content or '',
+        'keywords': ' '.join(knowledge.keywords or [])
+    }
+
+
+class InMemoryKnowledgeIndex:
+    """Inverted index with BM25 ranking kept in process memory"""
+
+    backend = 'memory'
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """Initialize an empty index"""
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        self._sorted_terms: Optional[List[str]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def upsert(self, doc_id: int, fields: Dict[str, str]):
+        """Index or re-index one document"""
+        weighted = Counter()
+        for field, value in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(value):
+                weighted[token] += weight
+
+        with self._lock:
+            self._remove_locked(doc_id)
+            length = float(sum(weighted.values()))
+            self._doc_terms[doc_id] = dict(weighted)
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            for term, frequency in weighted.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._sorted_terms = None
+                postings[doc_id] = frequency
+
+    def remove(self, doc_id: int):
+        """Drop a document from the index"""
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def _remove_locked(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id, 0.0)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._sorted_terms = None
+
+    def clear(self):
+        """Drop every document"""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._total_length = 0.0
+            self._sorted_terms = None
+
+    def _expand(self, term: str, is_prefix: bool) -> List[str]:
+        """Resolve a query term to the indexed terms it matches"""
+        if not is_prefix:
+            return [term] if term in self._postings else []
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        matches = []
+        for i in range(bisect_left(terms, term), len(terms)):
+            if not terms[i].startswith(term):
+                break
+            matches.append(terms[i])
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs ranked by BM25, best first"""
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count or 1.0
+            scores: Dict[int, float] = {}
+            for term, is_prefix in parse_query(query):
+                for indexed in self._expand(term, is_prefix):
+                    postings = self._postings[indexed]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+class SQLiteFTSKnowledgeIndex:
+    """FTS5 virtual table kept next to knowledge_base in the same database"""
+
+    backend = 'sqlite-fts5'
+    table = 'knowledge_fts'
+
+    def __init__(self, db):
+        """Create the FTS5 table if needed; raises if FTS5 is unavailable"""
+        self.db = db
+        self.db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+            f"USING fts5(topic, content, keywords, tokenize='unicode61')"
+        ))
+        self.db.session.commit()
+
+    def __len__(self) -> int:
+        return self.db.session.execute(text(f"SELECT count(*) FROM {self.table}")).scalar() or 0
+
+    def signature(self) -> Tuple[Any, Any]:
+        """Row count and highest rowid of the indexed documents"""
+        return tuple(self.db.session.execute(text(f"SELECT count(*), max(rowid) FROM {self.table}")).one())
+
+    def upsert(self, doc_id: int, fields: Dict[str, str], commit: bool = True):
+        """Index or re-index one document"""
+        self.db.session.execute(text(f"DELETE FROM {self.table} WHERE rowid = :id"), {'id': doc_id})
+        self.db.session.execute(
+            text(f"INSERT INTO {self.table} (rowid, topic, content, keywords) VALUES (:id, :topic, :content, :keywords)"),
+            {'id': doc_id, **fields}
+        )
+        if commit:
+            self.db.session.commit()
+
+    def remove(self, doc_id: int):
+        """Drop a document from the index"""
+        self.db.session.execute(text(f"DELETE FROM {self.table} WHERE rowid = :id"), {'id': doc_id})
+        self.db.session.commit()
+
+    def clear(self):
+        """Drop every document"""
+        self.db.session.execute(text(f"DELETE FROM {self.table}"))
+        self.db.session.commit()
+
+    @staticmethod
+    def _match_expression(query: str) -> str:
+        """Build an FTS5 MATCH expression with every term quoted"""
+        parts = []
+        for term, is_prefix in parse_query(query):
+            quoted = '"' + term.replace('"', '""') + '"'
+            parts.append(quoted + '*' if is_prefix else quoted)
+        return ' OR '.join(parts)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs ranked by BM25, best first"""
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        weights = ', '.join(str(FIELD_WEIGHTS[field]) for field in ('topic', 'content', 'keywords'))
+        rows = self.db.session.execute(text(
+            f"SELECT rowid, bm25({self.table}, {weights}) AS rank FROM {self.table} "
+            f"WHERE {self.table} MATCH :query ORDER BY rank LIMIT :limit"
+        ), {'query': expression, 'limit': limit}).fetchall()
+        # FTS5 bm25() is negative with lower being better
+        return [(row[0], -row[1]) for row in rows]
+
+
+class KnowledgeSearch:
+    """Chooses an index backend and keeps it in sync with the knowledge_base table"""
+
+    def __init__(self, db, model, refresh_interval: float = 30.0):
+        """Initialize the search facade; the index is built on first use"""
+        self.db = db
+        self.model = model
+        self.refresh_interval = refresh_interval
+        self.index = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> Optional[str]:
+        return self.index.backend if self.index is not None else None
+
+    def _create_index(self):
+        """Use FTS5 on SQLite, otherwise the in-process index"""
+        if self.db.engine.dialect.name == 'sqlite':
+            try:
+                return SQLiteFTSKnowledgeIndex(self.db)
+            except Exception as e:
+                self.db.session.rollback()
+                logger.warning(f"FTS5 unavailable, using in-process knowledge index: {e}")
+        return InMemoryKnowledgeIndex()
+
+    def _table_signature(self) -> Tuple[Any, Any]:
+        """Fingerprint of knowledge_base the index is checked against
+
+        The in-process index is private to this worker, so any change seen
+        through (row count, latest update) means a rebuild. The FTS5 table is
+        shared by every worker and each one upserts its own writes into it, so
+        it is compared by (active row count, highest active id) and only
+        rebuilt when rows were written without going through the index.
+        """
+        if isinstance(self.index, SQLiteFTSKnowledgeIndex):
+            return tuple(self.db.session.query(
+                func.count(self.model.id), func.max(self.model.id)
+            ).filter(self.model.is_active == True).one())  # noqa: E712
+        return tuple(self.db.session.query(
+            func.count(self.model.id), func.max(self.model.updated_at)
+        ).one())
+
+    def _index_signature(self) -> Optional[Tuple[Any, Any]]:
+        if isinstance(self.index, SQLiteFTSKnowledgeIndex):
+            return self.index.signature()
+        return self._signature
+
+    def _ensure_ready(self):
+        """Build the index once and re-sync it when the table changed elsewhere"""
+        with self._lock:
+            if self.index is None:
+                self.index = self._create_index()
+                self._signature = None
+            now = time.monotonic()
+            if self._signature is not None and now - self._checked_at < self.refresh_interval:
+                return
+            self._checked_at = now
+            signature = self._table_signature()
+            if signature != self._index_signature():
+                self.rebuild()
+            self._signature = signature
+
+    def rebuild(self):
+        """Re-index every active knowledge base entry"""
+        entries = self.model.query.filter_by(is_active=True).all()
+        if isinstance(self.index, SQLiteFTSKnowledgeIndex):
+            self.db.session.execute(text(f"DELETE FROM {self.index.table}"))
+            for entry in entries:
+                self.index.upsert(entry.id, knowledge_document(entry), commit=False)
+            self.db.session.commit()
+        else:
+            self.index.clear()
+            for entry in entries:
+                self.index.upsert(entry.id, knowledge_document(entry))
+        logger.info(f"Rebuilt {self.index.backend} knowledge index with {len(entries)} entries")
+
+    def upsert(self, knowledge):
+        """Incrementally index a created or updated entry"""
+        self._ensure_ready()
+        if knowledge.is_active is False:
+            self.index.remove(knowledge.id)
+        else:
+            self.index.upsert(knowledge.id, knowledge_document(knowledge))
+        self._signature = self._table_signature()
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Return ranked (knowledge_id, score) pairs"""
+        self._ensure_ready()
+        return self.index.search(query, limit)
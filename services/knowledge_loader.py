@@ -0,0 +1,173 @@
+"""
+Knowledge Loader for responses.json
+Validated, immutable knowledge base snapshots and a background file watcher
+that swaps in a new snapshot when the file changes
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.trigger_index import TriggerIndex
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBaseError(ValueError):
+    """responses.json is missing, unparsable or has the wrong shape"""
+
+
+def validate_knowledge_base(knowledge_base: Any) -> Dict[str, Dict[str, list]]:
+    """Check the category -> trigger -> [responses] shape and return the data"""
+    if not isinstance(knowledge_base, dict) or not knowledge_base:
+        raise KnowledgeBaseError('expected a non-empty object of categories')
+    for category, triggers in knowledge_base.items():
+        if not isinstance(triggers, dict):
+            raise KnowledgeBaseError(f"category {category!r} must map triggers to responses")
+        for trigger, responses in triggers.items():
+            if not trigger.strip():
+                raise KnowledgeBaseError(f"empty trigger in category {category!r}")
+            if not isinstance(responses, list) or not responses:
+                raise KnowledgeBaseError(f"trigger {trigger!r} needs a non-empty list of responses")
+            if not all(isinstance(response, str) for response in responses):
+                raise KnowledgeBaseError(f"trigger {trigger!r} has a non-string response")
+    return knowledge_base
+
+
+class KnowledgeSnapshot:
+    """A knowledge base together with everything derived from it
+
+    Snapshots are never modified after construction, so readers holding one
+    always see a consistent table and index.
+    """
+
+    __slots__ = ('knowledge_base', 'trigger_index', 'version', 'loaded_at', 'source')
+
+    def __init__(self, knowledge_base: Dict[str, Any], source: str = 'default'):
+        """Build the derived indexes for a validated knowledge base"""
+        self.knowledge_base = knowledge_base
+        self.trigger_index = TriggerIndex(knowledge_base)
+        # Content hash, so cached replies from an older knowledge base never match
+        self.version = hashlib.sha1(
+            json.dumps(knowledge_base, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:12]
+        self.loaded_at = datetime.now().isoformat()
+        self.source = source
+
+
+def load_snapshot(path: str) -> KnowledgeSnapshot:
+    """Read, validate and index a responses.json file"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            knowledge_base = json.load(f)
+    except json.JSONDecodeError as e:
+        raise KnowledgeBaseError(f"invalid JSON: {e}")
+    return KnowledgeSnapshot(validate_knowledge_base(knowledge_base), source=path)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, size, inode) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class KnowledgeBaseWatcher:
+    """Polls responses.json and hands freshly built snapshots to a callback
+
+    Parsing, validation and index building all happen on the watcher thread.
+    A file that fails validation is logged and skipped, and the current
+    snapshot stays in place. Editors that replace the file (new inode) and
+    ones that write it in place (new mtime/size) are both detected.
+    """
+
+    def __init__(self, path: str, on_reload: Callable[[KnowledgeSnapshot, float], None],
+                 interval: float = 2.0, settle: float = 0.2):
+        """Initialize the watcher; call start() to begin polling"""
+        self.path = path
+        self.on_reload = on_reload
+        self.interval = interval
+        self.settle = settle
+        self._signature = file_signature(path)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Start polling, restarting the thread in forked worker processes"""
+        if self.interval <= 0 or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ven-knowledge-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop polling"""
+        self._stop.set()
+
+    def mark_loaded(self):
+        """Record the current file state as already loaded"""
+        self._signature = file_signature(self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Knowledge base watcher error: {e}")
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last load; returns whether it swapped"""
+        self.checks += 1
+        signature = file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+
+        # Let a writer that is still saving finish before reading
+        time.sleep(self.settle)
+        if file_signature(self.path) != signature:
+            return False
+
+        started = time.perf_counter()
+        try:
+            snapshot = load_snapshot(self.path)
+        except Exception as e:
+            self._signature = signature
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Rejected {self.path}, keeping the current knowledge base: {e}")
+            return False
+
+        self._signature = signature
+        self.reloads += 1
+        self.last_error = None
+        self.on_reload(snapshot, (time.perf_counter() - started) * 1000)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        return {
+            'watching': self._thread is not None and self._thread.is_alive(),
+            'interval': self.interval,
+            'checks': self.checks,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,167 @@
+"""
+Language Detector for offline language identification
+Character n-gram profiles built from a bundled corpus, no network I/O
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'language_corpus.json')
+DEFAULT_LANGUAGE = 'en'
+
+# Scripts that identify a language on their own (ISO 639-1 codes)
+SCRIPT_RANGES: List[Tuple[int, int, str]] = [
+    (0x0980, 0x09FF, 'bn'),   # Bengali
+    (0x0600, 0x06FF, 'ar'),   # Arabic
+    (0x0400, 0x04FF, 'ru'),   # Cyrillic
+    (0x0900, 0x097F, 'hi'),   # Devanagari
+    (0x0370, 0x03FF, 'el'),   # Greek
+    (0x0590, 0x05FF, 'he'),   # Hebrew
+    (0x0E00, 0x0E7F, 'th'),   # Thai
+    (0x3040, 0x30FF, 'ja'),   # Hiragana and Katakana
+    (0xAC00, 0xD7AF, 'ko'),   # Hangul syllables
+    (0x4E00, 0x9FFF, 'zh'),   # CJK unified ideographs
+]
+
+_NON_LETTERS = re.compile(r"[^\w']+|[\d_]+")
+
+
+class LanguageDetector:
+    """Naive Bayes classifier over character 1-3 gram profiles"""
+
+    def __init__(self, corpus_path: str = DEFAULT_CORPUS_PATH, max_order: int = 3,
+                 min_letters: int = 8, default: str = DEFAULT_LANGUAGE):
+        """Initialize the detector; profiles are built on first use"""
+        self.corpus_path = corpus_path
+        self.max_order = max_order
+        self.min_letters = min_letters
+        self.default = default
+        self.languages: List[str] = []
+        self._deltas: List[Dict[str, float]] = []
+        self._unseen: List[float] = []
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """Build the n-gram tables from the bundled corpus once"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.corpus_path, 'r', encoding='utf-8') as f:
+                    corpus = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error loading language corpus: {e}")
+                corpus = {}
+            self._build(corpus)
+            self._loaded = True
+
+    def _build(self, corpus: Dict[str, str]):
+        """Turn per-language sample text into smoothed log-probability tables"""
+        profiles = {lang: Counter(self._ngrams(text)) for lang, text in corpus.items()}
+        self.languages = list(profiles)
+        vocabulary = set()
+        for profile in profiles.values():
+            vocabulary.update(profile)
+
+        # Store each seen n-gram as its gain over the unseen probability so a
+        # message only pays for the n-grams a language actually knows
+        size = len(vocabulary) or 1
+        self._unseen = []
+        self._deltas = []
+        for lang in self.languages:
+            total = sum(profiles[lang].values()) + size
+            self._unseen.append(math.log(1.0 / total))
+            self._deltas.append({
+                gram: math.log(count + 1.0) for gram, count in profiles[lang].items()
+            })
+
+    def _ngrams(self, text: str) -> List[str]:
+        """Split text into padded character n-grams"""
+        grams = []
+        for word in _NON_LETTERS.sub(' ', text.lower()).split():
+            grams.extend(word)
+            padded = f' {word} '
+            for n in range(2, self.max_order + 1):
+                grams.extend([padded[i:i + n] for i in range(len(padded) - n + 1)])
+        return grams
+
+    @staticmethod
+    def _detect_script(text: str) -> Optional[str]:
+        """Return a language for texts written in a distinctive script"""
+        if text.isascii():
+            return None
+        counts: Dict[str, int] = {}
+        for char in text:
+            code = ord(char)
+            if code < 0x0370:
+                continue
+            for start, end, lang in SCRIPT_RANGES:
+                if start <= code <= end:
+                    counts[lang] = counts.get(lang, 0) + 1
+                    break
+        if not counts:
+            return None
+        # Kana wins over shared CJK ideographs
+        if counts.get('ja'):
+            return 'ja'
+        return max(counts.items(), key=lambda item: item[1])[0]
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Get normalized probabilities for every profiled language"""
+        self._ensure_loaded()
+        if not self.languages:
+            return {}
+        grams = self._ngrams(text)
+        count = len(grams)
+        totals = [
+            count * unseen + sum(map(deltas.get, grams, repeat(0.0)))
+            for unseen, deltas in zip(self._unseen, self._deltas)
+        ]
+
+        peak = max(totals)
+        weights = [math.exp(total - peak) for total in totals]
+        norm = sum(weights)
+        return {lang: weight / norm for lang, weight in zip(self.languages, weights)}
+
+    def detect(self, text: str) -> str:
+        """Detect the language of a single message"""
+        script_language = self._detect_script(text)
+        if script_language:
+            return script_language
+
+        # Too little text to tell apart Latin-script languages
+        if len(_NON_LETTERS.sub('', text)) < self.min_letters:
+            return self.default
+
+        probabilities = self.scores(text)
+        if not probabilities:
+            return self.default
+        return max(probabilities.items(), key=lambda item: item[1])[0]
+
+    def detect_batch(self, texts: List[str]) -> List[str]:
+        """Detect the language of many messages at once"""
+        self._ensure_loaded()
+        return [self.detect(text) for text in texts]
+
+
+_default_detector: Optional[LanguageDetector] = None
+
+
+def get_language_detector() -> LanguageDetector:
+    """Get the process-wide language detector"""
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = LanguageDetector()
+    return _default_detector
@@ -0,0 +1,163 @@
+"""
+Logging Configuration for the Ven services
+Queue-based, non-blocking log pipeline with JSON output and sampling of
+high-volume events
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Pass as ``extra=SAMPLED`` on high-volume events; only one in LOG_SAMPLE_EVERY
+# of them is emitted
+SAMPLED = {'sampled': True}
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != 'sampled':
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Let one in ``every`` records through for each sampled message template"""
+
+    def __init__(self, every: int = 100):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, 'sampled', False) or self.every == 1:
+            return True
+        key = (record.name, str(record.msg))
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % self.every:
+            return False
+        record.sample_rate = self.every
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the calling thread
+
+    The message and any traceback are rendered before the record is queued,
+    so later changes to mutable arguments cannot alter what is logged; the
+    JSON or text formatting and the write happen on the listener thread.
+    When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip('\n')
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_output_handlers: Tuple[logging.Handler, ...] = ()
+
+
+def _start_listener(queue_size: int, forked: bool = False):
+    """Start a listener thread draining a fresh queue"""
+    global _listener
+    if forked:
+        # The parent's listener may have been mid-write when the process forked
+        for handler in _output_handlers:
+            if isinstance(handler, logging.FileHandler):
+                handler.stream = None
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_output_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging() -> logging.Logger:
+    """Route the root logger through a queue to stderr or LOG_FILE
+
+    LOG_LEVEL sets the level, LOG_FORMAT picks ``json`` (default) or ``text``,
+    LOG_SAMPLE_EVERY controls sampling of records logged with ``extra=SAMPLED``
+    and LOG_QUEUE_SIZE bounds the queue. The listener is restarted in forked
+    worker processes.
+    """
+    global _queue_handler, _output_handlers
+    if _queue_handler is not None:
+        return logging.getLogger()
+
+    level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    log_file = os.getenv('LOG_FILE')
+    output = logging.FileHandler(log_file, encoding='utf-8') if log_file else logging.StreamHandler(sys.stderr)
+    if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    else:
+        output.setFormatter(JsonFormatter())
+    _output_handlers = (output,)
+
+    queue_size = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(SamplingFilter(int(os.getenv('LOG_SAMPLE_EVERY', 100))))
+    _start_listener(queue_size)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    # A forked worker inherits the handler but not the listener thread
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: _start_listener(queue_size, forked=True))
+    atexit.register(stop_logging)
+    return root
@@ -0,0 +1,158 @@
+"""
+Math Evaluator for arithmetic in chat messages
+Parses expressions with ast and evaluates only whitelisted operators
+under size and time limits
+"""
+
+import ast
+import math
+import operator
+import re
+import time
+from typing import Callable, Optional, Union
+
+from services.cache import LRUCache
+
+Number = Union[int, float]
+
+# Characters kept when pulling an expression out of a chat message
+_EXPRESSION_CHARS = re.compile(r'[^0-9+\-*/()^.\s]')
+
+MAX_EXPRESSION_LENGTH = 256
+MAX_NODES = 128
+MAX_EXPONENT = 1024
+MAX_RESULT_BITS = 4096
+MAX_FLOAT = 1e300
+TIME_BUDGET = 0.01
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow
+}
+
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg
+}
+
+
+class MathError(ValueError):
+    """The expression is not valid arithmetic"""
+
+
+class MathLimitError(MathError):
+    """The expression is valid but too expensive to evaluate"""
+
+
+def extract_expression(message: str) -> str:
+    """Strip a chat message down to its arithmetic expression"""
+    return _EXPRESSION_CHARS.sub('', message).replace('^', '**').strip()
+
+
+class MathEvaluator:
+    """Evaluates arithmetic expressions in bounded time and memory
+
+    Expressions are parsed once into a tree of closures, which is cached, so
+    repeated questions skip parsing and validation.
+    """
+
+    def __init__(self, max_exponent: int = MAX_EXPONENT, max_result_bits: int = MAX_RESULT_BITS,
+                 time_budget: float = TIME_BUDGET, cache_size: int = 1024):
+        """Initialize the evaluator with its limits"""
+        self.max_exponent = max_exponent
+        self.max_result_bits = max_result_bits
+        self.time_budget = time_budget
+        self._compiled = LRUCache(maxsize=cache_size)
+
+    def evaluate(self, expression: str) -> Number:
+        """Evaluate an arithmetic expression; raises MathError or MathLimitError"""
+        expression = expression.strip()
+        compiled = self._compiled.get(expression)
+        if compiled is None:
+            compiled = self.compile(expression)
+            self._compiled.set(expression, compiled)
+        deadline = time.perf_counter() + self.time_budget
+        return compiled(deadline)
+
+    def compile(self, expression: str) -> Callable[[float], Number]:
+        """Validate an expression and turn it into a callable taking a deadline"""
+        if not expression:
+            raise MathError('empty expression')
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise MathLimitError('expression is too long')
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            raise MathError('not a valid expression')
+        if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+            raise MathLimitError('expression is too complex')
+        return self._compile_node(tree.body)
+
+    def _compile_node(self, node: ast.AST) -> Callable[[float], Number]:
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            value = self._check(node.value)
+            return lambda deadline: value
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            apply = _UNARY_OPERATORS[type(node.op)]
+            operand = self._compile_node(node.operand)
+            return lambda deadline: apply(operand(deadline))
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            apply = _BINARY_OPERATORS[type(node.op)]
+            is_power = isinstance(node.op, ast.Pow)
+            left = self._compile_node(node.left)
+            right = self._compile_node(node.right)
+
+            def binary(deadline: float) -> Number:
+                a = left(deadline)
+                b = right(deadline)
+                if time.perf_counter() > deadline:
+                    raise MathLimitError('calculation took too long')
+                if is_power:
+                    self._check_power(a, b)
+                try:
+                    return self._check(apply(a, b))
+                except ZeroDivisionError:
+                    raise MathError('division by zero')
+                except OverflowError:
+                    raise MathLimitError('result is too large')
+
+            return binary
+
+        raise MathError(f"unsupported syntax: {type(node).__name__}")
+
+    def _check_power(self, base: Number, exponent: Number):
+        """Refuse powers whose result would be huge before computing them"""
+        if abs(exponent) > self.max_exponent:
+            raise MathLimitError('exponent is too large')
+        if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+            if base.bit_length() * exponent > self.max_result_bits:
+                raise MathLimitError('result is too large')
+
+    def _check(self, value: Number) -> Number:
+        """Enforce the result magnitude limit"""
+        if isinstance(value, complex):
+            raise MathError('result is not a real number')
+        if isinstance(value, int):
+            if value.bit_length() > self.max_result_bits:
+                raise MathLimitError('result is too large')
+        elif not math.isfinite(value) or abs(value) > MAX_FLOAT:
+            raise MathLimitError('result is too large')
+        return value
+
+
+_default_evaluator: Optional[MathEvaluator] = None
+
+
+def get_math_evaluator() -> MathEvaluator:
+    """Get the process-wide math evaluator"""
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = MathEvaluator()
+    return _default_evaluator
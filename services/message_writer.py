@@ -0,0 +1,262 @@
+"""
+Message Writer for write-behind chat persistence
+Queues user/bot message pairs and commits them in batches off the request path
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingBatch:
+    """Messages that must be committed together, with an optional waiter"""
+
+    __slots__ = ('messages', 'done', 'ok')
+
+    def __init__(self, messages: List[Dict[str, Any]], durable: bool):
+        self.messages = messages
+        self.done = threading.Event() if durable else None
+        self.ok = False
+
+
+class _Task:
+    """A deferred database write run on the flush thread"""
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func: Callable[..., Any], args: tuple):
+        self.func = func
+        self.args = args
+
+
+class MessageWriter:
+    """Background writer that batches message inserts into few commits"""
+
+    def __init__(self, app, db_service, batch_size: int = 200, flush_interval: float = 0.05,
+                 max_queue: int = 10000, durable_timeout: float = 5.0):
+        """Initialize the writer; the flush thread starts on first use"""
+        self.app = app
+        self.db_service = db_service
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durable_timeout = durable_timeout
+        self._queue: "queue.Queue[Union[_PendingBatch, _Task, None]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # Held while checking _stopping and queueing, so nothing lands behind
+        # the stop sentinel where the flush thread would never see it
+        self._enqueue_lock = threading.Lock()
+        self._stopping = False
+
+        self.batches_written = 0
+        self.messages_written = 0
+        self.messages_failed = 0
+        self.sync_fallbacks = 0
+        self.sync_failures = 0
+        self.tasks_run = 0
+        self.tasks_failed = 0
+
+        atexit.register(self.stop)
+
+    def _ensure_started(self):
+        """Start the flush thread, restarting it in forked worker processes"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='ven-message-writer', daemon=True)
+            self._thread.start()
+
+    def write_pair(self, chat_id: str, user_id: int, user_message: str, bot_message: str,
+                   durable: bool = False, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue a user message and the bot reply to it
+
+        With ``durable=True`` the call blocks until the batch holding the pair
+        has been committed and returns whether the commit succeeded.
+        """
+        now = datetime.utcnow()
+        messages = [
+            {'chat_id': chat_id, 'user_id': user_id, 'message': user_message,
+             'sender': 'user', 'created_at': now},
+            {'chat_id': chat_id, 'user_id': user_id, 'message': bot_message,
+             'sender': 'bot', 'metadata': metadata, 'created_at': datetime.utcnow()}
+        ]
+        return self.write(messages, durable=durable)
+
+    def write(self, messages: List[Dict[str, Any]], durable: bool = False) -> bool:
+        """Queue messages that must be committed together"""
+        if self._stopping:
+            return self._write_now(messages)
+
+        self._ensure_started()
+        pending = _PendingBatch(messages, durable)
+        try:
+            if not self._enqueue(pending):
+                return self._write_now(messages)
+        except queue.Full:
+            # Backpressure: the database is falling behind, write inline
+            self.sync_fallbacks += 1
+            return self._write_now(messages)
+
+        if pending.done is None:
+            return True
+        if not pending.done.wait(self.durable_timeout):
+            logger.warning("Timed out waiting for durable message write")
+            return False
+        return pending.ok
+
+    def submit(self, func: Callable[..., Any], *args):
+        """Run ``func(*args)`` on the flush thread inside an app context
+
+        Used for write-through of evicted conversation state so request
+        threads do not wait on the database. Runs inline while stopping or
+        when the queue is full.
+        """
+        task = _Task(func, args)
+        if self._stopping:
+            self._run_task(task)
+            return
+        self._ensure_started()
+        try:
+            if not self._enqueue(task):
+                self._run_task(task)
+        except queue.Full:
+            self.sync_fallbacks += 1
+            self._run_task(task)
+
+    def _enqueue(self, item: Union[_PendingBatch, _Task]) -> bool:
+        """Queue an item for the flush thread; False once the writer is stopping"""
+        with self._enqueue_lock:
+            if self._stopping:
+                return False
+            self._queue.put_nowait(item)
+        return True
+
+    def _run_task(self, task: _Task):
+        try:
+            with self.app.app_context():
+                task.func(*task.args)
+            self.tasks_run += 1
+        except Exception as e:
+            self.tasks_failed += 1
+            logger.error("Deferred write %s failed: %s", getattr(task.func, '__name__', task.func), e)
+
+    def _write_now(self, messages: List[Dict[str, Any]]) -> bool:
+        """Write messages synchronously in the calling thread"""
+        try:
+            with self.app.app_context():
+                self.db_service.save_messages_bulk(messages)
+            return True
+        except Exception:
+            self.sync_failures += 1
+            self.messages_failed += len(messages)
+            logger.exception("Dropped %s messages in a synchronous write", len(messages))
+            return False
+
+    def _run(self):
+        """Collect queued pairs into batches and commit them, running deferred writes in between"""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            if isinstance(first, _Task):
+                self._run_task(first)
+                continue
+            batch = [first]
+            tasks = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            size = len(first.messages)
+            while size < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, _Task):
+                    tasks.append(item)
+                    continue
+                batch.append(item)
+                size += len(item.messages)
+            self._flush(batch)
+            for task in tasks:
+                self._run_task(task)
+            if stop:
+                break
+
+    def _flush(self, batch: List[_PendingBatch]):
+        """Commit a batch and wake any durable waiters
+
+        When the combined commit fails, each pending write is retried on its
+        own so one bad turn does not take the rest of the batch with it.
+        """
+        try:
+            self._save(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0], e)
+            else:
+                logger.warning("Batch of %s writes failed (%s), retrying them one by one", len(batch), e)
+                for pending in batch:
+                    try:
+                        self._save([pending])
+                    except Exception as item_error:
+                        self._fail(pending, item_error)
+        finally:
+            for pending in batch:
+                if pending.done is not None:
+                    pending.done.set()
+
+    def _save(self, batch: List[_PendingBatch]):
+        """Commit the messages of one or more pending writes in one transaction"""
+        messages = [message for pending in batch for message in pending.messages]
+        with self.app.app_context():
+            self.db_service.save_messages_bulk(messages)
+        for pending in batch:
+            pending.ok = True
+        self.batches_written += 1
+        self.messages_written += len(messages)
+
+    def _fail(self, pending: _PendingBatch, error: Exception):
+        pending.ok = False
+        self.messages_failed += len(pending.messages)
+        logger.error("Dropped %s messages: %s", len(pending.messages), error)
+
+    def stop(self, timeout: float = 10.0):
+        """Drain queued messages and stop the flush thread"""
+        with self._enqueue_lock:
+            self._stopping = True
+            thread = self._thread
+            if thread is None or self._pid != os.getpid() or not thread.is_alive():
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("Message writer did not drain within %.1fs", timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get writer statistics"""
+        return {
+            'queued': self._queue.qsize(),
+            'batches_written': self.batches_written,
+            'messages_written': self.messages_written,
+            'messages_failed': self.messages_failed,
+            'sync_fallbacks': self.sync_fallbacks,
+            'sync_failures': self.sync_failures,
+            'tasks_run': self.tasks_run,
+            'tasks_failed': self.tasks_failed
+        }
@@ -0,0 +1,241 @@
+"""
+Metrics for hot-path instrumentation
+Timing spans aggregated into fixed-bucket histograms, labelled counters and
+Prometheus text exposition
+"""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+# Upper bounds in seconds, from 25us up to 5s
+DEFAULT_BUCKETS = (
+    0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class HistogramSeries:
+    """Bucket counts, sum and count for one label value"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram:
+    """Histogram with one series per value of a single label"""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self.series: Dict[str, HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, value: str) -> HistogramSeries:
+        """Get the series for a label value, creating it on first use"""
+        series = self.series.get(value)
+        if series is None:
+            with self._lock:
+                series = self.series.setdefault(value, HistogramSeries(self.buckets))
+        return series
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for value, series in sorted(self.series.items()):
+            with series._lock:
+                counts = list(series.counts)
+                total, count = series.sum, series.count
+            label = f'{self.label}="{_escape(value)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label}}} {total!r}')
+            lines.append(f'{self.name}_count{{{label}}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one value per label value"""
+
+    def __init__(self, name: str, help_text: str, label: str):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.values: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: str, amount: int = 1):
+        with self._lock:
+            self.values[value] = self.values.get(value, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for value, count in sorted(self.values.items()):
+            lines.append(f'{self.name}{{{self.label}="{_escape(value)}"}} {count}')
+        return lines
+
+
+class Gauge:
+    """Values read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, label: str, collect: Callable[[], Dict[str, float]]):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for value, reading in sorted(self.collect().items()):
+            if reading is not None:
+                lines.append(f'{self.name}{{{self.label}="{_escape(value)}"}} {_format_value(reading)}')
+        return lines
+
+
+class _Span:
+    """Times a ``with`` block into a histogram series"""
+
+    __slots__ = ('series', 'started')
+
+    def __init__(self, series: HistogramSeries):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.series.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _NullSpan:
+    """Stand-in span used while metrics are disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class MetricsRegistry:
+    """Process-wide metrics
+
+    Disabling the registry (METRICS_ENABLED=false) makes ``timed`` and
+    ``instrument`` return the undecorated functions, so there is no cost at
+    all; ``span`` and ``count`` become a shared no-op and a single check.
+    Each worker process keeps its own numbers.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """Initialize the registry with the built-in stage histogram"""
+        self.enabled = enabled
+        self.metrics: List = []
+        self.stages = self.histogram(
+            'ven_stage_duration_seconds', 'Time spent in each request stage', 'stage'
+        )
+
+    def histogram(self, name: str, help_text: str, label: str,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        histogram = Histogram(name, help_text, label, buckets)
+        self.metrics.append(histogram)
+        return histogram
+
+    def counter(self, name: str, help_text: str, label: str) -> Counter:
+        counter = Counter(name, help_text, label)
+        self.metrics.append(counter)
+        return counter
+
+    def gauge(self, name: str, help_text: str, label: str, collect: Callable[[], Dict[str, float]]) -> Gauge:
+        gauge = Gauge(name, help_text, label, collect)
+        self.metrics.append(gauge)
+        return gauge
+
+    def count(self, counter: Counter, value: str):
+        """Increment a counter while metrics are enabled"""
+        if self.enabled:
+            counter.inc(value)
+
+    def span(self, stage: str):
+        """Context manager timing a block as ``stage``"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.stages.labels(stage))
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator timing every call of a function as ``stage``"""
+        def decorate(func: Callable) -> Callable:
+            if not self.enabled:
+                return func
+            observe = self.stages.labels(stage).observe
+            perf_counter = time.perf_counter
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    observe(perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def instrument(self, prefix: str) -> Callable[[type], type]:
+        """Class decorator timing every public method as ``<prefix>.<method>``"""
+        def decorate(cls: type) -> type:
+            if not self.enabled:
+                return cls
+            for name, attribute in list(vars(cls).items()):
+                if not name.startswith('_') and inspect.isfunction(attribute):
+                    setattr(cls, name, self.timed(f"{prefix}.{name}")(attribute))
+            return cls
+        return decorate
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry(enabled=os.getenv('METRICS_ENABLED', 'true').lower() == 'true')
+
+# Messages analyzed per detected intent
+intent_counter = metrics.counter('ven_intents_total', 'Analyzed messages by detected intent', 'intent')
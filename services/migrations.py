@@ -0,0 +1,146 @@
+"""
+Schema Migrations for the Ven database
+Ordered, versioned schema changes recorded in a schema_migrations table, so
+databases created by older releases catch up with what db.create_all builds
+for a fresh one
+
+Usage:
+    python -m services.migrations              # migrate DATABASE_URL
+    python -m services.migrations --status     # list applied and pending versions
+"""
+
+import argparse
+import logging
+import os
+from datetime import datetime
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, create_engine,
+                        insert, inspect, select)
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+# (table, index, columns) for the hot read queries in DatabaseService; a
+# leading "-" makes a column descending. models.py declares the same indexes.
+QUERY_INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    # get_chat_messages / get_chat_messages_page and the per-chat aggregates
+    ('messages', 'ix_messages_chat_created_id', ('chat_id', 'created_at', 'id')),
+    # get_user_chats
+    ('chats', 'ix_chats_user_active_updated', ('user_id', 'is_active', 'updated_at')),
+    # get_conversation_context / save_conversation_context
+    ('conversation_contexts', 'ix_conversation_contexts_chat_user', ('chat_id', 'user_id')),
+    # get_responses without and with a category
+    ('responses', 'ix_responses_active_priority', ('is_active', '-priority', 'trigger')),
+    ('responses', 'ix_responses_active_category_priority', ('is_active', 'category', '-priority', 'trigger')),
+    # get_knowledge_base without and with a category
+    ('knowledge_base', 'ix_knowledge_base_active_confidence', ('is_active', '-confidence', 'topic')),
+    ('knowledge_base', 'ix_knowledge_base_active_category_confidence',
+     ('is_active', 'category', '-confidence', 'topic')),
+]
+
+
+def create_indexes(connection: Connection, indexes: Sequence[Tuple[str, str, Tuple[str, ...]]]):
+    """Create the named indexes that do not exist yet on the reflected tables
+
+    Missing tables are skipped; db.create_all builds them with the indexes
+    declared in models.py.
+    """
+    inspector = inspect(connection)
+    existing = {}
+    for table_name, index_name, columns in indexes:
+        if table_name not in existing:
+            if not inspector.has_table(table_name):
+                continue
+            existing[table_name] = {index['name'] for index in inspector.get_indexes(table_name)}
+        if table_name not in existing or index_name in existing[table_name]:
+            continue
+        table = Table(table_name, MetaData(), autoload_with=connection)
+        expressions = [
+            table.c[column[1:]].desc() if column.startswith('-') else table.c[column]
+            for column in columns
+        ]
+        Index(index_name, *expressions).create(connection)
+        existing[table_name].add(index_name)
+        logger.info("Created index %s on %s", index_name, table_name)
+
+
+class Migration:
+    """One schema change, applied at most once per database"""
+
+    def __init__(self, version: int, description: str, upgrade: Callable[[Connection], None]):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+
+# Append only; never renumber or edit a migration that has shipped
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'Composite indexes for chat history, chat lists, contexts, responses and knowledge',
+              lambda connection: create_indexes(connection, QUERY_INDEXES)),
+]
+
+
+def applied_versions(connection: Connection) -> List[int]:
+    schema_migrations.create(connection, checkfirst=True)
+    return sorted(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def migrate(engine: Engine) -> List[int]:
+    """Apply pending migrations in order, each in its own transaction
+
+    Run after db.create_all. Returns the versions applied by this call.
+    """
+    with engine.begin() as connection:
+        applied = set(applied_versions(connection))
+
+    done = []
+    for migration in sorted(MIGRATIONS, key=lambda item: item.version):
+        if migration.version in applied:
+            continue
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(insert(schema_migrations).values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.utcnow()
+            ))
+        done.append(migration.version)
+        logger.info("Applied migration %s: %s", migration.version, migration.description)
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--url', default=os.getenv('DATABASE_URL', 'sqlite:///ven_chatbot.db'),
+                        help='database URL (default: DATABASE_URL)')
+    parser.add_argument('--status', action='store_true', help='list migrations without applying them')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url)
+    try:
+        if args.status:
+            with engine.begin() as connection:
+                applied = set(applied_versions(connection))
+            for migration in MIGRATIONS:
+                state = 'applied' if migration.version in applied else 'pending'
+                print(f"{migration.version:>4}  {state:<8} {migration.description}")
+        else:
+            done = migrate(engine)
+            print(f"Applied migrations: {done}" if done else "Database is up to date")
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,115 @@
+"""
+NLP Resources for lazy model loading
+NLTK corpora, the lemmatizer and TextBlob are only loaded on first use
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# NLTK data packages required by the AI service
+NLTK_PACKAGES = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet'
+}
+
+_lock = threading.RLock()
+_nltk_ready = False
+_lemmatizer = None
+_stop_words: Optional[Set[str]] = None
+_textblob_class = None
+
+
+def ensure_nltk_data():
+    """Make sure the NLTK data packages are available, downloading if needed"""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _lock:
+        if _nltk_ready:
+            return
+        import nltk
+        for package, path in NLTK_PACKAGES.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                logger.info("Downloading NLTK package: %s", package)
+                nltk.download(package, quiet=True)
+        _nltk_ready = True
+
+
+def get_lemmatizer():
+    """Get the shared WordNet lemmatizer"""
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _lock:
+            if _lemmatizer is None:
+                ensure_nltk_data()
+                from nltk.stem import WordNetLemmatizer
+                _lemmatizer = WordNetLemmatizer()
+    return _lemmatizer
+
+
+def get_stop_words() -> Set[str]:
+    """Get the English stop word set"""
+    global _stop_words
+    if _stop_words is None:
+        with _lock:
+            if _stop_words is None:
+                ensure_nltk_data()
+                from nltk.corpus import stopwords
+                _stop_words = set(stopwords.words('english'))
+    return _stop_words
+
+
+def get_textblob_class():
+    """Get the TextBlob class, importing textblob on first use"""
+    global _textblob_class
+    if _textblob_class is None:
+        with _lock:
+            if _textblob_class is None:
+                from textblob import TextBlob
+                _textblob_class = TextBlob
+    return _textblob_class
+
+
+def word_tokenize(text: str) -> List[str]:
+    """Tokenize text into words"""
+    ensure_nltk_data()
+    from nltk.tokenize import word_tokenize as nltk_word_tokenize
+    return nltk_word_tokenize(text)
+
+
+def sent_tokenize(text: str) -> List[str]:
+    """Tokenize text into sentences"""
+    ensure_nltk_data()
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+    return nltk_sent_tokenize(text)
+
+
+def preload() -> Dict[str, Any]:
+    """Load every NLP resource now and return per-resource timings in ms
+
+    Meant to run once in the gunicorn master (``--preload``) so forked workers
+    share the loaded pages copy-on-write instead of each loading their own.
+    """
+    timings = {}
+
+    def timed(name, loader):
+        start = time.perf_counter()
+        loader()
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    timed('nltk_data', ensure_nltk_data)
+    # WordNet and punkt are themselves lazy inside NLTK, so touch them too
+    timed('lemmatizer', lambda: get_lemmatizer().lemmatize('warming'))
+    timed('stop_words', get_stop_words)
+    timed('tokenizers', lambda: sent_tokenize(' '.join(word_tokenize('Warm up. Ready now.'))))
+    timed('textblob', lambda: get_textblob_class()('warm up').sentiment)
+
+    logger.info("Preloaded NLP resources: %s", timings)
+    return timings
@@ -0,0 +1,96 @@
+"""
+Personal Info Extractor for user messages
+Pulls name, age, location and likes out of a message with one precompiled
+regex scan
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+# Patterns per field in priority order; the first group of each is the value.
+# Explicit introductions come before the looser "i am <word>".
+FIELD_PATTERNS: List[Tuple[str, str]] = [
+    ('age', r"i am (\d+) years? old"),
+    ('age', r"i'm (\d+) years? old"),
+    ('age', r"(\d+) years? old"),
+    ('age', r"age (\d+)"),
+    ('location', r"i live in ([^.!?]+)"),
+    ('location', r"i'm from ([^.!?]+)"),
+    ('location', r"location ([^.!?]+)"),
+    ('name', r"my name is ([a-z]+)"),
+    ('name', r"i'm called ([a-z]+)"),
+    ('name', r"call me ([a-z]+)"),
+    ('name', r"i am ([a-z]+)"),
+    ('name', r"i'm ([a-z]+)"),
+    ('likes', r"i love (\w+)"),
+    ('likes', r"i like (\w+)"),
+    ('likes', r"favorite (\w+)"),
+    ('likes', r"love (\w+)")
+]
+
+# Name patterns where the user clearly introduces themselves
+EXPLICIT_NAME_PATTERNS = {r"my name is ([a-z]+)", r"i'm called ([a-z]+)", r"call me ([a-z]+)"}
+
+# Words that follow "i am" / "i'm" without being a name
+NOT_NAMES = {
+    'a', 'an', 'the', 'not', 'so', 'very', 'really', 'just', 'also', 'still', 'here',
+    'from', 'called', 'in', 'at', 'on', 'back', 'new', 'fine', 'good', 'great', 'ok',
+    'okay', 'well', 'happy', 'sad', 'tired', 'bored', 'sorry', 'sure', 'glad', 'going',
+    'trying', 'looking', 'doing', 'feeling', 'working', 'learning', 'interested', 'years'
+}
+
+
+def _build_pattern() -> Tuple['re.Pattern', Dict[str, Tuple[str, int]]]:
+    """Combine every field pattern into one alternation of named groups
+
+    The alternation sits in a lookahead anchored at word starts, so matches
+    may overlap and "i'm 30 years old" still yields the age even though a
+    name pattern starts at the same word.
+    """
+    groups: Dict[str, Tuple[str, int]] = {}
+    alternatives = []
+    for priority, (field, pattern) in enumerate(FIELD_PATTERNS):
+        group = f"{field}{priority}"
+        groups[group] = (field, priority)
+        alternatives.append(pattern.replace('(', f"(?P<{group}>", 1))
+    # Every pattern starts with one of these characters; checking it first lets
+    # the scan skip most word starts without trying the alternation
+    first_chars = ''.join(sorted({pattern[0] for _, pattern in FIELD_PATTERNS} - {'('})) + r'\d'
+    combined = rf"\b(?=[{first_chars}])(?=(?:" + '|'.join(alternatives) + r"))"
+    return re.compile(combined, re.IGNORECASE), groups
+
+
+_PATTERN, _GROUPS = _build_pattern()
+
+
+def extract_personal_info(message: str) -> Dict[str, Any]:
+    """Extract the personal details a message mentions
+
+    Returns a dict with any of ``name``, ``age``, ``location`` and ``likes``.
+    ``name_explicit`` tells whether the name came from a clear introduction
+    ("my name is", "call me") rather than "i am <word>". When several patterns
+    match, the highest-priority one wins per field.
+    """
+    best: Dict[str, Tuple[int, str]] = {}
+    for match in _PATTERN.finditer(message):
+        group = match.lastgroup
+        value = match.group(group)
+        field, priority = _GROUPS[group]
+        if field == 'name' and value.lower() in NOT_NAMES:
+            continue
+        if field not in best or priority < best[field][0]:
+            best[field] = (priority, value)
+
+    info: Dict[str, Any] = {}
+    if 'name' in best:
+        priority, value = best['name']
+        info['name'] = value.title()
+        info['name_explicit'] = FIELD_PATTERNS[priority][1] in EXPLICIT_NAME_PATTERNS
+    if 'age' in best:
+        info['age'] = int(best['age'][1])
+    if 'location' in best:
+        info['location'] = best['location'][1].strip().lower()
+    if 'likes' in best:
+        info['likes'] = best['likes'][1].lower()
+    return info
+
@@ -0,0 +1,299 @@
+"""
+Provider Client for hosted LLM APIs
+Pooled keep-alive connections, per-provider concurrency limits, deadlines
+and coalescing of identical in-flight prompts
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    """A provider call failed or returned an unusable payload"""
+
+
+class Provider:
+    """One hosted model API; subclasses describe the wire format"""
+
+    name = 'provider'
+    default_base_url = ''
+    default_model = ''
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: int = 4, max_tokens: int = 300):
+        """Initialize the provider with its key and limits"""
+        self.api_key = api_key
+        self.base_url = (base_url or self.default_base_url).rstrip('/')
+        self.model = model or self.default_model
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_tokens = max_tokens
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def build_request(self, prompt: str, system: Optional[str]) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """Return the URL, headers and JSON body for a completion request"""
+        raise NotImplementedError
+
+    def parse_response(self, payload: Dict[str, Any]) -> str:
+        """Extract the completion text from a response body"""
+        raise NotImplementedError
+
+
+class OpenAIProvider(Provider):
+    """OpenAI chat completions"""
+
+    name = 'openai'
+    default_base_url = 'https://api.openai.com/v1'
+    default_model = 'gpt-3.5-turbo'
+
+    def build_request(self, prompt, system):
+        messages = [{'role': 'system', 'content': system}] if system else []
+        messages.append({'role': 'user', 'content': prompt})
+        return (
+            f"{self.base_url}/chat/completions",
+            {'Authorization': f"Bearer {self.api_key}"},
+            {'model': self.model, 'messages': messages, 'max_tokens': self.max_tokens}
+        )
+
+    def parse_response(self, payload):
+        return payload['choices'][0]['message']['content']
+
+
+class AnthropicProvider(Provider):
+    """Anthropic messages API"""
+
+    name = 'anthropic'
+    default_base_url = 'https://api.anthropic.com/v1'
+    default_model = 'claude-3-haiku-20240307'
+
+    def build_request(self, prompt, system):
+        body = {
+            'model': self.model,
+            'max_tokens': self.max_tokens,
+            'messages': [{'role': 'user', 'content': prompt}]
+        }
+        if system:
+            body['system'] = system
+        return (
+            f"{self.base_url}/messages",
+            {'x-api-key': self.api_key, 'anthropic-version': '2023-06-01'},
+            body
+        )
+
+    def parse_response(self, payload):
+        return ''.join(block.get('text', '') for block in payload['content'] if block.get('type') == 'text')
+
+
+class GoogleProvider(Provider):
+    """Google Gemini generateContent"""
+
+    name = 'google'
+    default_base_url = 'https://generativelanguage.googleapis.com/v1beta'
+    default_model = 'gemini-pro'
+
+    def build_request(self, prompt, system):
+        text = f"{system}\n\n{prompt}" if system else prompt
+        return (
+            f"{self.base_url}/models/{self.model}:generateContent",
+            {'x-goog-api-key': self.api_key},
+            {
+                'contents': [{'parts': [{'text': text}]}],
+                'generationConfig': {'maxOutputTokens': self.max_tokens}
+            }
+        )
+
+    def parse_response(self, payload):
+        return ''.join(part.get('text', '') for part in payload['candidates'][0]['content']['parts'])
+
+
+# Provider classes in the order they are tried
+PROVIDER_CLASSES = {
+    'openai': OpenAIProvider,
+    'anthropic': AnthropicProvider,
+    'google': GoogleProvider
+}
+
+
+class ProviderClient:
+    """Runs provider calls off the request thread with a bounded wait
+
+    ``complete`` never blocks longer than its deadline: on timeout, failure or
+    when every provider is at its concurrency limit it returns None and the
+    caller keeps its rule-based answer. Concurrent calls for the same prompt
+    share one upstream request; callers can pass a ``key`` to coalesce on
+    something other than the exact prompt.
+    """
+
+    def __init__(self, providers: List[Provider], deadline: float = 8.0):
+        """Initialize the client; threads and connections start on first use"""
+        self.providers = providers
+        self.deadline = deadline
+        self._inflight: Dict[Tuple[Optional[str], Hashable], Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._session: Optional[requests.Session] = None
+        self._pid: Optional[int] = None
+
+        self.requests_sent = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.saturated = 0
+
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, api_keys: Dict[str, Optional[str]]) -> Optional['ProviderClient']:
+        """Build a client for every provider with an API key, or None if there are none
+
+        ``<PROVIDER>_BASE_URL`` and ``<PROVIDER>_MODEL`` override the endpoint
+        and model, e.g. to point OPENAI_BASE_URL at a local mock server.
+        """
+        max_concurrency = int(os.getenv('PROVIDER_MAX_CONCURRENCY', 8))
+        providers = []
+        for name, provider_class in PROVIDER_CLASSES.items():
+            api_key = api_keys.get(name)
+            if not api_key:
+                continue
+            prefix = name.upper()
+            providers.append(provider_class(
+                api_key,
+                base_url=os.getenv(f'{prefix}_BASE_URL'),
+                model=os.getenv(f'{prefix}_MODEL'),
+                max_concurrency=max_concurrency,
+                max_tokens=int(os.getenv('PROVIDER_MAX_TOKENS', 300))
+            ))
+        if not providers:
+            return None
+        return cls(providers, deadline=float(os.getenv('PROVIDER_DEADLINE', 8.0)))
+
+    def _ensure_started(self):
+        """Create the worker pool and HTTP session, recreating them after a fork"""
+        if self._executor is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                return
+            pool_size = sum(provider.max_concurrency for provider in self.providers)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=len(self.providers), pool_maxsize=pool_size, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+            self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='ven-provider')
+            self._inflight = {}
+            self._pid = os.getpid()
+
+    def submit(self, prompt: str, system: Optional[str] = None, deadline: Optional[float] = None,
+               key: Optional[Hashable] = None) -> Future:
+        """Start a completion in the background, joining an in-flight one with the same key"""
+        self._ensure_started()
+        key = (system, prompt if key is None else key)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            expires = time.monotonic() + (deadline if deadline is not None else self.deadline)
+            future = self._executor.submit(self._call_providers, prompt, system, expires)
+            self._inflight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: Tuple[Optional[str], Hashable], future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def complete(self, prompt: str, system: Optional[str] = None, deadline: Optional[float] = None,
+                 key: Optional[Hashable] = None) -> Optional[str]:
+        """Get a completion within the deadline, or None"""
+        timeout = deadline if deadline is not None else self.deadline
+        future = self.submit(prompt, system, timeout, key=key)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Provider call exceeded its {timeout}s deadline")
+            return None
+        except Exception as e:
+            logger.error(f"Provider call failed: {e}")
+            return None
+
+    def _call_providers(self, prompt: str, system: Optional[str], expires: float) -> Optional[str]:
+        """Try providers until one answers or the deadline passes"""
+        candidates = list(self.providers)
+        while candidates:
+            provider = self._acquire(candidates, expires)
+            if provider is None:
+                self.saturated += 1
+                break
+            candidates.remove(provider)
+            try:
+                return self._call(provider, prompt, system, expires - time.monotonic())
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"{provider.name} provider failed: {e}")
+            finally:
+                provider.slots.release()
+        return None
+
+    @staticmethod
+    def _acquire(candidates: List[Provider], expires: float) -> Optional[Provider]:
+        """Take a slot on the first provider with spare capacity, else wait for the preferred one"""
+        for provider in candidates:
+            if provider.slots.acquire(blocking=False):
+                return provider
+        remaining = expires - time.monotonic()
+        if remaining > 0 and candidates[0].slots.acquire(timeout=remaining):
+            return candidates[0]
+        return None
+
+    def _call(self, provider: Provider, prompt: str, system: Optional[str], timeout: float) -> str:
+        """Send one request over the pooled session"""
+        if timeout <= 0:
+            raise ProviderError('deadline passed before the request was sent')
+        url, headers, body = provider.build_request(prompt, system)
+        self.requests_sent += 1
+        response = self._session.post(url, json=body, headers=headers, timeout=timeout)
+        if response.status_code != 200:
+            raise ProviderError(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            text = provider.parse_response(response.json())
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise ProviderError(f"unexpected response payload: {e}")
+        if not text or not text.strip():
+            raise ProviderError('empty completion')
+        return text.strip()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        return {
+            'providers': [provider.name for provider in self.providers],
+            'inflight': len(self._inflight),
+            'requests_sent': self.requests_sent,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts,
+            'failures': self.failures,
+            'saturated': self.saturated
+        }
+
+    def close(self):
+        """Stop the worker pool and close pooled connections"""
+        with self._lock:
+            if self._pid == os.getpid():
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                if self._session is not None:
+                    self._session.close()
+            self._executor = None
+            self._session = None
@@ -0,0 +1,193 @@
+"""
+Response Cache for deterministic replies
+Caches reply candidates per normalized message and intent with per-intent TTLs,
+in process or in Redis
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Seconds each intent's replies stay valid; None caches until the knowledge
+# base changes (the knowledge base version is part of every key)
+DEFAULT_TTLS: Dict[str, Optional[float]] = {
+    'time_query': 60,
+    'date_query': 60,
+    'math_query': None,
+    'information_request': None,
+    'general_conversation': None
+}
+
+# Replies that show the clock expire at the next minute boundary at the latest
+MINUTE_ALIGNED = {'time_query', 'date_query'}
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase and collapse whitespace so trivially different inputs share a key"""
+    return ' '.join(message.lower().split())
+
+
+class InMemoryResponseBackend:
+    """Size-bounded LRU with per-entry expiry"""
+
+    name = 'memory'
+
+    def __init__(self, maxsize: int = 4096):
+        """Initialize the backend with a maximum number of entries"""
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def get(self, key: str) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and time.monotonic() >= expires:
+            self._entries.pop(key)
+            return None
+        return value
+
+    def set(self, key: str, value: List[str], ttl: Optional[float]):
+        expires = time.monotonic() + ttl if ttl is not None else None
+        self._entries.set(key, (expires, value))
+
+    def clear(self):
+        self._entries.clear()
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+
+class RedisResponseBackend:
+    """Redis backend shared by every worker process
+
+    Redis errors are logged and treated as misses so an unavailable cache never
+    fails a reply. Entries without a TTL still expire after ``max_ttl`` seconds.
+    """
+
+    name = 'redis'
+    prefix = 'ven:response:'
+
+    def __init__(self, url: str, max_ttl: int = 86400):
+        """Connect lazily to the Redis server at ``url``"""
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.max_ttl = max_ttl
+
+    def get(self, key: str) -> Optional[List[str]]:
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: List[str], ttl: Optional[float]):
+        seconds = max(1, int(ttl)) if ttl is not None else self.max_ttl
+        try:
+            self.client.set(self.prefix + key, json.dumps(value), ex=seconds)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(match=self.prefix + '*', count=500):
+                self.client.delete(key)
+        except Exception as e:
+            logger.warning(f"Response cache clear failed: {e}")
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ResponseCache:
+    """Per-intent TTL cache in front of deterministic reply handlers"""
+
+    def __init__(self, backend=None, ttls: Optional[Dict[str, Optional[float]]] = None):
+        """Initialize the cache; only intents listed in ``ttls`` are cached"""
+        self.backend = backend or InMemoryResponseBackend()
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._lock = threading.Lock()
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> 'ResponseCache':
+        """Build the cache from RESPONSE_CACHE_* settings, falling back to memory"""
+        backend = None
+        if os.getenv('RESPONSE_CACHE_BACKEND', 'memory').lower() == 'redis':
+            try:
+                backend = RedisResponseBackend(
+                    os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+                    max_ttl=int(os.getenv('RESPONSE_CACHE_REDIS_TTL', 86400))
+                )
+            except Exception as e:
+                logger.warning(f"Redis response cache unavailable, using in-process cache: {e}")
+        if backend is None:
+            backend = InMemoryResponseBackend(maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 4096)))
+        return cls(backend)
+
+    def cacheable(self, intent: str) -> bool:
+        return intent in self.ttls
+
+    def _ttl(self, intent: str) -> Optional[float]:
+        ttl = self.ttls.get(intent)
+        if intent in MINUTE_ALIGNED:
+            until_next_minute = 60 - (time.time() % 60)
+            ttl = until_next_minute if ttl is None else min(ttl, until_next_minute)
+        return ttl
+
+    @staticmethod
+    def key(intent: str, message: str, version: str = '') -> str:
+        digest = hashlib.blake2b(normalize_message(message).encode('utf-8'), digest_size=16).hexdigest()
+        return f"{intent}:{version}:{digest}"
+
+    def get_or_compute(self, intent: str, message: str, compute: Callable[[], List[str]],
+                       version: str = '') -> List[str]:
+        """Return the cached reply candidates, computing and storing them on a miss"""
+        return self.lookup(intent, message, compute, version)[0]
+
+    def lookup(self, intent: str, message: str, compute: Callable[[], List[str]],
+               version: str = '') -> Tuple[List[str], bool]:
+        """Like get_or_compute, also returning whether the candidates came from the cache"""
+        if intent not in self.ttls:
+            return compute(), False
+        key = self.key(intent, message, version)
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits[intent] += 1
+            return value, True
+        with self._lock:
+            self.misses[intent] += 1
+        value = compute()
+        self.backend.set(key, value, self._ttl(intent))
+        return value, False
+
+    def clear(self):
+        """Drop every cached reply"""
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts overall and per intent"""
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        return {
+            'backend': self.backend.name,
+            'size': self.backend.size(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'per_intent': {
+                intent: {'hits': self.hits[intent], 'misses': self.misses[intent]}
+                for intent in sorted(set(self.hits) | set(self.misses))
+            }
+        }
@@ -0,0 +1,295 @@
+"""
+Timezone Resolver for location-based time queries
+Gazetteer of city and country aliases mapped to IANA zones, held in a trie
+with exact, prefix and fuzzy lookup
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime, tzinfo
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytz
+
+from services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALIASES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'timezone_aliases.json')
+
+# IANA areas whose zone names end in a city (Europe/Paris -> "paris")
+CITY_AREAS = {'Africa', 'America', 'Antarctica', 'Asia', 'Atlantic', 'Australia', 'Europe', 'Indian', 'Pacific'}
+
+# Aliases that are also everyday words or first names; they are only matched
+# inside messages when they follow "in"/"at"/"for" ("time in jordan")
+AMBIGUOUS_ALIASES = {
+    'center', 'chad', 'christmas', 'casey', 'davis', 'easter', 'georgia', 'jordan',
+    'knox', 'midway', 'nome', 'oral', 'palmer', 'regina', 'resolute', 'stanley',
+    'troll', 'wake'
+}
+
+# Words that may follow a place name without qualifying it ("time in tokyo
+# right now"); any other unknown word is read as part of the place name
+_TRAILING_WORDS = {
+    'and', 'at', 'city', 'currently', 'for', 'in', 'now', 'please', 'right', 'there', 'time', 'timezone',
+    'today', 'tonight', 'zone'
+}
+
+# How a location was matched: the whole alias, the start of one, or a typo
+EXACT = 'exact'
+PREFIX = 'prefix'
+APPROXIMATE = 'approximate'
+
+# Fuzzy matching only for queries this long, within this many edits; shorter
+# words and wider bounds hit unrelated places ("male" -> Mahe)
+FUZZY_MIN_LENGTH = 5
+FUZZY_MAX_DISTANCE = 1
+
+# Key under which a trie node stores the zone of the alias ending there
+_ZONE = '\0'
+
+_NON_ALIAS = re.compile(r"[^a-z0-9' ]+")
+# "time in <place>" style tails used for fuzzy matching inside messages
+_LOCATION_TAIL = re.compile(r"\b(?:in|at|for)\s+([a-z' ]+?)\s*(?:right now|now|today|please)?$")
+
+
+def normalize_location(value: str) -> str:
+    """Lowercase, strip accents, replace punctuation with spaces and collapse whitespace"""
+    value = unicodedata.normalize('NFKD', value.lower().replace('_', ' '))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(_NON_ALIAS.sub(' ', value).split())
+
+
+def location_label(alias: str) -> str:
+    """Display name for an alias: short codes upper-cased, names title-cased"""
+    return alias.upper() if len(alias) <= 3 else alias.title()
+
+
+class TimezoneResolver:
+    """Maps free-text locations to IANA timezones"""
+
+    def __init__(self, aliases_path: str = DEFAULT_ALIASES_PATH, cache_size: int = 4096):
+        """Initialize the resolver; the gazetteer is loaded on first use"""
+        self.aliases_path = aliases_path
+        self.aliases: Dict[str, str] = {}
+        self._trie: Dict[str, Any] = {}
+        self._zones: Dict[str, tzinfo] = {}
+        self._zone_names: Dict[str, str] = {}
+        self._resolved = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """Build the alias table and trie once"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            aliases: Dict[str, str] = {}
+
+            # Country names, then curated aliases (better zones for big countries),
+            # then IANA zone cities, which are exact where a name is ambiguous
+            for code, name in pytz.country_names.items():
+                zones = pytz.country_timezones.get(code)
+                if zones:
+                    aliases[normalize_location(name)] = zones[0]
+            try:
+                with open(self.aliases_path, 'r', encoding='utf-8') as f:
+                    curated = json.load(f)['aliases']
+                aliases.update({normalize_location(alias): zone for alias, zone in curated.items()})
+            except FileNotFoundError:
+                logger.warning(f"{self.aliases_path} not found, using IANA and country names only")
+            for zone in pytz.common_timezones:
+                area, _, city = zone.rpartition('/')
+                if area.split('/')[0] in CITY_AREAS:
+                    aliases[normalize_location(city)] = zone
+
+            trie: Dict[str, Any] = {}
+            for alias, zone in aliases.items():
+                if not alias:
+                    continue
+                node = trie
+                for char in alias:
+                    node = node.setdefault(char, {})
+                node[_ZONE] = zone
+
+            self.aliases = aliases
+            self._trie = trie
+            self._zone_names = {zone.lower(): zone for zone in pytz.all_timezones}
+            self._loaded = True
+            logger.info(f"Loaded {len(aliases)} timezone aliases")
+
+    def get_zone(self, zone_name: str) -> tzinfo:
+        """Get a cached tz object for an IANA zone name"""
+        zone = self._zones.get(zone_name)
+        if zone is None:
+            zone = self._zones[zone_name] = pytz.timezone(zone_name)
+        return zone
+
+    def resolve(self, location: str) -> Optional[Tuple[str, str, str]]:
+        """Resolve a location to ``(alias, zone, match)`` by exact, prefix or fuzzy match
+
+        ``match`` is EXACT, PREFIX or APPROXIMATE. Fuzzy matching allows one
+        edit in queries of FUZZY_MIN_LENGTH or more characters and gives up
+        when two places are equally close.
+        """
+        self._ensure_loaded()
+        query = normalize_location(location)
+        if not query:
+            return None
+        cached = self._resolved.get(query)
+        if cached is not None:
+            return cached or None
+
+        match = None
+        zone_name = self._zone_names.get(location.strip().lower().replace(' ', '_'))
+        if query in self.aliases:
+            match = (query, self.aliases[query], EXACT)
+        elif zone_name is not None:
+            match = (zone_name.rpartition('/')[2].replace('_', ' ').lower(), zone_name, EXACT)
+        elif len(query) >= 4:
+            match = self._complete(query)
+            if match is None and len(query) >= FUZZY_MIN_LENGTH:
+                match = self._fuzzy(query, FUZZY_MAX_DISTANCE)
+
+        # Cache misses too (as an empty tuple) so junk input stays cheap
+        self._resolved.set(query, match or ())
+        return match
+
+    def _complete(self, prefix: str) -> Optional[Tuple[str, str, str]]:
+        """Shortest alias starting with ``prefix``"""
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        frontier = [(prefix, node)]
+        while frontier:
+            # Breadth-first, so the first alias found is the shortest completion
+            next_frontier = []
+            for alias, current in sorted(frontier, key=lambda item: item[0]):
+                if _ZONE in current:
+                    return alias, current[_ZONE], PREFIX
+                next_frontier.extend((alias + char, child) for char, child in current.items() if char != _ZONE)
+            frontier = next_frontier
+        return None
+
+    def _fuzzy(self, query: str, max_distance: int) -> Optional[Tuple[str, str, str]]:
+        """Closest alias within ``max_distance`` edits sharing the first letter
+
+        Walks the trie once, carrying a Levenshtein row per node and pruning
+        branches that can no longer come within the bound. Typos are rare in
+        the first letter, so only that subtree is searched. Returns None when
+        aliases for different zones are equally close.
+        """
+        root = self._trie.get(query[0])
+        if root is None:
+            return None
+        # [distance, alias, zone, tied with another zone]
+        best: List[Any] = [max_distance + 1, None, None, False]
+
+        def next_row(previous_row: List[int], char: str) -> List[int]:
+            row = [previous_row[0] + 1]
+            for column in range(1, len(query) + 1):
+                cost = 0 if query[column - 1] == char else 1
+                row.append(min(row[column - 1] + 1, previous_row[column] + 1, previous_row[column - 1] + cost))
+            return row
+
+        def walk(node: Dict[str, Any], alias: str, row: List[int]):
+            distance = row[-1]
+            if _ZONE in node:
+                if distance < best[0]:
+                    best[:] = [distance, alias, node[_ZONE], False]
+                elif distance == best[0] and node[_ZONE] != best[2]:
+                    best[3] = True
+            for char, child in node.items():
+                if char != _ZONE:
+                    child_row = next_row(row, char)
+                    if min(child_row) <= max_distance:
+                        walk(child, alias + char, child_row)
+
+        walk(root, query[0], next_row(list(range(len(query) + 1)), query[0]))
+        if best[1] is None or best[3]:
+            return None
+        return best[1], best[2], APPROXIMATE
+
+    def find_in_message(self, message: str) -> Optional[Tuple[str, str, str]]:
+        """Find the location a message asks about, preferring the longest alias
+
+        An alias followed by an unknown word inside the "in <place>" tail is
+        skipped ("time in paris texas" is not Paris).
+        """
+        self._ensure_loaded()
+        text = normalize_location(message)
+        tail = _LOCATION_TAIL.search(text)
+        best = None
+        starts = [0] + [i + 1 for i, char in enumerate(text) if char == ' ']
+        for start in starts:
+            node = self._trie
+            position = start
+            while position < len(text):
+                node = node.get(text[position])
+                if node is None:
+                    break
+                position += 1
+                at_boundary = position == len(text) or text[position] == ' '
+                if at_boundary and _ZONE in node and (best is None or position - start > len(best[0])):
+                    alias = text[start:position]
+                    if alias not in AMBIGUOUS_ALIASES and not self._qualified(text, position, tail):
+                        best = (alias, node[_ZONE], EXACT)
+        if best is not None:
+            return best
+
+        if tail and len(tail.group(1)) >= 4:
+            return self.resolve(tail.group(1))
+        return None
+
+    def _qualified(self, text: str, end: int, tail: Optional[re.Match]) -> bool:
+        """Whether an alias ending at ``end`` is followed by an unknown word in the location tail"""
+        if tail is None or not tail.start(1) < end < tail.end(1):
+            return False
+        following = text[end + 1:tail.end(1)].split()
+        if not following or following[0] in _TRAILING_WORDS:
+            return False
+        node = self._trie
+        for char in following[0]:
+            node = node.get(char)
+            if node is None:
+                return True
+        return False
+
+    def current_time(self, location: str) -> Dict[str, Any]:
+        """Describe the current time at a location"""
+        match = self.resolve(location)
+        if match is None:
+            return {'query': location, 'found': False}
+        alias, zone_name, kind = match
+        now = datetime.now(self.get_zone(zone_name))
+        offset = now.strftime('%z')
+        return {
+            'query': location,
+            'found': True,
+            'match': kind,
+            'location': location_label(alias),
+            'timezone': zone_name,
+            'time': now.strftime('%I:%M %p'),
+            'date': now.strftime('%A, %B %d, %Y'),
+            'iso': now.isoformat(),
+            'utc_offset': f"{offset[:3]}:{offset[3:]}"
+        }
+
+
+_default_resolver: Optional[TimezoneResolver] = None
+
+
+def get_timezone_resolver() -> TimezoneResolver:
+    """Get the process-wide timezone resolver"""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = TimezoneResolver()
+    return _default_resolver
@@ -0,0 +1,158 @@
+"""
+Trigger Index for knowledge base lookups
+Compiles responses.json triggers into an Aho-Corasick automaton
+"""
+
+import logging
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentinel used to join triggers into one searchable haystack
+_SEPARATOR = '\x00'
+
+
+class TriggerIndex:
+    """Multi-pattern matcher over knowledge base triggers
+
+    Every (category, trigger) pair gets an ordinal in the order it appears in
+    the knowledge base. Lookups return the lowest matching ordinal, which keeps
+    the "first category wins, then first trigger wins" priority of the original
+    nested loops.
+    """
+
+    def __init__(self, knowledge_base: Dict[str, Any]):
+        """Build the automaton and keyword haystack from the knowledge base"""
+        self._entries: List[Tuple[str, str, List[str]]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]
+        self._best: List[Optional[int]] = [None]
+        self._always: Optional[int] = None
+
+        pattern_ordinal: Dict[str, int] = {}
+        for category, responses in knowledge_base.items():
+            if not isinstance(responses, dict):
+                continue
+            for trigger, response_list in responses.items():
+                ordinal = len(self._entries)
+                self._entries.append((category, trigger, response_list))
+                pattern = trigger.lower()
+                # Only the first occurrence of a trigger can ever win
+                if pattern not in pattern_ordinal:
+                    pattern_ordinal[pattern] = ordinal
+
+        for pattern, ordinal in pattern_ordinal.items():
+            if pattern:
+                self._add_pattern(pattern, ordinal)
+            else:
+                # An empty trigger is a substring of every message
+                self._always = ordinal
+
+        self._build_failure_links()
+        self._build_keyword_haystack()
+
+        logger.info("Compiled trigger index: %d triggers, %d states",
+                    len(self._entries), len(self._goto))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add_pattern(self, pattern: str, ordinal: int):
+        """Insert a lowercase pattern into the trie"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._best.append(None)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._outputs[state].append(ordinal)
+        self._best[state] = ordinal
+
+    def _build_failure_links(self):
+        """Compute failure links and fold output chains into each state"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+
+                # Inherit matches that end at the failure state
+                inherited = self._outputs[self._fail[next_state]]
+                if inherited:
+                    self._outputs[next_state] = self._outputs[next_state] + inherited
+                    self._best[next_state] = min(self._outputs[next_state])
+
+    def _build_keyword_haystack(self):
+        """Join triggers in priority order so keyword lookups are a single find"""
+        offsets = []
+        parts = []
+        position = 0
+        for _, trigger, _ in self._entries:
+            pattern = trigger.lower()
+            offsets.append(position)
+            parts.append(pattern)
+            position += len(pattern) + len(_SEPARATOR)
+        self._haystack = _SEPARATOR.join(parts)
+        self._offsets = offsets
+
+    def _scan(self, message_lower: str):
+        """Yield the automaton state reached after each character"""
+        goto = self._goto
+        fail = self._fail
+        state = 0
+        for char in message_lower:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            yield state
+
+    def match_all(self, message: str) -> List[Tuple[str, str]]:
+        """Return every (category, trigger) found in the message, in priority order"""
+        ordinals = set()
+        if self._always is not None:
+            ordinals.add(self._always)
+        outputs = self._outputs
+        for state in self._scan(message.lower()):
+            if outputs[state]:
+                ordinals.update(outputs[state])
+        return [self._entries[i][:2] for i in sorted(ordinals)]
+
+    def first_match(self, message: str) -> Optional[List[str]]:
+        """Return the response list of the highest priority trigger in the message"""
+        best = self._always
+        best_by_state = self._best
+        for state in self._scan(message.lower()):
+            ordinal = best_by_state[state]
+            if ordinal is not None and (best is None or ordinal < best):
+                best = ordinal
+        if best is None:
+            return None
+        return self._entries[best][2]
+
+    def search_keyword(self, keyword: str) -> Optional[List[str]]:
+        """Return the response list of the first trigger containing the keyword"""
+        keyword = keyword.lower()
+        if not self._entries or _SEPARATOR in keyword:
+            return None
+        position = self._haystack.find(keyword)
+        if position < 0:
+            return None
+        return self._entries[bisect_right(self._offsets, position) - 1][2]
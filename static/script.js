@@ -10,6 +10,11 @@ class VenChatbot {
         this.isLoggedIn = false;
         this.conversationContext = {};
         
+        // Chat history paging state
+        this.historyCursor = null;
+        this.hasMoreHistory = false;
+        this.isLoadingHistory = false;
+        
         // DOM elements
         this.messageInput = document.getElementById('messageInput');
         this.sendButton = document.getElementById('sendButton');
@@ -66,6 +71,13 @@ class VenChatbot {
             this.sendButton.disabled = !this.messageInput.value.trim();
         });
         
+        // Load older messages when scrolled to the top
+        this.chatMessages.addEventListener('scroll', () => {
+            if (this.chatMessages.scrollTop < 50) {
+                this.loadOlderMessages();
+            }
+        });
+        
         // Hamburger menu
         this.hamburgerMenu.addEventListener('click', () => this.toggleSidebar());
         
@@ -197,17 +209,32 @@ class VenChatbot {
         this.showTypingIndicator();
         
         try {
-            // Send message to backend
-            const response = await this.sendMessageToBackend(message);
+            // Stream the reply from the backend, rendering text as it arrives
+            let replyText = null;
+            const response = await this.streamMessageFromBackend(message, (event, data) => {
+                if (event !== 'delta') return;
+                if (!replyText) {
+                    this.hideTypingIndicator();
+                    const element = this.createMessageElement('', 'bot');
+                    const content = element.querySelector('.message-content');
+                    replyText = document.createTextNode('');
+                    content.insertBefore(replyText, content.firstChild);
+                    this.chatMessages.appendChild(element);
+                }
+                replyText.data += data.text;
+                this.scrollToBottom();
+            });
             
             // Hide typing indicator
             this.hideTypingIndicator();
             
-            // Add bot response
-            if (response && response.text) {
-                this.addMessage(response.text, 'bot');
-            } else {
-                this.addMessage("I'm sorry, I encountered an error. Please try again.", 'bot');
+            // Add bot response unless it was already streamed in
+            if (!replyText) {
+                if (response && response.text) {
+                    this.addMessage(response.text, 'bot');
+                } else {
+                    this.addMessage("I'm sorry, I encountered an error. Please try again.", 'bot');
+                }
             }
             
         } catch (error) {
@@ -242,7 +269,79 @@ class VenChatbot {
         return await response.json();
     }
     
-    addMessage(content, sender) {
+    async streamMessageFromBackend(message, onEvent) {
+        const payload = {
+            message: message,
+            user_id: this.currentUser?.id,
+            chat_id: this.currentChatId
+        };
+        
+        const response = await fetch('/api/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify(payload)
+        });
+        
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        // Browsers without streaming fetch bodies fall back to the JSON endpoint
+        if (!response.body || !response.body.getReader) {
+            return await this.sendMessageToBackend(message);
+        }
+        
+        // Parse Server-Sent Events: blocks of "event:" and "data:" lines
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+        
+        const dispatch = (block) => {
+            let event = 'message';
+            const dataLines = [];
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trim());
+                }
+            }
+            if (!dataLines.length) return;
+            const data = JSON.parse(dataLines.join('\n'));
+            if (event === 'response') {
+                result = data;
+            } else if (event === 'error') {
+                throw new Error(data.error);
+            }
+            onEvent(event, data);
+        };
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                dispatch(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+            }
+        }
+        if (buffer.trim()) {
+            dispatch(buffer);
+        }
+        
+        return result;
+    }
+    
+    addMessage(content, sender, createdAt = null) {
+        this.chatMessages.appendChild(this.createMessageElement(content, sender, createdAt));
+    }
+    
+    createMessageElement(content, sender, createdAt = null) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${sender}`;
         
@@ -261,14 +360,19 @@ class VenChatbot {
         
         const messageTime = document.createElement('div');
         messageTime.className = 'message-time';
-        messageTime.textContent = new Date().toLocaleTimeString();
+        messageTime.textContent = (createdAt ? this.parseServerTime(createdAt) : new Date()).toLocaleTimeString();
         
         messageContent.appendChild(messageTime);
         
         messageDiv.appendChild(avatar);
         messageDiv.appendChild(messageContent);
         
-        this.chatMessages.appendChild(messageDiv);
+        return messageDiv;
+    }
+    
+    parseServerTime(value) {
+        // The server sends naive UTC timestamps; without an offset Date() would read them as local time
+        return new Date(/(Z|[+-]\d{2}:\d{2})$/.test(value) ? value : `${value}Z`);
     }
     
     showTypingIndicator() {
@@ -320,6 +424,8 @@ class VenChatbot {
             if (response.ok) {
                 const data = await response.json();
                 this.currentChatId = data.chat_id;
+                this.historyCursor = null;
+                this.hasMoreHistory = false;
                 
                 // Clear chat messages
                 this.chatMessages.innerHTML = '';
@@ -367,7 +473,7 @@ class VenChatbot {
             chatItem.innerHTML = `
                 <div class="chat-item-content">
                     <div class="chat-title">${chat.title}</div>
-                    <div class="chat-date">${new Date(chat.created_at).toLocaleDateString()}</div>
+                    <div class="chat-date">${this.parseServerTime(chat.created_at).toLocaleDateString()}</div>
                 </div>
                 <button class="delete-chat-btn" title="Delete chat">
                     <i class="fas fa-trash"></i>
@@ -393,7 +499,8 @@ class VenChatbot {
         this.currentChatId = chatId;
         
         try {
-            const response = await fetch(`/api/chat/${chatId}/history`);
+            // Latest page first; older pages load as the user scrolls up
+            const response = await fetch(`/api/chat/${chatId}/history?limit=50`);
             if (response.ok) {
                 const data = await response.json();
                 
@@ -402,8 +509,11 @@ class VenChatbot {
                 
                 // Display messages
                 data.messages.forEach(msg => {
-                    this.addMessage(msg.content, msg.sender);
+                    this.addMessage(msg.content, msg.sender, msg.created_at);
                 });
+                this.historyCursor = data.cursors.before;
+                this.hasMoreHistory = data.has_more_before;
+                this.scrollToBottom();
                 
                 // Update chat list
                 await this.loadChatHistory();
@@ -418,6 +528,37 @@ class VenChatbot {
         }
     }
     
+    async loadOlderMessages() {
+        if (!this.currentChatId || !this.hasMoreHistory || this.isLoadingHistory) return;
+        
+        this.isLoadingHistory = true;
+        const chatId = this.currentChatId;
+        
+        try {
+            const params = new URLSearchParams({ limit: 50, before: this.historyCursor });
+            const response = await fetch(`/api/chat/${chatId}/history?${params}`);
+            if (response.ok && chatId === this.currentChatId) {
+                const data = await response.json();
+                
+                // Prepend without moving the messages the user is looking at
+                const previousHeight = this.chatMessages.scrollHeight;
+                const fragment = document.createDocumentFragment();
+                data.messages.forEach(msg => {
+                    fragment.appendChild(this.createMessageElement(msg.content, msg.sender, msg.created_at));
+                });
+                this.chatMessages.insertBefore(fragment, this.chatMessages.firstChild);
+                this.chatMessages.scrollTop += this.chatMessages.scrollHeight - previousHeight;
+                
+                this.historyCursor = data.cursors.before;
+                this.hasMoreHistory = data.has_more_before;
+            }
+        } catch (error) {
+            console.error('Error loading older messages:', error);
+        } finally {
+            this.isLoadingHistory = false;
+        }
+    }
+    
     async deleteChat(chatId) {
         if (!confirm('Are you sure you want to delete this chat?')) return;
         
@@ -0,0 +1,14 @@
+"""
+Shared test setup
+app.py builds the Flask app and its services at import time, so the database
+and background threads are configured here before any test imports it.
+"""
+
+import os
+import tempfile
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='ven-tests-'), 'test.db')}"
+os.environ['ANTHROPIC_API_KEY'] = ''
+os.environ['PROVIDER_ENHANCE'] = 'false'
+os.environ['RESPONSES_RELOAD_INTERVAL'] = '0'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
@@ -0,0 +1,140 @@
+"""
+Tests for AIService response enhancement against a mock provider endpoint
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.ai_service import AIService
+
+GENERIC_MESSAGE = 'I love music and cooking'
+
+
+class MockProvider(BaseHTTPRequestHandler):
+    """Answers OpenAI and Anthropic requests with the server's configured behaviour"""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server.requests.append((self.path, body))
+        time.sleep(server.delay)
+        if self.path.endswith('/messages'):
+            payload = {'content': [{'type': 'text', 'text': server.reply}]}
+        else:
+            payload = {'choices': [{'message': {'content': server.reply}}]}
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_provider(reply: str, status: int = 200, delay: float = 0.0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockProvider)
+    server.daemon_threads = True
+    server.requests, server.reply, server.status, server.delay = [], reply, status, delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_port}/v1"
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(*args, **kwargs):
+        server = start_provider(*args, **kwargs)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def enhance_env(monkeypatch):
+    monkeypatch.setenv('PROVIDER_ENHANCE', 'true')
+    monkeypatch.setenv('PROVIDER_DEADLINE', '2')
+    for name in ('OPENAI', 'ANTHROPIC', 'GOOGLE'):
+        monkeypatch.delenv(f'{name}_API_KEY', raising=False)
+        monkeypatch.delenv(f'{name}_BASE_URL', raising=False)
+    return monkeypatch
+
+
+def ai_with(env, **providers) -> AIService:
+    """An AIService whose providers point at the given mock servers"""
+    for name, server in providers.items():
+        env.setenv(f'{name.upper()}_API_KEY', 'test-key')
+        env.setenv(f'{name.upper()}_BASE_URL', url(server))
+    return AIService()
+
+
+def test_enhancement_is_off_by_default(servers, enhance_env):
+    enhance_env.setenv('PROVIDER_ENHANCE', 'false')
+    server = servers('ENHANCED')
+    ai = ai_with(enhance_env, openai=server)
+    assert ai.provider_client is None
+    assert ai.generate_response(GENERIC_MESSAGE) != 'ENHANCED'
+    assert server.requests == []
+
+
+def test_generic_reply_is_enhanced_until_cached(servers, enhance_env):
+    server = servers('ENHANCED')
+    ai = ai_with(enhance_env, openai=server)
+    assert ai.analyze_message(GENERIC_MESSAGE)['intent'] in ai.response_cache.ttls
+
+    assert ai.generate_response(GENERIC_MESSAGE) == 'ENHANCED'
+    assert len(server.requests) == 1
+    # The second time the draft is a cache hit and is sent as it is
+    assert ai.generate_response(GENERIC_MESSAGE) != 'ENHANCED'
+    assert len(server.requests) == 1
+
+
+def test_exact_replies_are_not_enhanced(servers, enhance_env):
+    server = servers('ENHANCED')
+    ai = ai_with(enhance_env, openai=server)
+    assert ai.generate_response('what is 2 + 2') == 'The answer is 4. 🧮'
+    assert server.requests == []
+
+
+def test_deadline_keeps_the_rule_based_reply(servers, enhance_env):
+    enhance_env.setenv('PROVIDER_DEADLINE', '0.3')
+    server = servers('TOO LATE', delay=1.5)
+    ai = ai_with(enhance_env, openai=server)
+
+    started = time.monotonic()
+    reply = ai.generate_response(GENERIC_MESSAGE)
+    assert time.monotonic() - started < 1.0
+    assert reply and reply != 'TOO LATE'
+    assert ai.provider_client.stats()['timeouts'] == 1
+
+
+def test_failed_provider_falls_back_to_the_next(servers, enhance_env):
+    failing = servers('unused', status=500)
+    working = servers('FROM ANTHROPIC')
+    ai = ai_with(enhance_env, openai=failing, anthropic=working)
+
+    assert ai.generate_response(GENERIC_MESSAGE) == 'FROM ANTHROPIC'
+    assert len(failing.requests) == 1 and len(working.requests) == 1
+    assert ai.provider_client.stats()['failures'] == 1
+
+
+def test_every_provider_failing_keeps_the_rule_based_reply(servers, enhance_env):
+    server = servers('unused', status=503)
+    ai = ai_with(enhance_env, openai=server)
+    reply = ai.generate_response(GENERIC_MESSAGE)
+    assert reply and reply != 'unused'
+    assert len(server.requests) == 1
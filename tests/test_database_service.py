@@ -0,0 +1,114 @@
+"""
+Tests for DatabaseService
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+MESSAGES = 20000
+PAGE = 500
+
+
+@pytest.fixture(scope='module')
+def service():
+    from app import app, db, db_service, setup_database
+    from models import Chat, Message, User
+
+    setup_database()
+    with app.app_context():
+        user = User(username='pager', email='pager@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Chat(id='deep-chat', user_id=user.id))
+        # Pairs of messages share a timestamp so the id breaks ties
+        started = datetime(2026, 1, 1)
+        db.session.execute(insert(Message), [
+            {'chat_id': 'deep-chat', 'user_id': user.id, 'content': f'message {n}',
+             'sender': 'user' if n % 2 else 'bot', 'created_at': started + timedelta(seconds=n // 2)}
+            for n in range(MESSAGES)
+        ])
+        db.session.commit()
+        yield db_service
+
+
+def page_statements(fn):
+    """Run fn and return the (sql, params) of every messages query it issued"""
+    from app import db
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM messages' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    return result, statements
+
+
+def test_history_pages_cover_chat_in_order(service):
+    from app import app
+
+    with app.app_context():
+        seen = []
+        page = service.get_chat_messages_page('deep-chat', limit=PAGE)
+        while True:
+            seen[:0] = [msg['id'] for msg in page['messages']]
+            if not page['has_more_before']:
+                break
+            page = service.get_chat_messages_page('deep-chat', limit=PAGE, before=page['cursors']['before'])
+
+        assert len(seen) == MESSAGES
+        assert seen == sorted(seen)
+
+        forward = service.get_chat_messages_page('deep-chat', limit=PAGE, after=page['cursors']['after'])
+        assert [msg['id'] for msg in forward['messages']] == seen[PAGE:2 * PAGE]
+
+
+@pytest.mark.parametrize('direction', ['before', 'after'])
+def test_deep_history_page_seeks_to_the_cursor(service, direction):
+    from app import app, db
+
+    with app.app_context():
+        # A cursor 90% of the way into the history
+        page = service.get_chat_messages_page('deep-chat', limit=PAGE)
+        for _ in range(MESSAGES * 9 // 10 // PAGE):
+            page = service.get_chat_messages_page('deep-chat', limit=PAGE, before=page['cursors']['before'])
+
+        deep, statements = page_statements(lambda: service.get_chat_messages_page(
+            'deep-chat', limit=PAGE, **{direction: page['cursors'][direction]}))
+        assert len(deep['messages']) == PAGE
+
+        statement, parameters = statements[-1]
+        plan = [row[-1] for row in db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()]
+        operator = '<' if direction == 'before' else '>'
+        assert any('ix_messages_chat_created_id' in step and f'created_at{operator}?' in step
+                   for step in plan), plan
+        assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+def test_search_limit_counts_only_active_knowledge(service):
+    from app import app, db
+    from models import KnowledgeBase
+
+    with app.app_context():
+        ids = [
+            service.add_knowledge(f'Quasar fact {n}', 'quasar ' * (8 - n), keywords=['quasar'])
+            for n in range(8)
+        ]
+        top = [result['id'] for result in service.search_knowledge('quasar', limit=3)]
+        # Deactivated by another worker: the index has not re-synced yet
+        KnowledgeBase.query.filter(KnowledgeBase.id.in_(top)).update(
+            {'is_active': False}, synchronize_session=False)
+        db.session.commit()
+
+        results = service.search_knowledge('quasar', limit=3)
+        assert len(results) == 3
+        assert not set(top) & {result['id'] for result in results}
+        assert set(result['id'] for result in results) <= set(ids)
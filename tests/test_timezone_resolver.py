@@ -0,0 +1,60 @@
+"""
+Tests for TimezoneResolver
+"""
+
+import pytest
+
+from services.timezone_resolver import APPROXIMATE, EXACT, PREFIX, TimezoneResolver
+
+
+@pytest.fixture(scope='module')
+def resolver():
+    return TimezoneResolver()
+
+
+@pytest.mark.parametrize('location, zone, match', [
+    ('tokyo', 'Asia/Tokyo', EXACT),
+    ('Europe/Paris', 'Europe/Paris', EXACT),
+    ('san franc', 'America/Los_Angeles', PREFIX),
+    ('tokio', 'Asia/Tokyo', APPROXIMATE),
+    ('berln', 'Europe/Berlin', APPROXIMATE),
+])
+def test_resolve_reports_how_it_matched(resolver, location, zone, match):
+    assert resolver.resolve(location)[1:] == (zone, match)
+
+
+@pytest.mark.parametrize('location', [
+    'atlantis',     # two edits from Atlanta
+    'male',         # too short to guess at (Mahe)
+    'paris texas',  # not Paris
+    'albanya',      # as close to Albania as to Albany
+    'austrin',      # as close to Austria as to Austin
+])
+def test_resolve_does_not_guess(resolver, location):
+    assert resolver.resolve(location) is None
+    assert resolver.current_time(location)['found'] is False
+
+
+@pytest.mark.parametrize('message', [
+    'what time is it in atlantis',
+    'time in male',
+    'time in paris texas',
+])
+def test_find_in_message_does_not_guess(resolver, message):
+    assert resolver.find_in_message(message) is None
+
+
+@pytest.mark.parametrize('message, zone', [
+    ('what time is it in tokyo right now', 'Asia/Tokyo'),
+    ('time in new york city', 'America/New_York'),
+    ('what time is it in london ontario', 'America/Toronto'),
+])
+def test_find_in_message(resolver, message, zone):
+    assert resolver.find_in_message(message)[1] == zone
+
+
+def test_current_time_marks_typo_matches(resolver):
+    result = resolver.current_time('tokio')
+    assert result['found'] is True
+    assert result['match'] == APPROXIMATE
+    assert result['timezone'] == 'Asia/Tokyo'